@@ -0,0 +1,44 @@
+"""
+Stateless Flask report API built on the functions in main.py.
+
+Run from the ClockifyApp-deploy directory, e.g.
+
+    gunicorn -w 4 -b 0.0.0.0:8000 "app_Flask:create_app()"
+
+Workers share nothing but the Clockify API, the report job database, the
+webhook event log and the pre-rendered reports; each process keeps its own
+entry cache, partitioned per workspace (entry_cache.cache_for). One process
+per host runs the nightly warm-up (warmup.py). Do not use --preload: the job
+worker and scheduler threads are started in create_app().
+"""
+import logging
+
+from flask import Flask
+
+
+logger = logging.getLogger("clockify.api")
+
+
+def create_app(job_queue=None, scheduler=None) -> Flask:
+    app = Flask(__name__)
+    app.json.ensure_ascii = False
+
+    from .jobs import JobQueue
+    from .routes import bp
+    from .warmup import WarmupScheduler
+    from . import services
+
+    if not services.api_tokens_enabled():
+        logger.warning("CLOCKIFY_API_TOKEN is not set: the report API is open, expose it internally only")
+
+    if job_queue is None:
+        job_queue = JobQueue()
+        job_queue.start()
+    if scheduler is None:
+        scheduler = WarmupScheduler().start()
+    app.extensions["job_queue"] = job_queue
+    app.extensions["warmup"] = scheduler
+    app.extensions["prerendered"] = scheduler.store
+    app.register_blueprint(bp)
+
+    return app
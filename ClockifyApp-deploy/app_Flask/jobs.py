@@ -0,0 +1,313 @@
+"""
+Persistent report job queue.
+
+Submitting a report request stores a job in SQLite and returns its id; a
+bounded pool of worker threads renders queued jobs in the background and
+writes the PDF next to the database. Jobs survive restarts: queued jobs are
+picked up again and running jobs whose lease expired (worker died) are
+re-queued. A worker renews the lease of its job while rendering, so long
+renders are not taken over by a second worker. Several processes (gunicorn workers, or ``python -m
+app_Flask.jobs`` as a dedicated render worker) can share one database.
+
+Submissions with the same parameters are merged: while a job is queued or
+running, or finished less than ``JOB_RESULT_TTL`` seconds ago, submitting
+the same report returns the existing job. Done and failed jobs older than
+that are deleted together with their PDFs.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import threading
+import hashlib
+import logging
+import sqlite3
+import json
+import time
+import uuid
+import os
+
+from main import BASE_DIR
+
+
+logger = logging.getLogger("clockify.jobs")
+
+JOBS_DIR = Path(os.environ.get("CLOCKIFY_JOBS_DIR", BASE_DIR / "jobs"))
+JOB_WORKERS = int(os.environ.get("CLOCKIFY_JOB_WORKERS", 2))
+JOB_RESULT_TTL = int(os.environ.get("CLOCKIFY_JOB_RESULT_TTL", 300))
+JOB_LEASE_SECONDS = int(os.environ.get("CLOCKIFY_JOB_LEASE_SECONDS", 600))
+POLL_SECONDS = 1.0
+# Interval of the idle workers' clean-up of expired jobs
+PRUNE_SECONDS = 60.0
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    key         TEXT NOT NULL UNIQUE,
+    params      TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    error       TEXT,
+    filename    TEXT,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL,
+    lease_until REAL,
+    claim       TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+def job_key(params: dict) -> str:
+    """Stable hash of the report parameters, used to merge duplicate submissions."""
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    """SQLite-backed queue of report jobs with a bounded in-process worker pool."""
+
+    def __init__(self, jobs_dir=JOBS_DIR, workers: int = JOB_WORKERS, render=None,
+                 lease_seconds: float = JOB_LEASE_SECONDS, result_ttl: float = JOB_RESULT_TTL):
+        """
+        render(params) -> (pdf_bytes, filename) produces the report of a job;
+        by default services.render_job is used.
+        """
+        self.jobs_dir = Path(jobs_dir)
+        self.results_dir = self.jobs_dir / "results"
+        self.db_path = self.jobs_dir / "jobs.sqlite3"
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self._render = render
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._prune_lock = threading.Lock()
+        self._next_prune = 0.0
+
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Databases created before leases were owned by a claim
+            if "claim" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN claim TEXT")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # --- API -------------------------------------------------------------
+
+    def submit(self, params: dict) -> dict:
+        """Queue a report job, or return the matching active/recent job."""
+        key = job_key(params)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone()
+            reusable = row is not None and (
+                row["status"] in (QUEUED, RUNNING)
+                or (row["status"] == DONE and now - row["finished_at"] < self.result_ttl)
+            )
+            if reusable:
+                conn.execute("COMMIT")
+                return self._as_dict(row)
+
+            if row is None:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, key, params, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, key, json.dumps(params, ensure_ascii=False), QUEUED, now)
+                )
+            else:
+                # Failed or outdated job: run it again under the same id
+                job_id = row["id"]
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = NULL, filename = NULL, created_at = ?,"
+                    " started_at = NULL, finished_at = NULL, lease_until = NULL, claim = NULL WHERE id = ?",
+                    (QUEUED, now, job_id)
+                )
+            conn.execute("COMMIT")
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        self._wakeup.set()
+        return self._as_dict(row)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._as_dict(row) if row is not None else None
+
+    def result_path(self, job_id: str) -> Path:
+        return self.results_dir / f"{job_id}.pdf"
+
+    def prune(self) -> int:
+        """
+        Delete done and failed jobs that finished more than result_ttl seconds
+        ago, with their PDFs. Returns the number of deleted jobs.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            job_ids = [row["id"] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, now - self.result_ttl)
+            )]
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+            conn.execute("COMMIT")
+        for job_id in job_ids:
+            self.result_path(job_id).unlink(missing_ok=True)
+
+        # Partial results of workers that died while writing
+        for tmp in self.results_dir.glob("*.tmp"):
+            try:
+                if tmp.stat().st_mtime < now - self.lease_seconds:
+                    tmp.unlink()
+            except FileNotFoundError:
+                pass
+        return len(job_ids)
+
+    @staticmethod
+    def _as_dict(row) -> dict:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        del job["key"], job["lease_until"], job["claim"]
+        return job
+
+    # --- Workers ---------------------------------------------------------
+
+    def start(self):
+        """Start the worker threads (idempotent)."""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"report-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def _claim(self) -> tuple[sqlite3.Row, str] | None:
+        """
+        Atomically take the oldest queued (or abandoned running) job.
+        Returns the job and the claim token that owns its lease.
+        """
+        now = time.time()
+        claim = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?)"
+                " ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, lease_until = ?, claim = ? WHERE id = ?",
+                (RUNNING, now, now + self.lease_seconds, claim, row["id"])
+            )
+            conn.execute("COMMIT")
+            return row, claim
+
+    def _renew_lease(self, job_id: str, claim: str, done: threading.Event):
+        """Extend the lease of a running job every third of the lease time until ``done`` is set."""
+        while not done.wait(self.lease_seconds / 3):
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE jobs SET lease_until = ? WHERE id = ? AND claim = ?",
+                    (time.time() + self.lease_seconds, job_id, claim)
+                )
+
+    def _finish(self, job_id: str, claim: str, status: str, filename: str = None, error: str = None) -> bool:
+        """Record the outcome; False if another worker has taken the job over meanwhile."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, filename = ?, error = ?, finished_at = ?, lease_until = NULL,"
+                " claim = NULL WHERE id = ? AND claim = ?",
+                (status, filename, error, time.time(), job_id, claim)
+            )
+        if cursor.rowcount == 0:
+            logger.warning("Report job %s was taken over by another worker", job_id)
+        return cursor.rowcount > 0
+
+    def run_one(self) -> bool:
+        """Render one queued job. Returns False if there was nothing to do."""
+        claimed = self._claim()
+        if claimed is None:
+            return False
+
+        row, claim = claimed
+        job_id = row["id"]
+        render = self._render
+        if render is None:
+            from .services import render_job
+            render = render_job
+
+        rendered = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_lease, args=(job_id, claim, rendered),
+                                     name=f"report-job-lease-{job_id[:8]}", daemon=True)
+        heartbeat.start()
+        try:
+            pdf_bytes, filename = render(json.loads(row["params"]))
+            # Unique per claim, so a worker that lost its lease never writes the same file
+            tmp = self.result_path(job_id).with_suffix(f".{claim}.tmp")
+            tmp.write_bytes(pdf_bytes)
+            os.replace(tmp, self.result_path(job_id))
+        except Exception as e:
+            logger.exception("Report job %s failed", job_id)
+            self._finish(job_id, claim, FAILED, error=str(e))
+        else:
+            self._finish(job_id, claim, DONE, filename=filename)
+        finally:
+            rendered.set()
+            heartbeat.join()
+        return True
+
+    def _prune_due(self) -> bool:
+        """True for one of the idle workers every PRUNE_SECONDS."""
+        with self._prune_lock:
+            now = time.monotonic()
+            if now < self._next_prune:
+                return False
+            self._next_prune = now + PRUNE_SECONDS
+            return True
+
+    def _work(self):
+        while not self._stop.is_set():
+            if self.run_one():
+                continue
+            if self._prune_due():
+                try:
+                    self.prune()
+                except Exception:
+                    logger.exception("Pruning expired report jobs failed")
+            self._wakeup.wait(POLL_SECONDS)
+            self._wakeup.clear()
+
+
+if __name__ == "__main__":
+    # Dedicated render worker sharing the queue with the web processes
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    queue = JobQueue()
+    queue.start()
+    logger.info("Report job worker running (%d threads, %s)", queue.workers, queue.db_path)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        queue.stop()
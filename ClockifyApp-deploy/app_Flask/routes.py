@@ -0,0 +1,310 @@
+"""
+HTTP endpoints of the report API.
+
+    GET /api/workspaces                                      -> configured workspaces
+    GET /api/clients   ?start=&end=
+    GET /api/projects  ?start=&end=&client=
+    GET /api/entries   ?start=&end=[&client=][&project=...][&q=]
+    GET /api/summary   ?start=&end=[&client=]               -> hours per client/project
+    GET /api/report    ?start=&end=&client=[&project=...][&q=] -> PDF
+    GET /api/bundle    ?start=&end=[&client=...][&by=project] -> one PDF for several clients
+    GET /api/export    ?start=&end=&format=csv|xlsx|parquet[&client=][&project=...][&q=] -> raw entries
+    POST /api/jobs     start, end, client[, projects][, workspace] -> 202 job
+    GET /api/jobs/<id>                                       -> job status
+    GET /api/jobs/<id>/download                              -> PDF
+    GET /metrics                                             -> Prometheus text
+    POST /webhooks/clockify                                  -> time entry events
+
+Dates accept every format of main.to_iso_format (e.g. 01.06.2025 or
+2025-06-01). 'project' may be given several times. Every data endpoint
+takes an optional 'workspace' (id or name, default: first configured one).
+'q' searches the descriptions (words are ANDed, 'word*' is a prefix).
+
+Entries and reports carry an ETag (fingerprint of the selected entries and
+parameters); If-None-Match requests are answered with 304 before anything is
+rendered. There is no Last-Modified: the entries carry no modification time,
+and any other timestamp would differ between worker processes.
+
+Time entries are personal data: with CLOCKIFY_API_TOKEN set, every route
+but the webhook (signed by Clockify) and /metrics (totals only) requires
+"Authorization: Bearer <token>". Without tokens the API is open and must
+only be reachable internally.
+
+Clockify webhooks (see webhooks.py) update the cached entries in place of
+re-polling. The receiving worker appends the event to the shared event log;
+every worker applies new events from it before handling a request.
+"""
+from urllib.parse import quote
+import tempfile
+
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, url_for
+import requests
+
+from main import export_entries, iter_entries_csv, EXPORT_FORMATS
+from pipeline_metrics import track_run, render_prometheus
+import webhooks
+from . import services
+
+
+bp = Blueprint("api", __name__)
+
+# Routes with their own authentication or without personal data
+PUBLIC_ENDPOINTS = {"api.clockify_webhook", "api.metrics"}
+
+
+@bp.before_request
+def check_api_token():
+    if request.endpoint in PUBLIC_ENDPOINTS:
+        return None
+    if not services.verify_api_token(request.headers.get("Authorization")):
+        return jsonify(error="Ungültiges oder fehlendes API-Token."), 401, {"WWW-Authenticate": "Bearer"}
+    return None
+
+
+@bp.before_request
+def apply_webhook_events():
+    webhooks.sync()
+
+
+@bp.errorhandler(ValueError)
+def bad_request(e):
+    return jsonify(error=str(e)), 400
+
+
+@bp.errorhandler(requests.exceptions.RequestException)
+def upstream_error(e):
+    return jsonify(error=f"Clockify API error: {e}"), 502
+
+
+def _period():
+    return services.parse_period(request.args.get("start"), request.args.get("end"))
+
+
+def _workspace():
+    return services.resolve_workspace(request.args.get("workspace"))
+
+
+def _period_entries():
+    return services.load_period(*_period(), _workspace())
+
+
+def _validators(df, end_iso: str, *params, etag: str = None) -> dict:
+    etag = etag or services.fingerprint(df, *params)
+    return {
+        "etag": etag,
+        "cache_control": services.cache_control(end_iso),
+    }
+
+
+def _not_modified(validators: dict):
+    """304 response if the client's copy is current, else None."""
+    if not request.if_none_match.contains_weak(validators["etag"]):
+        return None
+    return _with_validators(Response(status=304), validators)
+
+
+def _with_validators(response, validators: dict):
+    response.set_etag(validators["etag"])
+    response.headers["Cache-Control"] = validators["cache_control"]
+    return response
+
+
+@bp.get("/api/workspaces")
+def workspaces():
+    return jsonify(workspaces=services.list_workspaces())
+
+
+@bp.get("/api/clients")
+def clients():
+    return jsonify(clients=services.list_clients(_period_entries()))
+
+
+@bp.get("/api/projects")
+def projects():
+    client = request.args.get("client")
+    if not client:
+        raise ValueError("Parameter 'client' is required.")
+    return jsonify(client=client, projects=services.list_projects(_period_entries(), client))
+
+
+@bp.get("/api/entries")
+def entries():
+    workspace = _workspace()
+    start_iso, end_iso = _period()
+    client = request.args.get("client")
+    projects = request.args.getlist("project")
+    query = request.args.get("q")
+    df_period = services.load_period(start_iso, end_iso, workspace)
+    df = services.select_entries(df_period, client=client, projects=projects, query=query)
+
+    validators = _validators(df, end_iso, "entries", workspace.id, start_iso, end_iso, client, projects, query)
+    not_modified = _not_modified(validators)
+    if not_modified is not None:
+        return not_modified
+    return _with_validators(jsonify(count=len(df), entries=services.entries_to_records(df)), validators)
+
+
+@bp.get("/api/summary")
+def summary():
+    start_iso, end_iso = _period()
+    client = request.args.get("client")
+    return jsonify(summary=services.summarize_period(start_iso, end_iso, _workspace(), client=client))
+
+
+@bp.get("/api/report")
+def report():
+    client = request.args.get("client")
+    if not client:
+        raise ValueError("Parameter 'client' is required.")
+    projects = request.args.getlist("project")
+    query = request.args.get("q")
+    workspace = _workspace()
+    start_iso, end_iso = _period()
+
+    with track_run("api-report"):
+        df_period = services.load_period(start_iso, end_iso, workspace)
+        df_selected = services.select_entries(df_period, client=client, projects=projects, query=query)
+        if df_selected.empty:
+            return jsonify(error="Keine Einträge gefunden."), 404
+
+        etag = services.report_etag(df_selected, workspace.id, start_iso, end_iso, client, projects, query)
+        validators = _validators(df_selected, end_iso, etag=etag)
+        not_modified = _not_modified(validators)
+        if not_modified is not None:
+            return not_modified
+
+        pdf_bytes = current_app.extensions["prerendered"].get(etag)
+        if pdf_bytes is not None:
+            filename = services.report_filename(df_selected, client, projects)
+        else:
+            pdf_bytes, filename = services.render_report(df_selected, client, projects)
+
+    response = Response(
+        services.iter_chunks(pdf_bytes),
+        mimetype="application/pdf",
+        direct_passthrough=True,
+        headers={
+            "Content-Length": str(len(pdf_bytes)),
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+        },
+    )
+    return _with_validators(response, validators)
+
+
+@bp.get("/api/export")
+def export():
+    fmt = services.check_export_format(request.args.get("format", "csv"))
+    workspace = _workspace()
+    start_iso, end_iso = _period()
+    client = request.args.get("client")
+    projects = request.args.getlist("project")
+    df_period = services.load_period(start_iso, end_iso, workspace)
+    df_selected = services.select_entries(df_period, client=client, projects=projects, query=request.args.get("q"))
+
+    mimetype = EXPORT_FORMATS[fmt][1]
+    filename = services.export_filename(df_selected, client, projects, fmt)
+    disposition = {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    if fmt == "csv":
+        # Streamed chunk by chunk, never held as a whole
+        return Response(iter_entries_csv(df_selected), mimetype=mimetype, headers=disposition)
+
+    # XLSX / Parquet need a seekable sink: spool to disk, then stream the file
+    sink = tempfile.TemporaryFile()
+    with track_run("api-export"):
+        export_entries(df_selected, fmt, sink)
+    sink.seek(0)
+    return send_file(sink, mimetype=mimetype, as_attachment=True, download_name=filename)
+
+
+@bp.get("/api/bundle")
+def bundle():
+    workspace = _workspace()
+    start_iso, end_iso = _period()
+    clients = request.args.getlist("client")
+    with track_run("api-bundle"):
+        df_period = services.load_period(start_iso, end_iso, workspace)
+        pdf_bytes, filename = services.render_bundle(df_period, clients, by_project=request.args.get("by") == "project")
+    return Response(
+        services.iter_chunks(pdf_bytes),
+        mimetype="application/pdf",
+        direct_passthrough=True,
+        headers={
+            "Content-Length": str(len(pdf_bytes)),
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+        },
+    )
+
+
+def _job_response(job: dict, status: int = 200):
+    job = dict(job)
+    job["status_url"] = url_for("api.job_status", job_id=job["id"])
+    if job["status"] == "done":
+        job["download_url"] = url_for("api.job_download", job_id=job["id"])
+    return jsonify(job), status
+
+
+@bp.post("/api/jobs")
+def submit_job():
+    data = request.get_json(silent=True) or request.form
+    projects = data.get("projects") if request.is_json else data.getlist("project")
+    params = services.report_params(data.get("start"), data.get("end"), data.get("client"), projects,
+                                    workspace=data.get("workspace"))
+
+    job = current_app.extensions["job_queue"].submit(params)
+    response, status = _job_response(job, 202)
+    response.headers["Location"] = url_for("api.job_status", job_id=job["id"])
+    return response, status
+
+
+@bp.get("/api/jobs/<job_id>")
+def job_status(job_id):
+    job = current_app.extensions["job_queue"].get(job_id)
+    if job is None:
+        return jsonify(error="Unbekannter Job."), 404
+    return _job_response(job)
+
+
+@bp.get("/api/jobs/<job_id>/download")
+def job_download(job_id):
+    queue = current_app.extensions["job_queue"]
+    job = queue.get(job_id)
+    if job is None:
+        return jsonify(error="Unbekannter Job."), 404
+    if job["status"] != "done":
+        return _job_response(job, 409)
+    path = queue.result_path(job_id)
+    if not path.exists():
+        # Pruned between the status lookup and now
+        return jsonify(error="Unbekannter Job."), 404
+    return send_file(
+        path,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=job["filename"]
+    )
+
+
+@bp.get("/metrics")
+def metrics():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@bp.post("/webhooks/clockify")
+def clockify_webhook():
+    if not webhooks.webhooks_enabled():
+        return jsonify(error="Webhooks sind nicht konfiguriert."), 404
+    if not webhooks.verify_token(request.headers.get("Clockify-Signature")):
+        return jsonify(error="Ungültige Signatur."), 401
+
+    event_type = request.headers.get("Clockify-Webhook-Event-Type", "")
+    if event_type not in webhooks.EVENT_TYPES:
+        # Other subscriptions (timer started, projects, ...) do not affect cached entries
+        return jsonify(event=event_type, ignored=True)
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        raise ValueError("Webhook body must be a JSON object.")
+
+    with track_run("webhook"):
+        webhooks.record_event(event_type, payload)
+        updated = webhooks.sync()
+    return jsonify(event=event_type, updated_periods=updated)
@@ -0,0 +1,277 @@
+"""
+Report services used by the Flask routes.
+
+Everything here is a function of the request parameters and the shared
+entry cache, so any worker process can answer any request.
+"""
+from datetime import datetime, timedelta, timezone
+import hashlib
+import hmac
+import os
+
+import pandas as pd
+
+from main import (
+    to_iso_format,
+    build_report_rows,
+    build_pdf_filename,
+    get_months_range_string,
+    generate_report_pdf_bytes,
+    generate_report_bundle_pdf_bytes,
+    build_report_sections,
+    load_workspaces,
+    available_export_formats,
+    EXPORT_FORMATS,
+    Workspace,
+    LOGO_PATH,
+    COMPANY_NAME,
+)
+from entry_cache import load_entries, period_totals
+from search_index import index_for
+from pipeline_metrics import phase, track_run
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Bump when the report layout changes so cached PDFs are not revalidated.
+REPORT_VERSION = "1"
+
+# Periods that ended more than this many days ago count as closed.
+CLOSED_PERIOD_GRACE_DAYS = int(os.environ.get("CLOCKIFY_CLOSED_PERIOD_GRACE_DAYS", 2))
+CLOSED_PERIOD_MAX_AGE = int(os.environ.get("CLOCKIFY_CLOSED_PERIOD_MAX_AGE", 86400))
+
+WORKSPACES = load_workspaces()
+
+# Tokens accepted as "Authorization: Bearer <token>" (comma-separated); the
+# API is open without, and then must only be reachable from internal networks.
+API_TOKENS = [t.strip() for t in os.environ.get("CLOCKIFY_API_TOKEN", "").split(",") if t.strip()]
+
+
+def api_tokens_enabled() -> bool:
+    return bool(API_TOKENS)
+
+
+def verify_api_token(authorization: str | None) -> bool:
+    """True if the Authorization header carries one of API_TOKENS (always True without tokens)."""
+    if not API_TOKENS:
+        return True
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    return any(hmac.compare_digest(token.strip().encode(), t.encode()) for t in API_TOKENS)
+
+
+def parse_period(start: str, end: str) -> tuple[str, str]:
+    """
+    Convert the 'start' / 'end' query parameters (any format to_iso_format
+    accepts) into ISO timestamps. Raises ValueError on missing or invalid input.
+    """
+    if not start or not end:
+        raise ValueError("Parameters 'start' and 'end' are required.")
+    start_iso = to_iso_format(start, is_end=False)
+    end_iso = to_iso_format(end, is_end=True)
+    if start_iso > end_iso:
+        raise ValueError("End date is before start date.")
+    return start_iso, end_iso
+
+
+def resolve_workspace(workspace: str = None) -> Workspace:
+    """
+    The configured workspace with the given id or name; the first configured
+    workspace if none is given. Raises ValueError for unknown workspaces.
+    """
+    if not workspace:
+        return WORKSPACES[0]
+    for ws in WORKSPACES:
+        if workspace in (ws.id, ws.name):
+            return ws
+    raise ValueError(f"Unknown workspace '{workspace}'.")
+
+
+def list_workspaces() -> list[dict]:
+    """Id and name of the configured workspaces (never their API keys)."""
+    return [{"id": ws.id, "name": ws.label} for ws in WORKSPACES]
+
+
+def report_params(start: str, end: str, client: str, projects: list[str] = None, workspace: str = None) -> dict:
+    """
+    Normalised parameters of one report (workspace id, ISO period, client,
+    sorted projects). Equal reports yield equal dicts, which the job queue
+    uses to merge duplicates.
+    """
+    ws = resolve_workspace(workspace)
+    start_iso, end_iso = parse_period(start, end)
+    if not client:
+        raise ValueError("Parameter 'client' is required.")
+    return {
+        "workspace": ws.id,
+        "start": start_iso,
+        "end": end_iso,
+        "client": client,
+        "projects": sorted(set(projects or [])),
+    }
+
+
+def load_period(start_iso: str, end_iso: str, workspace: Workspace = None, ttl: float = None) -> pd.DataFrame:
+    """All entries of the period in the workspace (shared, read-only frame)."""
+    return load_entries(start_iso, end_iso, workspace=workspace, ttl=ttl)
+
+
+def summarize_period(start_iso: str, end_iso: str, workspace: Workspace = None, client: str = None) -> list[dict]:
+    """Hours per client and project of the period (optionally of one client)."""
+    totals = period_totals(start_iso, end_iso, workspace=workspace)
+    return [
+        {"client": c, "project": p, "hours": round(hours, 2)}
+        for (c, p), hours in sorted(totals.items())
+        if not client or c == client
+    ]
+
+
+def list_clients(df: pd.DataFrame) -> list[str]:
+    if df.empty or 'client_name' not in df.columns:
+        return []
+    return sorted(c for c in df['client_name'].dropna().unique() if c)
+
+
+def list_projects(df: pd.DataFrame, client: str) -> list[str]:
+    if df.empty or 'client_name' not in df.columns:
+        return []
+    df_client = df[df['client_name'] == client]
+    return sorted(p for p in df_client['project_name'].dropna().unique() if p)
+
+
+def select_entries(df: pd.DataFrame, client: str = None, projects: list[str] = None,
+                   query: str = None) -> pd.DataFrame:
+    """
+    Entries of one client (and optionally some of its projects), sorted by date.
+    Without a client, all entries of the period are returned. ``query``
+    restricts them to descriptions matching the search (see search_index).
+    """
+    if df.empty or 'client_name' not in df.columns:
+        return df
+    with phase("filter"):
+        mask = pd.Series(True, index=df.index)
+        if client:
+            mask &= df['client_name'] == client
+        if projects:
+            mask &= df['project_name'].isin(projects)
+        if query:
+            mask &= index_for(df).mask(query)
+        return df[mask].sort_values(by='start', key=lambda x: pd.to_datetime(x, dayfirst=True))
+
+
+def entries_to_records(df: pd.DataFrame) -> list[dict]:
+    if df.empty:
+        return []
+    return df.to_dict(orient='records')
+
+
+def report_filename(df_selected: pd.DataFrame, client: str, projects: list[str]) -> str:
+    dates = pd.to_datetime(df_selected["start"], dayfirst=True)
+    report_projects = projects or list_projects(df_selected, client)
+    return build_pdf_filename(client, report_projects, dates.min(), dates.max())
+
+
+def export_filename(df_selected: pd.DataFrame, client: str, projects: list[str], fmt: str) -> str:
+    """Report filename with the extension of the export format."""
+    if df_selected.empty:
+        return f"Stundenauflistung{EXPORT_FORMATS[fmt][2]}"
+    return report_filename(df_selected, client or "Alle", projects).rsplit(".", 1)[0] + EXPORT_FORMATS[fmt][2]
+
+
+def check_export_format(fmt: str) -> str:
+    if fmt not in available_export_formats():
+        raise ValueError(f"Export format must be one of: {', '.join(available_export_formats())}.")
+    return fmt
+
+
+def render_report(df_selected: pd.DataFrame, client: str, projects: list[str]) -> tuple[bytes, str]:
+    """
+    Render the PDF report for the selected entries.
+    Returns (pdf_bytes, filename).
+    """
+    months_range = get_months_range_string(df_selected)
+    total_hours = df_selected['duration_hours'].sum()
+    data_rows = build_report_rows(df_selected)
+    pdf_bytes = generate_report_pdf_bytes(
+        logo_path=str(LOGO_PATH),
+        company_name=COMPANY_NAME,
+        months_range=months_range,
+        rows=data_rows,
+        total_hours=total_hours
+    )
+
+    return pdf_bytes, report_filename(df_selected, client, projects)
+
+
+def render_bundle(df_period: pd.DataFrame, clients: list[str] = None, by_project: bool = False) -> tuple[bytes, str]:
+    """
+    One PDF with the reports of all (or the given) clients of the period.
+    Returns (pdf_bytes, filename); raises ValueError if there are no entries.
+    """
+    if clients and not df_period.empty:
+        df_period = df_period[df_period['client_name'].isin(clients)]
+    sections = build_report_sections(df_period, by_project=by_project)
+    if not sections:
+        raise ValueError("Keine Einträge gefunden.")
+    pdf_bytes = generate_report_bundle_pdf_bytes(str(LOGO_PATH), COMPANY_NAME, sections)
+    dates = pd.to_datetime(df_period["start"], dayfirst=True)
+    return pdf_bytes, build_pdf_filename("Alle_Clients" if not clients else "_".join(clients), [], dates.min(), dates.max())
+
+
+def render_job(params: dict) -> tuple[bytes, str]:
+    """Render the report described by report_params() (used by the job queue)."""
+    with track_run("job-report"):
+        workspace = resolve_workspace(params.get("workspace"))
+        df_period = load_period(params["start"], params["end"], workspace)
+        df_selected = select_entries(df_period, params["client"], params["projects"])
+        if df_selected.empty:
+            raise ValueError("Keine Einträge gefunden.")
+        return render_report(df_selected, params["client"], params["projects"])
+
+
+def fingerprint(df: pd.DataFrame, *params) -> str:
+    """
+    Content hash of the entries plus the request parameters, used as ETag.
+    Equal data and parameters give the same value in every worker process.
+    """
+    h = hashlib.sha256()
+    h.update(REPORT_VERSION.encode())
+    for p in params:
+        h.update(b"\0" + repr(p).encode("utf-8"))
+    h.update(b"\0" + ",".join(map(str, df.columns)).encode("utf-8"))
+    if not df.empty:
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()[:32]
+
+
+def report_etag(df_selected: pd.DataFrame, workspace_id: str, start_iso: str, end_iso: str,
+                client: str, projects: list[str], query: str = None) -> str:
+    """Fingerprint of one report; also the key of pre-rendered PDFs."""
+    params = ("report", workspace_id, start_iso, end_iso, client, list(projects or []))
+    return fingerprint(df_selected, *params, *((query,) if query else ()))
+
+
+def is_closed_period(end_iso: str) -> bool:
+    """True if the period ended more than CLOSED_PERIOD_GRACE_DAYS ago (no more bookings expected)."""
+    end = datetime.fromisoformat(end_iso.replace("Z", "+00:00"))
+    return end < datetime.now(timezone.utc) - timedelta(days=CLOSED_PERIOD_GRACE_DAYS)
+
+
+def cache_control(end_iso: str) -> str:
+    """
+    Closed periods may be cached by the browser; open periods must be
+    revalidated on every use (answered cheaply with 304 if unchanged). The
+    entries are personal data, so shared caches (proxies, CDNs) must never
+    store them.
+    """
+    if is_closed_period(end_iso):
+        return f"private, max-age={CLOSED_PERIOD_MAX_AGE}"
+    return "private, no-cache"
+
+
+def iter_chunks(data: bytes, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Yield data in chunks for streamed responses."""
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        yield bytes(view[offset:offset + chunk_size])
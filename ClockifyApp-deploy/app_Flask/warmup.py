@@ -0,0 +1,264 @@
+"""
+Scheduled warm-up of the entry cache and pre-rendering of standard reports.
+
+At the configured times the scheduler reloads the configured periods of
+every workspace through get_entries_by_date (replacing whatever the entry
+cache held) and renders the standard report of every client (all
+projects). The PDFs are stored under their report fingerprint, so
+/api/report and the Streamlit app hand them out as long as the data is
+unchanged; a PDF already present in the store is not rendered again.
+
+Every API worker and Streamlit process starts a scheduler, but only the
+one holding the lock file in the prerender directory runs the schedule
+(one process per host; without fcntl, e.g. on Windows, every process runs
+it). The warmed periods stay cached until the next slot of the same period
+if nothing can change them meanwhile: the period is closed, or webhooks
+keep the cache current. Otherwise they expire after the normal TTL and the
+other processes reach the pre-rendered PDFs through their own loads.
+
+The schedule is a JSON list in ``CLOCKIFY_WARMUP_SCHEDULE`` (``[]``
+disables it); each slot has a time, an optional day of month and a period:
+
+    [{"at": "02:00", "period": "current_month"},
+     {"at": "03:00", "day": 1, "period": "previous_month"}]
+
+    python -m app_Flask.warmup [current_month ...]   # warm up once, now
+"""
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import threading
+import logging
+import json
+import time
+import sys
+import os
+
+from main import BASE_DIR, to_iso_format
+from entry_cache import cache_for, load_entries_for_workspaces
+from pipeline_metrics import incr, track_run
+import webhooks
+from . import services
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+logger = logging.getLogger("clockify.warmup")
+
+PRERENDER_DIR = Path(os.environ.get("CLOCKIFY_PRERENDER_DIR", BASE_DIR / "prerendered"))
+PRERENDER_MAX_AGE = int(os.environ.get("CLOCKIFY_PRERENDER_MAX_AGE", 7 * 86400))
+
+DEFAULT_SCHEDULE = [
+    {"at": "02:00", "period": "current_month"},
+    {"at": "03:00", "day": 1, "period": "previous_month"},
+]
+
+
+def _month_bounds(year: int, month: int) -> tuple[date, date]:
+    first = date(year, month, 1)
+    next_first = date(year + month // 12, month % 12 + 1, 1)
+    return first, next_first - timedelta(days=1)
+
+
+PERIODS = {
+    "current_month": lambda today: _month_bounds(today.year, today.month),
+    "previous_month": lambda today: _month_bounds(*(today.replace(day=1) - timedelta(days=1)).timetuple()[:2]),
+}
+
+
+def period_bounds(name: str, today: date) -> tuple[str, str]:
+    """ISO start/end of a named period relative to ``today``."""
+    if name not in PERIODS:
+        raise ValueError(f"Unknown warm-up period '{name}'.")
+    first, last = PERIODS[name](today)
+    return (to_iso_format(first.strftime("%d-%m-%Y"), is_end=False),
+            to_iso_format(last.strftime("%d-%m-%Y"), is_end=True))
+
+
+def load_schedule() -> list[dict]:
+    raw = os.environ.get("CLOCKIFY_WARMUP_SCHEDULE")
+    schedule = json.loads(raw) if raw else DEFAULT_SCHEDULE
+    for slot in schedule:
+        datetime.strptime(slot["at"], "%H:%M")
+        if slot["period"] not in PERIODS:
+            raise ValueError(f"Unknown warm-up period '{slot['period']}'.")
+    return schedule
+
+
+class PrerenderStore:
+    """Pre-rendered report PDFs on disk, keyed by report fingerprint."""
+
+    def __init__(self, directory=PRERENDER_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, etag: str) -> Path:
+        return self.directory / f"{etag}.pdf"
+
+    def get(self, etag: str) -> bytes | None:
+        try:
+            data = self._path(etag).read_bytes()
+        except FileNotFoundError:
+            return None
+        incr("prerender_hits")
+        return data
+
+    def __contains__(self, etag: str) -> bool:
+        return self._path(etag).exists()
+
+    def put(self, etag: str, pdf_bytes: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(etag).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(pdf_bytes)
+        os.replace(tmp, self._path(etag))
+
+    def prune(self, max_age: float = PRERENDER_MAX_AGE) -> int:
+        """Delete PDFs older than max_age seconds; returns how many were removed."""
+        if not self.directory.exists():
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for path in self.directory.glob("*.pdf"):
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def warm_ttl(end_iso: str, keep_until: datetime = None) -> float | None:
+    """
+    Seconds a warmed period stays cached: until ``keep_until`` if the cached
+    entries cannot go stale before (closed period or webhooks enabled),
+    otherwise None for the cache's TTL.
+    """
+    if keep_until is None:
+        return None
+    if not (services.is_closed_period(end_iso) or webhooks.webhooks_enabled()):
+        return None
+    return max((keep_until - datetime.now()).total_seconds(), 0.0)
+
+
+def warm_up(period: str, store: PrerenderStore, today: date = None, keep_until: datetime = None) -> int:
+    """
+    Reload ``period`` for every configured workspace and pre-render the
+    standard report of each client. The loads are cached until
+    ``keep_until`` where possible (see warm_ttl). Returns the number of
+    rendered PDFs.
+    """
+    start_iso, end_iso = period_bounds(period, today or date.today())
+    ttl = warm_ttl(end_iso, keep_until)
+    workspaces = services.WORKSPACES
+    with track_run("warmup"):
+        for workspace in workspaces:
+            cache_for(workspace.id).invalidate((workspace.id, start_iso, end_iso))
+        # All workspaces at once, each within its own rate limit
+        frames = load_entries_for_workspaces(start_iso, end_iso, workspaces, ttl=ttl)
+
+    rendered = 0
+    for workspace in workspaces:
+        df_period = frames[workspace.id]
+        with track_run("warmup"):
+            for client in services.list_clients(df_period):
+                df_selected = services.select_entries(df_period, client)
+                etag = services.report_etag(df_selected, workspace.id, start_iso, end_iso, client, [])
+                if etag in store:
+                    continue
+                pdf_bytes, _ = services.render_report(df_selected, client, [])
+                store.put(etag, pdf_bytes)
+                rendered += 1
+        logger.info("Warm-up %s (%s): %d entries, %d reports rendered",
+                    period, workspace.label, len(df_period), rendered)
+    return rendered
+
+
+class WarmupScheduler:
+    """
+    Background thread running warm_up() at the times of the schedule, in
+    the process holding the scheduler lock of the store directory.
+    """
+
+    def __init__(self, schedule: list[dict] = None, store: PrerenderStore = None):
+        self.schedule = load_schedule() if schedule is None else schedule
+        self.store = store or PrerenderStore()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock_file = None
+
+    def next_run(self, now: datetime, period: str = None) -> tuple[datetime, dict] | None:
+        """
+        The next (time, slot) after ``now``, only of slots of ``period`` if
+        given; None if no slot matches.
+        """
+        candidates = []
+        for slot in self.schedule:
+            if period is not None and slot["period"] != period:
+                continue
+            at = datetime.strptime(slot["at"], "%H:%M").time()
+            day = now.date()
+            # 62 days always contain the next matching day of month
+            for _ in range(62):
+                run_at = datetime.combine(day, at)
+                if run_at > now and slot.get("day", day.day) == day.day:
+                    candidates.append((run_at, slot))
+                    break
+                day += timedelta(days=1)
+        return min(candidates, key=lambda c: c[0]) if candidates else None
+
+    def start(self):
+        if self._thread is not None or not self.schedule:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="warmup-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def acquire_lock(self) -> bool:
+        """
+        True if this scheduler holds the lock of the store directory (taken
+        on the first call and kept until stop()). Retried at every slot, so
+        another process takes over when the holder exits.
+        """
+        if self._lock_file is not None or fcntl is None:
+            return True
+        self.store.directory.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.store.directory / "scheduler.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _run(self):
+        while True:
+            run_at, slot = self.next_run(datetime.now())
+            # Sleep in steps so clock changes (DST, suspend) are noticed
+            while (remaining := (run_at - datetime.now()).total_seconds()) > 0:
+                if self._stop.wait(min(remaining, 60)):
+                    return
+            if not self.acquire_lock():
+                logger.debug("Warm-up of %s runs in another process", slot["period"])
+                continue
+            try:
+                self.store.prune()
+                keep_until, _ = self.next_run(datetime.now(), slot["period"])
+                warm_up(slot["period"], self.store, keep_until=keep_until)
+            except Exception:
+                logger.exception("Warm-up of %s failed", slot["period"])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    for name in sys.argv[1:] or sorted({slot["period"] for slot in load_schedule()}):
+        print(f"{name}: {warm_up(name, PrerenderStore())} Reports vorgerendert")
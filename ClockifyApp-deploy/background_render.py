@@ -0,0 +1,72 @@
+"""
+PDF rendering in a worker thread, for the Streamlit app.
+
+``BackgroundRender`` runs generate_report_pdf_bytes() on the render pool, so
+the Streamlit script keeps answering while a large report is built. The UI
+polls ``progress()`` (pages done, estimated pages) while ``done`` is False
+and reads ``result`` / ``error`` afterwards; ``cancel()`` stops the render
+at the next page.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import os
+
+from main import generate_report_pdf_bytes
+from pipeline_metrics import activate
+
+
+RENDER_WORKERS = int(os.environ.get("CLOCKIFY_RENDER_WORKERS", 2))
+
+_RENDER_EXECUTOR = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="pdf-render")
+
+
+class BackgroundRender:
+    """generate_report_pdf_bytes() running on the render pool."""
+
+    def __init__(self, logo_path, company_name, months_range, rows, total_hours, run=None, profiler=None):
+        self.result: bytes | None = None
+        self.error: BaseException | None = None
+        self._args = (logo_path, company_name, months_range, rows, total_hours)
+        self._run = run
+        self._profiler = profiler
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._page = 0
+        self._pages = None
+        self._future = _RENDER_EXECUTOR.submit(self._render)
+
+    def _progress(self, page: int, pages: int):
+        with self._lock:
+            self._page, self._pages = page, pages
+
+    def _render(self):
+        if self._profiler:
+            self._profiler.start()
+        try:
+            with activate(self._run):
+                self.result = generate_report_pdf_bytes(
+                    *self._args,
+                    progress=self._progress,
+                    should_stop=self._cancel.is_set
+                )
+        except BaseException as e:
+            self.error = e
+        finally:
+            if self._profiler:
+                self._profiler.stop()
+
+    @property
+    def done(self) -> bool:
+        return self._future.done()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def progress(self) -> tuple[int, int | None]:
+        """(pages started, estimated pages); pages is None until the first page."""
+        with self._lock:
+            return self._page, self._pages
@@ -0,0 +1,366 @@
+"""
+Process-wide cache of loaded time entries, shared by all sessions.
+
+Entries are cached per (workspace, start, end) for ``CLOCKIFY_CACHE_TTL``
+seconds. Every workspace has its own cache partition (``cache_for``) with its
+own LRU budget, so a busy tenant cannot evict the periods of another.
+
+Loads are single-flight: while one caller fetches a period, every other
+caller asking for the same key waits for that result instead of sending its
+own API requests. Failed loads are not cached; all waiting callers receive
+the same exception.
+
+Cached DataFrames are shared between sessions and must be treated as
+read-only (filter into new frames, never modify them in place). Webhook
+deltas (see webhooks.py) replace a cached frame by an updated copy.
+
+``BackgroundLoad`` runs such a load in a worker thread and exposes per-user
+progress, the entries loaded so far and cancellation to the Streamlit app.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import threading
+import time
+import os
+
+import pandas as pd
+
+from main import (
+    DEFAULT_WORKSPACE,
+    LoadCancelled,
+    Workspace,
+    get_entries_by_date,
+    get_entries_for_workspaces,
+)
+from pipeline_metrics import incr, activate, phase, publish
+from search_index import index_for
+
+
+DEFAULT_TTL = int(os.environ.get("CLOCKIFY_CACHE_TTL", 300))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("CLOCKIFY_CACHE_MAX_ENTRIES", 32))
+LOAD_WORKERS = int(os.environ.get("CLOCKIFY_LOAD_WORKERS", 4))
+
+# Interval in which waiting callers check whether they were cancelled
+WAIT_POLL_SECONDS = 0.1
+
+
+class CacheEntry:
+    """
+    A loaded value and the time it was loaded. ``totals`` holds the hours per
+    (client, project) of a cached entry frame once computed (see period_totals).
+    """
+
+    def __init__(self, value, loaded_at: float, expires_at: float, totals: dict = None):
+        self.value = value
+        self.loaded_at = loaded_at
+        self.expires_at = expires_at
+        self.totals = totals
+
+
+class _Flight:
+    """A load in progress that other callers can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry: CacheEntry | None = None
+        self.error: BaseException | None = None
+        # Set when an update arrived during the load; the result is then not cached
+        self.stale = False
+
+
+class EntryCache:
+    """TTL + LRU cache with single-flight loading."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._inflight: dict = {}
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+
+    def get_entry(self, key) -> CacheEntry | None:
+        """Return the fresh entry for ``key`` or None, without loading."""
+        with self._lock:
+            return self._fresh_entry(key)
+
+    def _fresh_entry(self, key) -> CacheEntry | None:
+        """get_entry() for callers holding self._lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_or_load(self, key, loader, should_stop=None, ttl: float = None):
+        """
+        Return the cached value for ``key``, calling ``loader()`` at most once
+        per miss. A load of this call is kept for ``ttl`` seconds (default:
+        the cache's TTL).
+        """
+        return self.get_or_load_entry(key, loader, should_stop, ttl).value
+
+    def get_or_load_entry(self, key, loader, should_stop=None, ttl: float = None) -> CacheEntry:
+        """
+        Like get_or_load() but returns the CacheEntry. A caller waiting for
+        another caller's load raises LoadCancelled as soon as should_stop()
+        returns True; if the running load itself was cancelled, the waiter
+        takes over and loads the key.
+        """
+        while True:
+            # Cache lookup and flight creation under one lock acquisition, so a
+            # caller arriving just after a leader finished gets its result
+            # instead of starting a second load
+            with self._lock:
+                entry = self._fresh_entry(key)
+                if entry is None:
+                    flight = self._inflight.get(key)
+                    leader = flight is None
+                    if leader:
+                        flight = self._inflight[key] = _Flight()
+
+            if entry is not None:
+                incr("cache_hits")
+                return entry
+            if leader:
+                break
+
+            incr("cache_waits")
+            while not flight.done.wait(WAIT_POLL_SECONDS):
+                if should_stop and should_stop():
+                    raise LoadCancelled(f"Wait for {key} cancelled")
+            if isinstance(flight.error, LoadCancelled):
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.entry
+
+        incr("cache_misses")
+        try:
+            value = loader()
+            now = time.time()
+            flight.entry = CacheEntry(value, loaded_at=now, expires_at=now + (self.ttl if ttl is None else ttl))
+            with self._lock:
+                stale = flight.stale
+            if not stale:
+                self.put_entry(key, flight.entry)
+            return flight.entry
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def put_entry(self, key, entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def update(self, fn) -> int:
+        """
+        Replace cached entries by ``fn(key, entry)``, which returns a new
+        CacheEntry or None to keep the entry. Loads running meanwhile are
+        returned to their callers but not cached, since they may predate the
+        update. Returns the number of replaced entries.
+        """
+        with self._update_lock:
+            with self._lock:
+                current = dict(self._entries)
+                for flight in self._inflight.values():
+                    flight.stale = True
+
+            updated = {}
+            for key, entry in current.items():
+                new_entry = fn(key, entry)
+                if new_entry is not None:
+                    updated[key] = new_entry
+
+            with self._lock:
+                for key, new_entry in updated.items():
+                    # Skip keys evicted or reloaded while fn was running
+                    if self._entries.get(key) is current[key]:
+                        self._entries[key] = new_entry
+            return len(updated)
+
+    def totals(self, entry: CacheEntry, compute) -> dict:
+        """
+        ``entry.totals``, set to ``compute(entry.value)`` on first use. Runs
+        under the update lock, so update() never sees the totals of an entry
+        change while its delta function reads them.
+        """
+        with self._update_lock:
+            if entry.totals is None:
+                entry.totals = compute(entry.value)
+            return entry.totals
+
+    def invalidate(self, key=None):
+        """Drop ``key`` (or everything) from the cache; running loads are not affected."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+_CACHES: dict[str, EntryCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def cache_for(workspace_id: str) -> EntryCache:
+    """The cache partition of one workspace."""
+    with _CACHES_LOCK:
+        cache = _CACHES.get(workspace_id)
+        if cache is None:
+            cache = _CACHES[workspace_id] = EntryCache()
+        return cache
+
+
+def invalidate_all():
+    """Drop the cached entries of every workspace partition."""
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    for cache in caches:
+        cache.invalidate()
+
+
+ENTRY_CACHE = cache_for(DEFAULT_WORKSPACE.id)
+
+
+_LOAD_EXECUTOR = ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix="entry-loader")
+
+
+def load_entries(start_iso: str, end_iso: str, progress=None, should_stop=None,
+                 workspace: Workspace = None, ttl: float = None):
+    """
+    get_entries_by_date() through the workspace's cache partition (default
+    workspace if None). progress and should_stop are passed on to
+    get_entries_by_date() if this call performs the load; ttl overrides the
+    cache's TTL for it.
+    """
+    workspace = workspace or DEFAULT_WORKSPACE
+    key = (workspace.id, start_iso, end_iso)
+
+    def load():
+        df = get_entries_by_date(start_iso, end_iso, progress=progress, should_stop=should_stop,
+                                 workspace=workspace)
+        # Built once per load and shared with every user of the cached frame
+        with phase("index"):
+            index_for(df)
+        return df
+
+    return cache_for(workspace.id).get_or_load(key, load, should_stop=should_stop, ttl=ttl)
+
+
+def totals_of(df: pd.DataFrame) -> dict[tuple[str, str], float]:
+    """Hours per (client, project) of an entry frame."""
+    if df.empty or 'client_name' not in df.columns:
+        return {}
+    grouped = df.groupby(['client_name', 'project_name'])['duration_hours'].sum()
+    return {key: float(hours) for key, hours in grouped.items()}
+
+
+def period_totals(start_iso: str, end_iso: str, workspace: Workspace = None) -> dict[tuple[str, str], float]:
+    """
+    Hours per (client, project) of a period, computed once per cached frame
+    and kept current by webhook deltas.
+    """
+    workspace = workspace or DEFAULT_WORKSPACE
+    cache = cache_for(workspace.id)
+    entry = cache.get_or_load_entry(
+        (workspace.id, start_iso, end_iso),
+        lambda: get_entries_by_date(start_iso, end_iso, workspace=workspace)
+    )
+    return cache.totals(entry, totals_of)
+
+
+def load_entries_for_workspaces(start_iso: str, end_iso: str, workspaces: list[Workspace],
+                                ttl: float = None) -> dict[str, pd.DataFrame]:
+    """load_entries() for several workspaces at once, fetched concurrently on cache misses."""
+    def loader(start_iso, end_iso, workspace):
+        return load_entries(start_iso, end_iso, workspace=workspace, ttl=ttl)
+
+    return get_entries_for_workspaces(start_iso, end_iso, workspaces, loader=loader)
+
+
+class BackgroundLoad:
+    """
+    load_entries() running on the loader pool.
+
+    The UI polls ``progress()`` and ``partial_frame()`` while ``done`` is
+    False and reads ``result`` / ``error`` afterwards. ``cancel()`` stops the
+    load before the next user is fetched (or stops waiting for another
+    session's load of the same period).
+    """
+
+    def __init__(self, start_iso: str, end_iso: str, run=None, profiler=None, workspace: Workspace = None):
+        self.start_iso = start_iso
+        self.end_iso = end_iso
+        self.workspace = workspace
+        self.result: pd.DataFrame | None = None
+        self.error: BaseException | None = None
+        self._run = run
+        self._profiler = profiler
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._frames: list[pd.DataFrame] = []
+        self._done_users = 0
+        self._total_users = None
+        self.version = 0
+        self._future = _LOAD_EXECUTOR.submit(self._load)
+
+    def _progress(self, done: int, total: int, frame):
+        with self._lock:
+            self._done_users, self._total_users = done, total
+            if frame is not None:
+                self._frames.append(frame)
+                self.version += 1
+
+    def _load(self):
+        if self._profiler:
+            self._profiler.start()
+        try:
+            with activate(self._run):
+                self.result = load_entries(
+                    self.start_iso, self.end_iso,
+                    progress=self._progress,
+                    should_stop=self._cancel.is_set,
+                    workspace=self.workspace
+                )
+        except BaseException as e:
+            self.error = e
+        finally:
+            if self._profiler:
+                self._profiler.stop()
+            if self._run is not None:
+                publish(self._run)
+
+    @property
+    def done(self) -> bool:
+        return self._future.done()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def progress(self) -> tuple[int, int | None]:
+        """(users loaded, total users); total is None until the user list is known."""
+        with self._lock:
+            return self._done_users, self._total_users
+
+    def partial_frame(self) -> pd.DataFrame:
+        """Entries of the users loaded so far (the full result once done)."""
+        if self.result is not None:
+            return self.result
+        with self._lock:
+            frames = list(self._frames)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
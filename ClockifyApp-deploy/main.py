@@ -1,29 +1,43 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.enums import TA_LEFT
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import mm
-from babel.dates import format_date
-import pandas as pd
-import requests
-import locale
+from typing import TYPE_CHECKING
+import contextvars
+import threading
+import logging
+import json
+import time
 import sys
 import re
 import os
 
+from pipeline_metrics import phase, incr, track_run
+from profiling import StackSampler, profiling_enabled
+
+# pandas, requests, reportlab and babel are imported where they are used, so
+# importing this module (Streamlit reruns, CLI start, worker processes) stays
+# cheap and the PDF/Babel stack is only loaded when a report is built.
+if TYPE_CHECKING:
+    import pandas as pd
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import Table
+
 
 
 
-API_KEY      = 'NmYxYzcxZDItYTk2OS00MjljLTlhMzktYWE2ZWRmZTg0Njc5'
-WORKSPACE_ID = '66052c545402842181578e74'
-BASE_URL     = "https://api.clockify.me/api/v1"
+API_KEY      = os.environ.get("CLOCKIFY_API_KEY", 'NmYxYzcxZDItYTk2OS00MjljLTlhMzktYWE2ZWRmZTg0Njc5')
+WORKSPACE_ID = os.environ.get("CLOCKIFY_WORKSPACE_ID", '66052c545402842181578e74')
+BASE_URL     = os.environ.get("CLOCKIFY_BASE_URL", "https://api.clockify.me/api/v1")
 HEADERS      = {'X-Api-Key': API_KEY, 'Content-Type': 'application/json'}
 
+# Clockify allows 50 requests per second per workspace
+RATE_LIMIT = float(os.environ.get("CLOCKIFY_RATE_LIMIT", 50))
+
 BASE_DIR = Path(__file__).resolve().parent
 TEMPLATE_DIR = BASE_DIR / "app_Flask" / "templates"
 STATIC_DIR = BASE_DIR / "static"
@@ -35,6 +49,108 @@ CSS_PATH = STATIC_DIR / "styles.css"
 
 PAGE_SIZE = 1000
 
+DESCRIPTION_COL_WIDTH_MM = 55
+
+# Rows converted per step by the raw data exports
+EXPORT_CHUNK_ROWS = 20_000
+
+# Entry columns of the raw data exports and their headers
+EXPORT_COLUMNS = {
+    'start':          'Datum',
+    'user_name':      'Mitarbeiter',
+    'client_name':    'Client',
+    'project_name':   'Projekt',
+    'task_name':      'Aufgabe',
+    'description':    'Beschreibung',
+    'duration_hours': 'Stunden',
+}
+
+
+class LoadCancelled(Exception):
+    """Raised by get_entries_by_date() when should_stop() asks it to stop."""
+
+
+class RenderCancelled(Exception):
+    """Raised by generate_report_pdf_bytes() when should_stop() asks it to stop."""
+
+
+@dataclass(frozen=True)
+class Workspace:
+    """Connection settings of one Clockify workspace (tenant)."""
+    id: str
+    api_key: str
+    name: str = ""
+    base_url: str = BASE_URL
+    rate_limit: float = RATE_LIMIT
+
+    @property
+    def label(self) -> str:
+        return self.name or self.id
+
+    @property
+    def headers(self) -> dict:
+        return {'X-Api-Key': self.api_key, 'Content-Type': 'application/json'}
+
+
+DEFAULT_WORKSPACE = Workspace(id=WORKSPACE_ID, api_key=API_KEY)
+
+
+def load_workspaces() -> list[Workspace]:
+    """
+    Configured workspaces, read as a JSON list of objects with the Workspace
+    fields (id, api_key, optional name, base_url, rate_limit) from
+    CLOCKIFY_WORKSPACES or the file named in CLOCKIFY_WORKSPACES_FILE.
+    Without configuration, the single default workspace is returned.
+    """
+    raw = os.environ.get("CLOCKIFY_WORKSPACES")
+    path = os.environ.get("CLOCKIFY_WORKSPACES_FILE")
+    if not raw and path:
+        raw = Path(path).read_text(encoding="utf-8")
+    if not raw:
+        return [DEFAULT_WORKSPACE]
+    return [Workspace(**cfg) for cfg in json.loads(raw)]
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `rate` requests per second (bursts up to `rate`).
+    clock and sleep default to time.monotonic and time.sleep.
+    """
+
+    def __init__(self, rate: float, clock=None, sleep=None):
+        self.rate = rate
+        self._clock = clock or time.monotonic
+        self._sleep = sleep or time.sleep
+        self._tokens = rate
+        self._updated = self._clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+_rate_limiters: dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def rate_limiter_for(workspace: Workspace) -> RateLimiter:
+    """The request budget of a workspace, shared by all loads in this process."""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(workspace.id)
+        if limiter is None:
+            limiter = _rate_limiters[workspace.id] = RateLimiter(workspace.rate_limit)
+        return limiter
+
+
 def to_iso_format(date_str: str, is_end=False) -> str:
     """
     Parse a human-friendly date string in formats:
@@ -73,11 +189,16 @@ def to_iso_format(date_str: str, is_end=False) -> str:
     return dt.isoformat(timespec="seconds") + "Z"
 
 
-def fetch_all(endpoint: str, params: dict = None) -> list:
+def fetch_all(endpoint: str, params: dict = None, workspace: Workspace = None) -> list:
     """
     Fetch all pages from Clockify API. Returns a flat list of JSON objects.
-    Raises RequestException on network or HTTP errors.
+    Requests use the workspace's API key and rate limit (default workspace
+    if None). Raises RequestException on network or HTTP errors.
     """
+    import requests
+
+    workspace = workspace or DEFAULT_WORKSPACE
+    limiter = rate_limiter_for(workspace)
     items = []
     page = 1
     session = requests.Session()
@@ -87,78 +208,137 @@ def fetch_all(endpoint: str, params: dict = None) -> list:
         query = {**default_params, "page": page}
         if params:
             query.update(params)
-        resp = session.get(f"{BASE_URL}{endpoint}",
-                           headers=HEADERS,
+        limiter.acquire()
+        resp = session.get(f"{workspace.base_url}{endpoint}",
+                           headers=workspace.headers,
                            params=query,
                            timeout=10)
         resp.raise_for_status()
-        batch = resp.json()
+        incr("requests")
+        incr("bytes", len(resp.content))
+        with phase("json_decode"):
+            batch = resp.json()
         if not batch:
             break
+        incr("pages")
         items.extend(batch)
         page += 1
 
     return items
 
 
-def get_entries_by_date(start_iso: str, end_iso: str) -> pd.DataFrame:
+def get_entries_by_date(start_iso: str, end_iso: str, progress=None, should_stop=None,
+                        workspace: Workspace = None) -> pd.DataFrame:
     """
     Return a DataFrame of all time entries between start_iso and end_iso,
-    including client_id and project_id for downstream logic.
+    including client_id and project_id for downstream logic. Entries are
+    loaded from the given workspace (default workspace if None).
+
+    progress(done, total, frame) is called after each user has been loaded
+    (frame is None if the user has no entries in the period). should_stop()
+    is checked before each user; if it returns True, LoadCancelled is raised.
     """
-    users = fetch_all(f"/workspaces/{WORKSPACE_ID}/users")
+    import pandas as pd
+
+    workspace = workspace or DEFAULT_WORKSPACE
+    with phase("list_users"):
+        users = fetch_all(f"/workspaces/{workspace.id}/users", workspace=workspace)
     if not users:
         return pd.DataFrame()
 
     frames = []
-    for user in users:
+    for done, user in enumerate(users, 1):
+        if should_stop and should_stop():
+            raise LoadCancelled(f"Load {start_iso} … {end_iso} cancelled")
+
         # Fetch this user's time entries in the given date range
-        entries = fetch_all(
-            f"/workspaces/{WORKSPACE_ID}/user/{user['id']}/time-entries",
-            params={"start": start_iso, "end": end_iso}
-        )
-        if not entries:
-            continue
+        with phase("fetch_entries"):
+            entries = fetch_all(
+                f"/workspaces/{workspace.id}/user/{user['id']}/time-entries",
+                params={"start": start_iso, "end": end_iso},
+                workspace=workspace
+            )
+        frame = None
+        if entries:
+            incr("entries", len(entries))
+            with phase("normalize"):
+                frame = normalize_entries(entries, user['name'])
+            frames.append(frame)
 
-        # Normalize JSON into a flat DataFrame
-        df = pd.json_normalize(entries, sep='.')
-
-        # Extract IDs for later use
-        df['description'] = df.get('description', pd.NA).fillna('').astype(str)
-        df['client_id']  = df.get('project.clientId', pd.NA).fillna('').astype(str)
-        df['project_id'] = df.get('projectId',       pd.NA).fillna('').astype(str)
-
-        # Add user, client, project and task names
-        df['user_name']    = user['name']
-        df['client_name']  = df.get('project.clientName', '').fillna('').astype(str)
-        df['project_name'] = df.get('project.name',       '').fillna('').astype(str)
-        df['task_name'] = df.get('task.name', pd.Series(dtype='object')).fillna('Allgemein').replace('', 'Allgemein').astype(str)
-
-
-        # Format the start timestamp as DD.MM.YYYY
-        df['start'] = pd.to_datetime(df['timeInterval.start'], errors='coerce').dt.strftime('%d.%m.%Y')
-
-        # Calculate duration in hours as a float
-        df['duration_hours'] = (
-            pd.to_datetime(df['timeInterval.end'])
-          - pd.to_datetime(df['timeInterval.start'])
-        ).dt.total_seconds() / 3600
-
-        # Keep only the columns we need downstream
-        frames.append(df[[
-            'description',
-            'user_name',
-            'client_id',
-            'client_name',
-            'project_id',
-            'project_name',
-            'task_name',
-            'start',
-            'duration_hours'
-        ]])
+        if progress:
+            progress(done, len(users), frame)
 
     # Combine all user frames into one DataFrame, or return empty if none
-    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    with phase("normalize"):
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def get_entries_for_workspaces(start_iso: str, end_iso: str, workspaces: list[Workspace],
+                               loader=None) -> dict[str, pd.DataFrame]:
+    """
+    Load the period from several workspaces concurrently (one thread per
+    workspace, each bound by its own rate limit). Returns {workspace id: entries}.
+    loader(start_iso, end_iso, workspace=...) defaults to get_entries_by_date.
+    """
+    loader = loader or get_entries_by_date
+    if not workspaces:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(workspaces), thread_name_prefix="workspace-loader") as pool:
+        # copy_context keeps the active metrics run in the worker threads
+        futures = {
+            ws.id: pool.submit(contextvars.copy_context().run, loader, start_iso, end_iso, workspace=ws)
+            for ws in workspaces
+        }
+        return {ws_id: future.result() for ws_id, future in futures.items()}
+
+
+def normalize_entries(entries: list[dict], user_name: str) -> pd.DataFrame:
+    """
+    Flatten one user's hydrated time entries into the report columns.
+    """
+    import pandas as pd
+
+    # Normalize JSON into a flat DataFrame
+    df = pd.json_normalize(entries, sep='.')
+    # Stand-in for fields absent from every entry (e.g. no entry has a project)
+    missing = pd.Series('', index=df.index, dtype='object')
+
+    # Extract IDs for later use (entry_id / user_id identify rows for webhook updates)
+    df['entry_id']    = df.get('id', missing).fillna('').astype(str)
+    df['user_id']     = df.get('userId', missing).fillna('').astype(str)
+    df['description'] = df.get('description', missing).fillna('').astype(str)
+    df['client_id']  = df.get('project.clientId', missing).fillna('').astype(str)
+    df['project_id'] = df.get('projectId', missing).fillna('').astype(str)
+
+    # Add user, client, project and task names
+    df['user_name']    = user_name
+    df['client_name']  = df.get('project.clientName', missing).fillna('').astype(str)
+    df['project_name'] = df.get('project.name', missing).fillna('').astype(str)
+    df['task_name'] = df.get('task.name', missing).fillna('Allgemein').replace('', 'Allgemein').astype(str)
+
+    # Format the start timestamp as DD.MM.YYYY
+    df['start'] = pd.to_datetime(df['timeInterval.start'], errors='coerce').dt.strftime('%d.%m.%Y')
+
+    # Calculate duration in hours as a float
+    df['duration_hours'] = (
+        pd.to_datetime(df['timeInterval.end'])
+      - pd.to_datetime(df['timeInterval.start'])
+    ).dt.total_seconds() / 3600
+
+    # Keep only the columns we need downstream
+    return df[[
+        'description',
+        'user_name',
+        'client_id',
+        'client_name',
+        'project_id',
+        'project_name',
+        'task_name',
+        'start',
+        'duration_hours',
+        'entry_id',
+        'user_id'
+    ]]
 
 
 def build_client_name_map(clients: list[dict]) -> dict[str, list[str]]:
@@ -390,6 +570,33 @@ def get_data(client: str, project: str, start: str, end: str) -> pd.DataFrame:
     return df_proj
 
 
+def description_cell(text: str, cell_style: ParagraphStyle, col_width: float = None):
+    """
+    Return the table cell for a description.
+
+    Text that fits on one line of the column is returned as a plain string,
+    which the table draws directly with the same font, leading and padding
+    as the paragraph would. Only text that needs wrapping (or contains
+    markup / irregular whitespace that Paragraph would reinterpret) is
+    wrapped in a Paragraph, which is much more expensive to lay out.
+    """
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.platypus import Paragraph
+    from reportlab.lib.units import mm
+
+    if col_width is None:
+        col_width = DESCRIPTION_COL_WIDTH_MM*mm
+    text = str(text)
+    avail_width = col_width - 12  # default left + right cell padding (6 pt each)
+    if (
+        '<' not in text and '&' not in text
+        and ' '.join(text.split()) == text
+        and stringWidth(text, cell_style.fontName, cell_style.fontSize) < avail_width
+    ):
+        return text
+    return Paragraph(text, cell_style)
+
+
 def generate_report_pdf(
     output_file,
     logo_path,
@@ -398,19 +605,46 @@ def generate_report_pdf(
     rows,
     total_hours
 ):
-    doc = SimpleDocTemplate(
-        output_file,
-        pagesize=A4,
-        leftMargin=18*mm,
-        rightMargin=10*mm,
-        topMargin=10*mm,
-        bottomMargin=10*mm
+    """
+    Generates the PDF and writes it to output_file.
+    """
+    pdf_bytes = generate_report_pdf_bytes(
+        logo_path=logo_path,
+        company_name=company_name,
+        months_range=months_range,
+        rows=rows,
+        total_hours=total_hours
     )
+    Path(output_file).write_bytes(pdf_bytes)
+    print(f"✅ PDF wurde erstellt: {output_file}")
 
-    styles = getSampleStyleSheet()
-    elements = []
 
-    # HEADER
+def build_logo(logo_path):
+    """
+    The logo as image flowable, or '' if it is missing or unreadable. One
+    instance can be placed on many pages; its image data is read once.
+    """
+    from reportlab.platypus import Image
+    from reportlab.lib.units import mm
+
+    if logo_path and Path(logo_path).exists():
+        try:
+            return Image(logo_path, width=25*mm, height=15*mm)
+        except Exception as e:
+            print(f"[WARN] Logo konnte nicht geladen werden: {e}")
+    return ''
+
+
+def build_header_elements(logo_path, company_name, logo=None) -> list:
+    """
+    Company name on the left, logo on the right, followed by a spacer.
+    ``logo`` is a flowable from build_logo() to share between several headers.
+    """
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.enums import TA_LEFT
+    from reportlab.lib.units import mm
+
     header_table_data = []
     header_row = []
 
@@ -420,85 +654,106 @@ def generate_report_pdf(
             name='Company',
             fontSize=14,
             alignment=TA_LEFT,
-            wordWrap='None',       # отключаем переносы (можно 'None' или 'CJK' для блокировки)
-            splitLongWords=False, # запрещаем разрезать слова
+            leading=16,
+            wordWrap='None',
+            splitLongWords=False,
             allowWidows=0,
-            allowOrphans=0,
-            leading=16                # высота строки (чтобы строки не слипались)       
+            allowOrphans=0
         )
-    ))  
+    ))
 
-    if logo_path and Path(logo_path).exists():
-        try:
-            img = Image(logo_path, width=25*mm, height=15*mm)
-            header_row.append(img)
-        except Exception as e:
-            print(f"[WARN] Logo konnte nicht geladen werden: {e}")
-            header_row.append('')
-    else:
-        header_row.append('')
+    header_row.append(build_logo(logo_path) if logo is None else logo)
 
     header_table_data.append(header_row)
 
     header_table = Table(header_table_data, colWidths=[120*mm, None])
     header_table.setStyle(TableStyle([
         ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('ALIGN', (0,0), (0,0), 'LEFT'),   # Название — слева
-        ('ALIGN', (1,0), (1,0), 'RIGHT'),  # Логотип — справа
+        ('ALIGN', (0,0), (0,0), 'LEFT'),
+        ('ALIGN', (1,0), (1,0), 'RIGHT'),
         ('BOTTOMPADDING', (0,0), (-1,-1), 0),
         ('TOPPADDING', (0,0), (-1,-1), 0),
     ]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 24))
+    return [header_table, Spacer(1, 24)]
+
+
+def build_title_elements(months_range, subtitle: str = None) -> list:
+    """
+    'Stundenaufstellung <months_range>' in bold (and an optional subtitle
+    line, e.g. client and projects), followed by a spacer.
+    """
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.enums import TA_LEFT
+    from reportlab.lib.units import mm
+    from xml.sax.saxutils import escape
 
-    # TITLE
     title_style = ParagraphStyle(
         name='Title',
         fontSize=12,
-        leading=14,         # высота строки
-        alignment=TA_LEFT,  # выравнивание слева
-        spaceAfter=14,      # отступ снизу после заголовка
-        fontName='Helvetica-bold'  # жирный шрифт
+        leading=14,
+        alignment=TA_LEFT,
+        spaceAfter=14,
+        fontName='Helvetica-bold'
     )
     title_text = f"Stundenaufstellung {months_range}"
     title_para = Paragraph(title_text, title_style)
-    # Оборачиваем параграф в таблицу для дополнительного управления выравниванием и стилями
-    title_table = Table([[title_para]], colWidths=[180*mm])  # ширина таблицы по желанию
+    title_rows = [[title_para]]
+    if subtitle:
+        subtitle_style = ParagraphStyle(name='Subtitle', parent=title_style, fontName='Helvetica', spaceAfter=0)
+        title_rows.append([Paragraph(escape(subtitle), subtitle_style)])
+    # Wrap the paragraph in a table to control alignment and padding
+    title_table = Table(title_rows, colWidths=[180*mm])
     title_table.setStyle(TableStyle([
         ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('ALIGN', (2,1), (-1,-2), 'CENTER'),
         ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
         ('TOPPADDING', (0, 0), (-1, -1), 0),
-        # Убрать GRID или поставить тонкую серую линию, если нужно
-        # ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
     ]))
-    # Добавляем в список элементов для сборки PDF
-    elements.append(title_table)
-    elements.append(Spacer(1, 24))  # Отступ после заголовка
+    return [title_table, Spacer(1, 24)]
+
+
+def build_entries_table(rows, total_hours, row_offset: int = 0) -> Table:
+    """
+    The entries table: header row (repeated on every page), one row per
+    entry with alternating background and the bold 'Gesamtaufwand' row.
+
+    For a part of a larger table (see parallel_render), row_offset is the
+    index of the first row in the whole table (keeps the alternating
+    background in step) and total_hours None leaves out the total row.
+    """
+    from reportlab.platypus import Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_LEFT
+    from reportlab.lib import colors
+    from reportlab.lib.units import mm
 
-    # TABLE 
+    styles = getSampleStyleSheet()
     cell_style = ParagraphStyle(
         name='BodyTextLeft',
         parent=styles['BodyText'],
         alignment=TA_LEFT,
-        wordWrap='CJK', # перенос по словам
+        wordWrap='CJK',
         leading=12,
     )
     table_data = [['Beschreibung', 'Aufgabe', 'Datum', 'Dauer']]
 
     for row in rows:
-        beschreibung_paragraph = Paragraph(row[0], cell_style)
+        beschreibung = description_cell(row[0], cell_style)
         aufgabe = row[1]
         datum = row[2]
         dauer = row[3]
-        table_data.append([beschreibung_paragraph, aufgabe, datum, dauer])
-    table_data.append(['Gesamtaufwand:', '', '', f"{total_hours:.2f}".replace('.', ',') + " h"])
+        table_data.append([beschreibung, aufgabe, datum, dauer])
 
-    tbl = Table(table_data, colWidths=[55*mm, 40*mm, 40*mm, 40*mm], repeatRows=1)
+    if total_hours is not None:
+        table_data.append(['Gesamtaufwand:', '', '', f"{total_hours:.2f}".replace('.', ',') + " h"])
+    # Last entry row: before the total row, if there is one
+    last = -2 if total_hours is not None else -1
+
+    tbl = Table(table_data, colWidths=[DESCRIPTION_COL_WIDTH_MM*mm, 40*mm, 40*mm, 40*mm], repeatRows=1)
 
     style = TableStyle([
-        # Шапка — жирный, все колонки по центру вертикально
+        # Header: bold, vertically centred
         ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
         ('VALIGN', (0,0), (-1,0), 'MIDDLE'),
         ('BACKGROUND', (0,0), (-1,0), colors.white),
@@ -506,49 +761,60 @@ def generate_report_pdf(
         ('FONTSIZE', (0,0), (-1,0), 10),
         ('ALIGN', (0,0), (0,0), 'LEFT'),
         ('VALIGN', (0,0), (0,0), 'MIDDLE'),
-
-        # В шапке колонки 2, 3 и 4 по центру горизонтально
         ('ALIGN', (1,0), (3,0), 'CENTER'),
         ('VALIGN', (1,0), (3,0), 'MIDDLE'),
-
-        # Данные: 1 и 2 колонка — выравнивание слева сверху
-        ('ALIGN', (0,1), (0,-2), 'LEFT'),  # Description
-        ('VALIGN', (0,1), (0,-2), 'TOP'),
-        ('ALIGN', (1,1), (1,-2), 'LEFT'),  # Aufgabe
-        ('VALIGN', (1,1), (1,-2), 'MIDDLE'),
-
-        # Данные: 3 и 4 колонка — по центру горизонтально и вертикально
-        ('ALIGN', (2,1), (3,-2), 'CENTER'),
-        ('VALIGN', (2,1), (3,-2), 'MIDDLE'),
-
-        # Итоговая строка — жирная и светлый фон, с отступами и выравниванием
-        ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
-        ('BACKGROUND', (0,-1), (-1,-1), colors.HexColor("#eaeaea")),
-        ('TOPPADDING', (0,-1), (-1,-1), 6),
-        ('BOTTOMPADDING', (0,-1), (-1,-1), 6),
-        ('ALIGN', (3,-1), (3,-1), 'CENTER'),
-
-        # Сетка
-        ('GRID', (0,0), (-1,-1), 0.001, colors.HexColor("#555555")),
+        ('ALIGN', (2,0), (3,0), 'CENTER'),
+        ('VALIGN', (2,0), (3,0), 'MIDDLE'),
+        # Data: description and task left aligned
+        ('ALIGN', (0,1), (0,last), 'LEFT'),  # Description
+        ('VALIGN', (0,1), (0,last), 'TOP'),
+        ('ALIGN', (1,1), (1,last), 'LEFT'),  # Aufgabe
+        ('VALIGN', (1,1), (1,last), 'MIDDLE'),
+        # Data: date and duration centred
+        ('ALIGN', (2,1), (3,last), 'CENTER'),
+        ('VALIGN', (2,1), (3,last), 'MIDDLE'),
     ])
-
-    for i in range(1, len(table_data)-1):
-        if i % 2 == 0:
+    if total_hours is not None:
+        # Total row: bold on a light background
+        style.add('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold')
+        style.add('BACKGROUND', (0,-1), (-1,-1), colors.HexColor("#eaeaea"))
+        style.add('TOPPADDING', (0,-1), (-1,-1), 6)
+        style.add('BOTTOMPADDING', (0,-1), (-1,-1), 6)
+        style.add('ALIGN', (3,-1), (3,-1), 'CENTER')
+    # Grid
+    style.add('GRID', (0,0), (-1,-1), 0.001, colors.HexColor("#555555"))
+
+    for i in range(1, len(rows)+1):
+        if (i + row_offset) % 2 == 0:
             style.add('BACKGROUND', (0,i), (-1,i), colors.white)
         else:
             style.add('BACKGROUND', (0,i), (-1,i), colors.HexColor("#eaeaea"))
 
-    last_row = len(table_data) - 1
-    style.add('FONTNAME', (0,last_row), (-1,last_row), 'Helvetica-Bold')
-    style.add('BACKGROUND', (0,last_row), (-1,last_row), colors.HexColor("#eaeaea"))
-    style.add('TOPPADDING', (0,last_row), (-1,last_row), 6)
-    style.add('BOTTOMPADDING', (0,last_row), (-1,last_row), 6)
-    style.add('ALIGN', (3,last_row), (3,last_row), 'CENTER')
-
     tbl.setStyle(style)
-    elements.append(tbl)
-    doc.build(elements)
-    print(f"✅ PDF wurde erstellt: {output_file}")
+    return tbl
+
+
+def estimate_report_pages(rows) -> int:
+    """
+    Rough page count of a report with these rows, for progress display
+    (row heights from the description's length, without laying it out).
+    """
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.lib.units import mm
+    import math
+
+    # Word wrapping leaves part of each line empty
+    avail_width = (DESCRIPTION_COL_WIDTH_MM*mm - 12) * 0.85
+    frame_height = 277*mm - 18              # A4 minus margins and the repeated header row
+    first_page_height = frame_height - 110  # company header and title
+    # 12 pt per description line plus cell padding, and the total row
+    height = sum(
+        max(1, math.ceil(stringWidth(str(row[0]), 'Helvetica', 10) / avail_width)) * 12 + 6
+        for row in rows
+    ) + 24
+    if height <= first_page_height:
+        return 1
+    return 1 + math.ceil((height - first_page_height) / frame_height)
 
 
 def generate_report_pdf_bytes(
@@ -556,11 +822,34 @@ def generate_report_pdf_bytes(
     company_name,
     months_range,
     rows,
-    total_hours
+    total_hours,
+    progress=None,
+    should_stop=None
 ):
     """
     Generates the PDF and returns it as bytes (for use in Streamlit download_button).
+
+    progress(page, pages) is called when ReportLab starts a new page; pages
+    is estimate_report_pages() (at least page). Once the document is built,
+    progress(pages, pages) reports the actual page count. should_stop() is
+    checked at the same points; if it returns True, RenderCancelled is raised.
+
+    Very large reports are rendered by worker processes (see parallel_render),
+    or serially if a worker process dies.
     """
+    from concurrent.futures.process import BrokenProcessPool
+    from reportlab.platypus import SimpleDocTemplate
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from parallel_render import parallel_render_enabled, render_report_parallel
+
+    if parallel_render_enabled(len(rows)):
+        try:
+            return render_report_parallel(logo_path, company_name, months_range, rows, total_hours,
+                                          progress=progress, should_stop=should_stop)
+        except BrokenProcessPool:
+            pass  # the pool was discarded; this report is rendered below
+
     buffer = BytesIO()
 
     doc = SimpleDocTemplate(
@@ -572,130 +861,231 @@ def generate_report_pdf_bytes(
         bottomMargin=10*mm
     )
 
-    styles = getSampleStyleSheet()
-    elements = []
+    # Story construction; ReportLab wraps and splits it during doc.build
+    with phase("layout"):
+        elements = []
+        elements += build_header_elements(logo_path, company_name)
+        elements += build_title_elements(months_range)
+        elements.append(build_entries_table(rows, total_hours))
+
+    if progress or should_stop:
+        pages = estimate_report_pages(rows) if progress else None
+
+        def on_progress(event, value):
+            if event != 'PAGE':
+                return
+            if should_stop and should_stop():
+                raise RenderCancelled(f"PDF rendering cancelled on page {value}")
+            if progress:
+                progress(value, max(pages, value))
+
+        doc.setProgressCallBack(on_progress)
+
+    with phase("pdf_build"):
+        doc.build(elements)
+    incr("pdf_pages", doc.page)
+    if progress:
+        # The estimate may be off by a few pages
+        progress(doc.page, doc.page)
 
-    # HEADER
-    header_table_data = []
-    header_row = []
+    buffer.seek(0)
+    return buffer.getvalue()
 
-    header_row.append(Paragraph(
-        company_name,
-        ParagraphStyle(
-            name='Company',
-            fontSize=14,
-            alignment=TA_LEFT,
-            leading=16,
-            wordWrap='None',
-            splitLongWords=False,
-            allowWidows=0,
-            allowOrphans=0
-        )
-    ))
 
-    if logo_path and Path(logo_path).exists():
-        try:
-            img = Image(logo_path, width=25*mm, height=15*mm)
-            header_row.append(img)
-        except Exception as e:
-            print(f"[WARN] Logo konnte nicht geladen werden: {e}")
-            header_row.append('')
-    else:
-        header_row.append('')
+def generate_report_bundle_pdf_bytes(logo_path, company_name, sections: list[dict]) -> bytes:
+    """
+    Several reports in one PDF, each starting on a new page with its own
+    header, title and totals, and listed in the document outline. sections
+    are dicts with 'title' (e.g. client and projects), 'months_range',
+    'rows' and 'total_hours' (see build_report_sections).
 
-    header_table_data.append(header_row)
+    The logo is one image object shared by all sections and pages are
+    compressed, so the bundle is much smaller than the separate reports.
+    """
+    from reportlab.platypus import SimpleDocTemplate, Flowable, PageBreak
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
 
-    header_table = Table(header_table_data, colWidths=[120*mm, None])
-    header_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('ALIGN', (0,0), (0,0), 'LEFT'),
-        ('ALIGN', (1,0), (1,0), 'RIGHT'),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 0),
-        ('TOPPADDING', (0,0), (-1,-1), 0),
-    ]))
-    elements.append(header_table)
-    elements.append(Spacer(1, 24))
+    class SectionStart(Flowable):
+        """Zero-size marker adding the section to the PDF outline."""
 
-    # TITLE
-    title_style = ParagraphStyle(
-        name='Title',
-        fontSize=12,
-        leading=14,
-        alignment=TA_LEFT,
-        spaceAfter=14,
-        fontName='Helvetica-bold'
-    )
-    title_text = f"Stundenaufstellung {months_range}"
-    title_para = Paragraph(title_text, title_style)
-    title_table = Table([[title_para]], colWidths=[180*mm])
-    title_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 0),
-    ]))
-    elements.append(title_table)
-    elements.append(Spacer(1, 24))
+        def __init__(self, title: str, key: str):
+            super().__init__()
+            self.title, self.key = title, key
 
-    # TABLE
-    cell_style = ParagraphStyle(
-        name='BodyTextLeft',
-        parent=styles['BodyText'],
-        alignment=TA_LEFT,
-        wordWrap='CJK',
-        leading=12,
+        def wrap(self, avail_width, avail_height):
+            return 0, 0
+
+        def draw(self):
+            self.canv.bookmarkPage(self.key)
+            self.canv.addOutlineEntry(self.title, self.key, level=0)
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=18*mm,
+        rightMargin=10*mm,
+        topMargin=10*mm,
+        bottomMargin=10*mm,
+        pageCompression=1,
+        title=f"Stundenaufstellungen {company_name}"
     )
-    table_data = [['Beschreibung', 'Aufgabe', 'Datum', 'Dauer']]
 
-    for row in rows:
-        beschreibung_paragraph = Paragraph(row[0], cell_style)
-        aufgabe = row[1]
-        datum = row[2]
-        dauer = row[3]
-        table_data.append([beschreibung_paragraph, aufgabe, datum, dauer])
+    with phase("layout"):
+        logo = build_logo(logo_path)
+        elements = []
+        for i, section in enumerate(sections):
+            if i:
+                elements.append(PageBreak())
+            elements.append(SectionStart(section['title'], f"section{i}"))
+            elements += build_header_elements(logo_path, company_name, logo=logo)
+            elements += build_title_elements(section['months_range'], subtitle=section['title'])
+            elements.append(build_entries_table(section['rows'], section['total_hours']))
+
+    with phase("pdf_build"):
+        doc.build(elements)
+    incr("pdf_pages", doc.page)
 
-    table_data.append(['Gesamtaufwand:', '', '', f"{total_hours:.2f}".replace('.', ',') + " h"])
+    return buffer.getvalue()
 
-    tbl = Table(table_data, colWidths=[55*mm, 40*mm, 40*mm, 40*mm], repeatRows=1)
 
-    style = TableStyle([
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('VALIGN', (0,0), (-1,0), 'MIDDLE'),
-        ('BACKGROUND', (0,0), (-1,0), colors.white),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-        ('FONTSIZE', (0,0), (-1,0), 10),
-        ('ALIGN', (0,0), (0,0), 'LEFT'),
-        ('VALIGN', (0,0), (0,0), 'MIDDLE'),
-        ('ALIGN', (1,0), (3,0), 'CENTER'),
-        ('VALIGN', (1,0), (3,0), 'MIDDLE'),
-        ('ALIGN', (2,0), (3,0), 'CENTER'),
-        ('VALIGN', (2,0), (3,0), 'MIDDLE'),
-        ('ALIGN', (0,1), (0,-2), 'LEFT'),  # Description
-        ('VALIGN', (0,1), (0,-2), 'TOP'),
-        ('ALIGN', (1,1), (1,-2), 'LEFT'),  # Aufgabe
-        ('VALIGN', (1,1), (1,-2), 'MIDDLE'),
-        ('ALIGN', (2,1), (3,-2), 'CENTER'),
-        ('VALIGN', (2,1), (3,-2), 'MIDDLE'),
-        ('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold'),
-        ('BACKGROUND', (0,-1), (-1,-1), colors.HexColor("#eaeaea")),
-        ('TOPPADDING', (0,-1), (-1,-1), 6),
-        ('BOTTOMPADDING', (0,-1), (-1,-1), 6),
-        ('ALIGN', (3,-1), (3,-1), 'CENTER'),
-        ('GRID', (0,0), (-1,-1), 0.001, colors.HexColor("#555555")),
-    ])
+def build_report_sections(df: pd.DataFrame, by_project: bool = False) -> list[dict]:
+    """
+    Bundle sections of all clients in df (one per client with all its
+    projects, or one per client and project), entries sorted by date.
+    """
+    import pandas as pd
+
+    if df.empty or 'client_name' not in df.columns:
+        return []
+    df = df[df['client_name'] != ''].sort_values(by='start', key=lambda x: pd.to_datetime(x, dayfirst=True))
+    keys = ['client_name', 'project_name'] if by_project else ['client_name']
+
+    sections = []
+    for key, df_section in df.groupby(keys, sort=True):
+        client = key[0]
+        projects = sorted(p for p in df_section['project_name'].unique() if p)
+        sections.append({
+            'client': client,
+            'projects': projects,
+            'title': f"{client} – {', '.join(projects)}" if projects else client,
+            'months_range': get_months_range_string(df_section),
+            'rows': build_report_rows(df_section),
+            'total_hours': df_section['duration_hours'].sum(),
+        })
+    return sections
+
+
+def build_report_rows(df: pd.DataFrame) -> list[list[str]]:
+    """
+    Table rows [description, task, date, duration] for the report PDF.
+    """
+    with phase("build_rows"):
+        data_rows = [
+            [description, task_name, start, f"{duration_hours:.2f}".replace('.', ',')]
+            for description, task_name, start, duration_hours in zip(
+                df['description'], df['task_name'], df['start'], df['duration_hours']
+            )
+        ]
+    incr("rows", len(data_rows))
+    return data_rows
 
-    for i in range(1, len(table_data)-1):
-        if i % 2 == 0:
-            style.add('BACKGROUND', (0,i), (-1,i), colors.white)
-        else:
-            style.add('BACKGROUND', (0,i), (-1,i), colors.HexColor("#eaeaea"))
 
-    tbl.setStyle(style)
-    elements.append(tbl)
+def iter_export_chunks(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Yield the export columns of df in slices of chunk_rows rows, renamed to
+    the export headers. An empty frame yields one empty chunk (header only).
+    """
+    for offset in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[offset:offset + chunk_rows]
+        yield chunk.reindex(columns=list(EXPORT_COLUMNS)).rename(columns=EXPORT_COLUMNS)
+
+
+def iter_entries_csv(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    CSV export as a stream of byte chunks (semicolon separated, decimal comma
+    and a BOM, so Excel opens it correctly in German locales).
+    """
+    for i, chunk in enumerate(iter_export_chunks(df, chunk_rows)):
+        text = chunk.to_csv(sep=';', decimal=',', index=False, header=(i == 0), lineterminator='\n')
+        yield text.encode('utf-8-sig' if i == 0 else 'utf-8')
+
+
+def write_entries_csv(df: pd.DataFrame, sink, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Write the CSV export to the binary file object sink."""
+    for data in iter_entries_csv(df, chunk_rows):
+        sink.write(data)
+
+
+def _export_dates(chunk: pd.DataFrame) -> pd.Series:
+    import pandas as pd
+    return pd.to_datetime(chunk['Datum'], format='%d.%m.%Y', errors='coerce')
+
+
+def write_entries_xlsx(df: pd.DataFrame, sink, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Write the XLSX export to the binary file object sink. The workbook is
+    written in openpyxl's write-only mode, which streams rows to a temporary
+    file instead of keeping cell objects in memory.
+    """
+    import pandas as pd
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Einträge")
+    ws.append(list(EXPORT_COLUMNS.values()))
+    for chunk in iter_export_chunks(df, chunk_rows):
+        dates = _export_dates(chunk)
+        for date_value, *values in zip(dates, *(chunk[c] for c in list(EXPORT_COLUMNS.values())[1:])):
+            date_cell = WriteOnlyCell(ws, value=None if pd.isna(date_value) else date_value.to_pydatetime())
+            date_cell.number_format = 'DD.MM.YYYY'
+            ws.append([date_cell, *values])
+    wb.save(sink)
+
+
+def write_entries_parquet(df: pd.DataFrame, sink, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Write the Parquet export to sink (path or binary file object), one row
+    group per chunk. Requires pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [('Datum', pa.date32())]
+        + [(name, pa.string()) for name in list(EXPORT_COLUMNS.values())[1:-1]]
+        + [('Stunden', pa.float64())]
+    )
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for chunk in iter_export_chunks(df, chunk_rows):
+            chunk = chunk.assign(Datum=_export_dates(chunk).dt.date)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+# format -> (writer, mime type, file extension, required module)
+EXPORT_FORMATS = {
+    'csv':     (write_entries_csv,     'text/csv', '.csv', None),
+    'xlsx':    (write_entries_xlsx,    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx', 'openpyxl'),
+    'parquet': (write_entries_parquet, 'application/vnd.apache.parquet', '.parquet', 'pyarrow'),
+}
 
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer.getvalue()
+
+def available_export_formats() -> list[str]:
+    """Export formats whose optional dependency is installed."""
+    from importlib.util import find_spec
+    return [fmt for fmt, (*_, module) in EXPORT_FORMATS.items() if module is None or find_spec(module)]
+
+
+def export_entries(df: pd.DataFrame, fmt: str, sink):
+    """Write the raw data export of df in format fmt ('csv', 'xlsx', 'parquet') to sink."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+    writer = EXPORT_FORMATS[fmt][0]
+    with phase("export"):
+        writer(df, sink)
+    incr("export_rows", len(df))
 
 
 def get_months_range_string(df: pd.DataFrame) -> str:
@@ -707,12 +1097,11 @@ def get_months_range_string(df: pd.DataFrame) -> str:
        - 'Dezember 2024, Januar 2025'
     depending on the dates in the DataFrame.
     """
+    from babel.dates import format_date
+    import pandas as pd
 
-    # Try setting German locale for month names
-    try:
-        locale.setlocale(locale.LC_TIME, 'de_DE.UTF-8')
-    except locale.Error:
-        print("⚠️ Achtung: German locale not available – months will be in English.")
+    # Month names come from babel, so they are German regardless of the
+    # server's installed locales
 
     if df.empty:
         return ""
@@ -762,7 +1151,7 @@ def get_months_range_string(df: pd.DataFrame) -> str:
                 month_names = [format_date(datetime(year, m, 1), "MMMM", locale='de') for m in block]
                 block_parts.append("/".join(month_names) + f" {year}")
             else:
-                month_name = datetime(year, block[0], 1).strftime("%B") + f" {year}"
+                month_name = format_date(datetime(year, block[0], 1), "MMMM", locale='de') + f" {year}"
                 block_parts.append(month_name)
 
         parts.append(", ".join(block_parts))
@@ -790,8 +1179,22 @@ def choose_period() -> tuple[str, str]:
             print(f"❌ Invalid date: {e}. Please try again.\n")
 
 
-def load_entries_for_period(start_iso: str, end_iso: str) -> pd.DataFrame:
-    df_date = get_entries_by_date(start_iso, end_iso)
+def choose_workspace(workspaces: list[Workspace]) -> Workspace:
+    """Let the user pick one of several configured workspaces."""
+    if len(workspaces) == 1:
+        return workspaces[0]
+    print("\n🏢 Verfügbare Workspaces:")
+    for i, ws in enumerate(workspaces, 1):
+        print(f"{i}. {ws.label}")
+    while True:
+        choice = input("Bitte wählen Sie einen Workspace (Nummer): ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(workspaces):
+            return workspaces[int(choice) - 1]
+        print("❌ Ungültige Auswahl. Bitte erneut versuchen.")
+
+
+def load_entries_for_period(start_iso: str, end_iso: str, workspace: Workspace = None) -> pd.DataFrame:
+    df_date = get_entries_by_date(start_iso, end_iso, workspace=workspace)
     return df_date
 
 
@@ -839,7 +1242,14 @@ def build_pdf_filename(
     return f"Stundenauflistung_{client_name}{project_part}_{period_part}.pdf"
 
 
-def process_reports_loop(df_date: pd.DataFrame, template_path: Path, logo_file: Path, css_file: Path):
+def process_reports_loop(df_date: pd.DataFrame, template_path: Path, logo_file: Path, css_file: Path, profiler: StackSampler = None):
+    """
+    Interactive report loop. If a profiler is given, the first report is
+    sampled (interactive prompts excluded) and its stacks are written next
+    to the PDF as <report>.folded.
+    """
+    import pandas as pd
+
     while True:
         # --- Select client ---
         df_client = filter_by_client_inter(df_date)
@@ -857,65 +1267,76 @@ def process_reports_loop(df_date: pd.DataFrame, template_path: Path, logo_file:
         # --- Project selection ---
         selected_projects = filter_by_project_inter(projects_in_client)
 
-        # --- Filter by selected projects ---
-        df_proj = df_client[df_client['project_name'].isin(selected_projects)].copy()
-        if df_proj.empty:
-            print(f"❌ Keine Einträge für die Auswahl {selected_projects}. Bitte erneut versuchen.\n")
-            continue
-
-        # --- Get client name ---
-        client_name = df_proj['client_name'].iloc[0]
-
-        # --- Create printable project name ---
-        if len(selected_projects) == 1:
-            project_name = selected_projects[0]
-        else:
-            project_name = "_".join(selected_projects)
-
-        print(f"✅ Gewählte Projekte: {project_name} ({len(df_proj)} Einträge).")
-
-        # --- Format month_year column ---
-        df_proj['month_year'] = pd.to_datetime(df_proj['start'], dayfirst=True).dt.strftime('%m.%Y')
-        months_range = get_months_range_string(df_proj)
-
-        # --- Calculate total hours ---
-        total_hours = df_proj['duration_hours'].sum()
+        if profiler:
+            profiler.start()
+
+        with track_run("cli-report"):
+            # --- Filter by selected projects ---
+            with phase("filter"):
+                df_proj = df_client[df_client['project_name'].isin(selected_projects)].copy()
+            if df_proj.empty:
+                print(f"❌ Keine Einträge für die Auswahl {selected_projects}. Bitte erneut versuchen.\n")
+                if profiler:
+                    profiler.stop()
+                continue
 
-        # --- Sort by date ---
-        df_proj = df_proj.sort_values(by='start', key=lambda x: pd.to_datetime(x, dayfirst=True), ascending=True)
+            # --- Get client name ---
+            client_name = df_proj['client_name'].iloc[0]
 
-        # --- Prepare table data ---
-        for col in ['description', 'task_name']:
-            df_proj[col] = (
-                df_proj[col]
-                .fillna('Allgemein')
-                .astype(str)
-                .str.strip()
-                .replace(r'^$', 'Allgemein', regex=True)
+            # --- Create printable project name ---
+            if len(selected_projects) == 1:
+                project_name = selected_projects[0]
+            else:
+                project_name = "_".join(selected_projects)
+
+            print(f"✅ Gewählte Projekte: {project_name} ({len(df_proj)} Einträge).")
+
+            # --- Format month_year column ---
+            df_proj['month_year'] = pd.to_datetime(df_proj['start'], dayfirst=True).dt.strftime('%m.%Y')
+            months_range = get_months_range_string(df_proj)
+
+            # --- Calculate total hours ---
+            total_hours = df_proj['duration_hours'].sum()
+
+            with phase("filter"):
+                # --- Sort by date ---
+                df_proj = df_proj.sort_values(by='start', key=lambda x: pd.to_datetime(x, dayfirst=True), ascending=True)
+
+                # --- Prepare table data ---
+                for col in ['description', 'task_name']:
+                    df_proj[col] = (
+                        df_proj[col]
+                        .fillna('Allgemein')
+                        .astype(str)
+                        .str.strip()
+                        .replace(r'^$', 'Allgemein', regex=True)
+                    )
+
+            data_rows = build_report_rows(df_proj)
+
+            # --- Create PDF filename ---
+            start_dates = pd.to_datetime(df_proj["start"], dayfirst=True, errors="coerce")
+            first_date = start_dates.min()
+            last_date = start_dates.max()
+
+            pdf_filename = build_pdf_filename(client_name, selected_projects, first_date, last_date)
+
+            # --- Generate PDF ---
+            generate_report_pdf(
+                output_file=pdf_filename,
+                logo_path=str(logo_file),
+                company_name=COMPANY_NAME,
+                months_range=months_range,
+                rows=data_rows,
+                total_hours=total_hours
             )
+            print(f"✅ Kompletter Report für {client_name} / {project_name} fertig!\n")
 
-        data_rows = [
-            [row['description'], row['task_name'], row['start'], f"{row['duration_hours']:.2f}".replace('.', ',')]
-            for _, row in df_proj.iterrows()
-        ]
-
-        # --- Create PDF filename ---
-        start_dates = pd.to_datetime(df_proj["start"], dayfirst=True, errors="coerce")
-        first_date = start_dates.min()
-        last_date = start_dates.max()
-
-        pdf_filename = build_pdf_filename(client_name, selected_projects, first_date, last_date)
-
-        # --- Generate PDF ---
-        generate_report_pdf(
-            output_file=pdf_filename,
-            logo_path=str(logo_file),
-            company_name=COMPANY_NAME,
-            months_range=months_range,
-            rows=data_rows,
-            total_hours=total_hours
-        )
-        print(f"✅ Kompletter Report für {client_name} / {project_name} fertig!\n")
+        if profiler:
+            profiler.stop()
+            profile_path = profiler.write(Path(pdf_filename).with_suffix(".folded"))
+            print(f"✅ Profil gespeichert: {profile_path}")
+            profiler = None
 
         # --- Ask for another report ---
         again = input("Möchten Sie einen weiteren Report erstellen? (y/N): ").strip().lower()
@@ -933,13 +1354,23 @@ if __name__ == "__main__":
     if not TEMPLATE_PATH.exists():
         raise FileNotFoundError(f"❌ Template nicht gefunden: {TEMPLATE_PATH}")
 
-    # --- Select time period and load data ---
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING"), format="%(message)s")
+
+    profiler = StackSampler() if profiling_enabled("--profile" in sys.argv[1:]) else None
+
+    # --- Select workspace and time period and load data ---
+    workspace = choose_workspace(load_workspaces())
     start_iso, end_iso = choose_period()
-    df_date = load_entries_for_period(start_iso, end_iso)
+    if profiler:
+        profiler.start()
+    with track_run("cli-load"):
+        df_date = load_entries_for_period(start_iso, end_iso, workspace=workspace)
+    if profiler:
+        profiler.stop()
 
     if df_date.empty:
         print("⚠️ Keine Daten im gewählten Zeitraum!")
         sys.exit(0)
 
     # --- Start processing reports ---
-    process_reports_loop(df_date, TEMPLATE_PATH, LOGO_PATH, CSS_PATH)
\ No newline at end of file
+    process_reports_loop(df_date, TEMPLATE_PATH, LOGO_PATH, CSS_PATH, profiler=profiler)
\ No newline at end of file
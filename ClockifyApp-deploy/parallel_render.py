@@ -0,0 +1,268 @@
+"""
+Rendering of very large reports in parallel worker processes.
+
+ReportLab lays out and draws a document on one core. For reports with at
+least ``CLOCKIFY_PARALLEL_RENDER_ROWS`` rows, generate_report_pdf_bytes()
+hands the work to render_report_parallel(), which uses
+``CLOCKIFY_RENDER_PROCESSES`` processes in two rounds:
+
+1. The rows are cut into contiguous segments. Every worker measures the
+   table row heights of its segment, which is the expensive paragraph
+   wrapping.
+2. The parent packs the rows into pages exactly as ReportLab splits the
+   table: the header row is repeated on every page and "Gesamtaufwand"
+   follows the last entry. Every worker then draws a contiguous range of
+   pages, with one table per page.
+
+The partial PDFs are joined in page order with pypdf, an optional
+dependency. Without pypdf, or with fewer than two processes, reports are
+rendered serially.
+
+Every server process (each gunicorn worker, the Streamlit app) starts its
+own pool on first use, so the default is capped at MAX_DEFAULT_PROCESSES
+instead of one process per core.
+"""
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from importlib.util import find_spec
+from io import BytesIO
+import multiprocessing
+import threading
+import logging
+import os
+
+from main import (
+    RenderCancelled,
+    build_header_elements,
+    build_title_elements,
+    build_entries_table,
+)
+from pipeline_metrics import phase, incr
+
+
+logger = logging.getLogger("clockify.render")
+
+PARALLEL_RENDER_MIN_ROWS = int(os.environ.get("CLOCKIFY_PARALLEL_RENDER_ROWS", 20_000))
+MAX_DEFAULT_PROCESSES = 4
+RENDER_PROCESSES = int(os.environ.get("CLOCKIFY_RENDER_PROCESSES", min(os.cpu_count() or 1, MAX_DEFAULT_PROCESSES)))
+
+# Interval in which the parent checks should_stop() while workers run
+WAIT_POLL_SECONDS = 0.2
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def parallel_render_enabled(row_count: int, processes: int = None) -> bool:
+    """True if a report with row_count rows should be rendered in parallel."""
+    processes = RENDER_PROCESSES if processes is None else processes
+    return processes > 1 and row_count >= PARALLEL_RENDER_MIN_ROWS and find_spec("pypdf") is not None
+
+
+def _executor() -> ProcessPoolExecutor:
+    """The worker pool, started on first use and kept for later reports."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the apps fork from threaded servers
+            _pool = ProcessPoolExecutor(max_workers=RENDER_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Forget a broken pool (a worker died), so the next report starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _doc_template(buffer):
+    """The page layout of generate_report_pdf_bytes()."""
+    from reportlab.platypus import SimpleDocTemplate
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+
+    return SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=18*mm,
+        rightMargin=10*mm,
+        topMargin=10*mm,
+        bottomMargin=10*mm
+    )
+
+
+def _frame_space(logo_path, company_name, months_range) -> tuple[float, float, float]:
+    """
+    (table width, height left for the table on the first page below header
+    and title, height of an empty page's frame).
+    """
+    from reportlab.platypus import Frame
+    from reportlab.pdfgen.canvas import Canvas
+
+    doc = _doc_template(BytesIO())
+    # The frame SimpleDocTemplate.build() puts on every page
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+    page_space = frame._y - frame._y1p
+    canv = Canvas(BytesIO(), pagesize=doc.pagesize)
+    for flowable in build_header_elements(logo_path, company_name) + build_title_elements(months_range):
+        frame.add(flowable, canv)
+    return frame._getAvailableWidth(), frame._y - frame._y1p, page_space
+
+
+def _measure_rows(rows, total_hours, row_offset: int, avail_width: float) -> list[float]:
+    """Worker: row heights of a table segment, header row first (total row last if given)."""
+    table = build_entries_table(rows, total_hours, row_offset)
+    table.wrap(avail_width, 1e9)
+    return list(table._rowHeights)
+
+
+def _paginate(header_height: float, heights: list[float], first_space: float, page_space: float) -> list[tuple[int, int]]:
+    """
+    Rows (start, end) of every page, cut as Table.split does: rows are
+    added while the header plus the rows fit. The first page holds no rows
+    if not even one fits below the title (the table then starts on page 2).
+    """
+    pages = []
+    start, space = 0, first_space
+    while start < len(heights):
+        used, end = header_height, start
+        while end < len(heights) and used + heights[end] <= space:
+            used += heights[end]
+            end += 1
+        if end == start and space == page_space:
+            end += 1  # a row higher than a page; drawn overflowing instead of failing
+        pages.append((start, end))
+        start, space = end, page_space
+    return pages
+
+
+def _page_groups(pages: list[tuple[int, int]], parts: int) -> list[list[tuple[int, int]]]:
+    """Contiguous runs of pages with similar numbers of rows, at most ``parts``."""
+    total = pages[-1][1]
+    groups, current = [], []
+    for page in pages:
+        current.append(page)
+        if len(groups) < parts - 1 and page[1] >= total * (len(groups) + 1) / parts:
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _render_pages(logo_path, company_name, months_range, rows, pages, row_count: int, total_hours, first: bool) -> bytes:
+    """
+    Worker: a PDF with one table per page. ``pages`` are (start, end) row
+    indexes of the whole table, where index row_count is the total row;
+    ``rows`` are the entry rows of these pages only.
+    """
+    from reportlab.platypus import PageBreak
+
+    base = pages[0][0]
+    elements = []
+    if first:
+        elements += build_header_elements(logo_path, company_name)
+        elements += build_title_elements(months_range)
+    for n, (start, end) in enumerate(pages):
+        if n:
+            elements.append(PageBreak())
+        page_rows = rows[start - base:min(end, row_count) - base]
+        with_total = end > row_count
+        if page_rows or with_total:
+            elements.append(build_entries_table(page_rows, total_hours if with_total else None, row_offset=start))
+
+    buffer = BytesIO()
+    _doc_template(buffer).build(elements)
+    return buffer.getvalue()
+
+
+def _wait_all(futures, should_stop=None, on_done=None) -> list:
+    """
+    Results of all futures in order; on_done(future) is called as each one
+    finishes. Raises RenderCancelled (and cancels what has not started) once
+    should_stop() returns True while futures are pending.
+    """
+    pending = set(futures)
+    while pending:
+        if should_stop and should_stop():
+            for future in pending:
+                future.cancel()
+            raise RenderCancelled("PDF rendering cancelled")
+        done, pending = wait(pending, timeout=WAIT_POLL_SECONDS, return_when=FIRST_COMPLETED)
+        for future in done:
+            future.result()  # worker errors right away
+            if on_done:
+                on_done(future)
+    return [future.result() for future in futures]
+
+
+def render_report_parallel(logo_path, company_name, months_range, rows, total_hours,
+                           progress=None, should_stop=None, processes: int = None) -> bytes:
+    """
+    The report of generate_report_pdf_bytes(), rendered by worker processes
+    and joined with pypdf. progress(pages done, pages) is called as page
+    ranges finish; should_stop() is checked while waiting for the workers.
+    If a worker dies, the pool is discarded and BrokenProcessPool raised.
+    """
+    pool = _executor()
+    try:
+        return _render_with(pool, logo_path, company_name, months_range, rows, total_hours,
+                            progress, should_stop, processes or RENDER_PROCESSES)
+    except BrokenProcessPool:
+        logger.warning("PDF render pool broken; starting a new one for the next report")
+        _discard_pool(pool)
+        raise
+
+
+def _render_with(pool, logo_path, company_name, months_range, rows, total_hours,
+                 progress, should_stop, processes: int) -> bytes:
+    """render_report_parallel() on the given pool."""
+    from pypdf import PdfWriter, PdfReader
+
+    rows = [list(row) for row in rows]
+    row_count = len(rows)
+
+    with phase("layout"):
+        avail_width, first_space, page_space = _frame_space(logo_path, company_name, months_range)
+        # Contiguous segments; the last one also measures the total row
+        bounds = [round(i * row_count / processes) for i in range(processes + 1)]
+        segments = [(bounds[i], bounds[i + 1]) for i in range(processes) if bounds[i] < bounds[i + 1]] or [(0, 0)]
+        futures = [
+            pool.submit(_measure_rows, rows[start:end], total_hours if end == row_count else None,
+                        start, avail_width)
+            for start, end in segments
+        ]
+        measured = _wait_all(futures, should_stop)
+        header_height = measured[0][0]
+        # Entry rows, then the total row (index row_count)
+        heights = [h for segment in measured for h in segment[1:]]
+        pages = _paginate(header_height, heights, first_space, page_space)
+
+    with phase("pdf_build"):
+        groups = _page_groups(pages, processes)
+        futures = [
+            pool.submit(_render_pages, logo_path, company_name, months_range,
+                        rows[group[0][0]:min(group[-1][1], row_count)], group, row_count,
+                        total_hours, n == 0)
+            for n, group in enumerate(groups)
+        ]
+        done_pages = 0
+
+        def group_done(future):
+            nonlocal done_pages
+            done_pages += len(groups[futures.index(future)])
+            if progress:
+                progress(done_pages, len(pages))
+
+        documents = _wait_all(futures, should_stop, group_done)
+
+        writer = PdfWriter()
+        for document in documents:
+            writer.append(PdfReader(BytesIO(document)))
+        buffer = BytesIO()
+        writer.write(buffer)
+    incr("pdf_pages", len(pages))
+    return buffer.getvalue()
@@ -0,0 +1,252 @@
+"""
+Phase timing and counters for the report pipeline.
+
+The stages in main.py record how long they take (``phase``) and what they
+processed (``incr``) into the currently active ``RunMetrics``. A finished run
+is published as one structured (JSON) log line, kept as the "last run" for
+the Streamlit debug panel and added to process-wide totals that can be
+rendered in Prometheus text format or written to ``CLOCKIFY_METRICS_FILE``.
+
+Recording is a no-op when no run is active, so library use of main.py
+without metrics costs nothing beyond a context-variable lookup.
+
+The ``clockify.metrics`` logger has its own stderr handler at
+``CLOCKIFY_METRICS_LOG_LEVEL`` (default INFO), since Flask and Streamlit
+leave logging unconfigured and the CLI logs at WARNING.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+import threading
+import logging
+import json
+import time
+import os
+
+
+logger = logging.getLogger("clockify.metrics")
+
+# Pipeline stages in execution order. "json_decode" is measured inside
+# "list_users" / "fetch_entries", all other phases are disjoint.
+PHASES = (
+    "list_users",
+    "fetch_entries",
+    "json_decode",
+    "normalize",
+    "index",
+    "filter",
+    "build_rows",
+    "layout",
+    "pdf_build",
+    "webhook_apply",
+    "export",
+)
+
+# Counters and their Prometheus metric names.
+COUNTERS = {
+    "requests":  "clockify_api_requests_total",
+    "pages":     "clockify_api_pages_total",
+    "bytes":     "clockify_api_response_bytes_total",
+    "entries":   "clockify_entries_total",
+    "rows":      "clockify_report_rows_total",
+    "pdf_pages": "clockify_pdf_pages_total",
+    "cache_hits":   "clockify_entry_cache_hits_total",
+    "cache_misses": "clockify_entry_cache_misses_total",
+    "cache_waits":  "clockify_entry_cache_waits_total",
+    "webhook_events": "clockify_webhook_events_total",
+    "prerender_hits": "clockify_prerendered_reports_served_total",
+    "export_rows":    "clockify_exported_rows_total",
+}
+
+METRICS_FILE_ENV = "CLOCKIFY_METRICS_FILE"
+METRICS_LOG_LEVEL = os.environ.get("CLOCKIFY_METRICS_LOG_LEVEL", "INFO").upper()
+
+
+def _configure_logger():
+    """Emit the run summaries regardless of the application's logging setup."""
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(METRICS_LOG_LEVEL)
+    # Own handler: do not print the lines a second time through the root logger
+    logger.propagate = False
+
+
+_configure_logger()
+
+
+class RunMetrics:
+    """Durations and counts of one report run. Safe to update from several threads."""
+
+    def __init__(self, name: str = "report"):
+        self.name = name
+        self.started_at = time.time()
+        self.durations: dict[str, float] = defaultdict(float)
+        self.counts: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add_time(self, phase_name: str, seconds: float):
+        with self._lock:
+            self.durations[phase_name] += seconds
+
+    def incr(self, counter: str, n: int = 1):
+        with self._lock:
+            self.counts[counter] += n
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "run": self.name,
+                "started_at": round(self.started_at, 3),
+                "durations": {p: round(self.durations[p], 6) for p in PHASES if p in self.durations},
+                "counts": {c: self.counts[c] for c in COUNTERS if c in self.counts},
+            }
+
+
+_current: ContextVar = ContextVar("clockify_run_metrics", default=None)
+
+_lock = threading.Lock()
+_last_run: RunMetrics | None = None
+_runs_total = 0
+_phase_seconds_total: dict[str, float] = defaultdict(float)
+_phase_calls_total: dict[str, int] = defaultdict(int)
+_counters_total: dict[str, int] = defaultdict(int)
+
+
+def start_run(name: str = "report") -> RunMetrics:
+    return RunMetrics(name)
+
+
+def current_run() -> RunMetrics | None:
+    return _current.get()
+
+
+@contextmanager
+def activate(run: RunMetrics | None):
+    """Make ``run`` the target of ``phase``/``incr`` inside the block (no-op for None)."""
+    if run is None:
+        yield None
+        return
+    token = _current.set(run)
+    try:
+        yield run
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def track_run(name: str = "report"):
+    """Start a new run, activate it for the block and publish it afterwards."""
+    run = start_run(name)
+    with activate(run):
+        try:
+            yield run
+        finally:
+            publish(run)
+
+
+@contextmanager
+def phase(phase_name: str):
+    """Time the enclosed block as ``phase_name`` of the active run."""
+    run = _current.get()
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        run.add_time(phase_name, elapsed)
+        with _lock:
+            _phase_seconds_total[phase_name] += elapsed
+            _phase_calls_total[phase_name] += 1
+        logger.debug("phase=%s seconds=%.6f run=%s", phase_name, elapsed, run.name)
+
+
+def incr(counter: str, n: int = 1):
+    """Add ``n`` to ``counter`` of the active run."""
+    run = _current.get()
+    if run is None:
+        return
+    run.incr(counter, n)
+    with _lock:
+        _counters_total[counter] += n
+
+
+def publish(run: RunMetrics):
+    """Log ``run`` as one JSON line, keep it as the last run and refresh the metrics file."""
+    global _last_run, _runs_total
+    with _lock:
+        if _last_run is not run:
+            _runs_total += 1
+        _last_run = run
+    logger.info("pipeline_run %s", json.dumps(run.as_dict(), sort_keys=True))
+
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path:
+        try:
+            write_prometheus_file(path)
+        except OSError as e:
+            logger.warning("Metrics file %s could not be written: %s", path, e)
+
+
+def last_run() -> dict | None:
+    with _lock:
+        run = _last_run
+    return run.as_dict() if run is not None else None
+
+
+def render_prometheus() -> str:
+    """Return process totals and the last run in Prometheus text exposition format."""
+    with _lock:
+        phase_seconds = dict(_phase_seconds_total)
+        phase_calls = dict(_phase_calls_total)
+        counters = dict(_counters_total)
+        runs_total = _runs_total
+        run = _last_run
+
+    lines = [
+        "# HELP clockify_runs_total Published report pipeline runs.",
+        "# TYPE clockify_runs_total counter",
+        f"clockify_runs_total {runs_total}",
+        "# HELP clockify_phase_seconds_total Time spent per pipeline phase.",
+        "# TYPE clockify_phase_seconds_total counter",
+    ]
+    lines += [f'clockify_phase_seconds_total{{phase="{p}"}} {phase_seconds[p]:.6f}' for p in PHASES if p in phase_seconds]
+    lines += [
+        "# HELP clockify_phase_calls_total Executions per pipeline phase.",
+        "# TYPE clockify_phase_calls_total counter",
+    ]
+    lines += [f'clockify_phase_calls_total{{phase="{p}"}} {phase_calls[p]}' for p in PHASES if p in phase_calls]
+    for counter, metric in COUNTERS.items():
+        lines += [f"# TYPE {metric} counter", f"{metric} {counters.get(counter, 0)}"]
+
+    if run is not None:
+        last = run.as_dict()
+        lines += [
+            "# HELP clockify_last_run_phase_seconds Phase durations of the last published run.",
+            "# TYPE clockify_last_run_phase_seconds gauge",
+        ]
+        lines += [f'clockify_last_run_phase_seconds{{phase="{p}"}} {s:.6f}' for p, s in last["durations"].items()]
+        lines += [
+            "# HELP clockify_last_run_count Counts of the last published run.",
+            "# TYPE clockify_last_run_count gauge",
+        ]
+        lines += [f'clockify_last_run_count{{counter="{c}"}} {n}' for c, n in last["counts"].items()]
+        lines += [
+            "# TYPE clockify_last_run_timestamp_seconds gauge",
+            f"clockify_last_run_timestamp_seconds {last['started_at']}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(path):
+    """Atomically write ``render_prometheus()`` to ``path`` (node_exporter textfile style)."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(render_prometheus(), encoding="utf-8")
+    os.replace(tmp, path)
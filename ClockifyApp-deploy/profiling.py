@@ -0,0 +1,99 @@
+"""
+On-demand sampling profiler for single report runs.
+
+``StackSampler`` periodically captures the Python stack of one thread and
+aggregates the samples into the "folded" format understood by
+flamegraph.pl, inferno and speedscope (one ``frame;frame;frame count`` line
+per distinct stack). It can be started and stopped several times, so
+interactive pauses (client selection in the CLI, Streamlit reruns) are not
+sampled.
+
+Profiling is opt-in: ``CLOCKIFY_PROFILE=1``, ``main.py --profile`` or the
+``?profile=1`` query parameter of the Streamlit app.
+"""
+from collections import Counter
+from pathlib import Path
+import threading
+import sys
+import os
+
+
+PROFILE_ENV = "CLOCKIFY_PROFILE"
+PROFILE_DIR_ENV = "CLOCKIFY_PROFILE_DIR"
+DEFAULT_INTERVAL = 0.005
+
+
+def profiling_enabled(flag: bool = False) -> bool:
+    """True if profiling was requested explicitly or via CLOCKIFY_PROFILE=1."""
+    return flag or os.environ.get(PROFILE_ENV) == "1"
+
+
+def profile_dir() -> Path:
+    """Directory for profiles that have no report file next to them (Streamlit)."""
+    return Path(os.environ.get(PROFILE_DIR_ENV, Path(__file__).resolve().parent / "profiles"))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    label = f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+    return label.replace(";", ":")
+
+
+class StackSampler:
+    """Sample the stack of one thread every ``interval`` seconds."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, thread_id: int = None):
+        """Start (or resume) sampling ``thread_id``, by default the calling thread."""
+        if self.running:
+            return self
+        target = thread_id if thread_id is not None else threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(target,), name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Pause sampling; samples collected so far are kept."""
+        if not self.running:
+            return self
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self, target: int):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Collapsed stacks, root frame first, most frequent stacks first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def write(self, path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.folded(), encoding="utf-8")
+        return path
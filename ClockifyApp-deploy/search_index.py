@@ -0,0 +1,125 @@
+"""
+Inverted index over the ``description`` column of an entry frame.
+
+Descriptions are split into lower-case word tokens; every token maps to the
+sorted row positions (0-based, as for ``df.iloc``) of the entries containing
+it. Tokens are kept sorted, so a prefix query is one contiguous slice of the
+postings. Queries combine their words with AND:
+
+    "ABC-123"    entries containing the text ABC-123 (tokens abc and 123,
+                 then checked against the description)
+    "wart*"      entries with a word starting with "wart"
+    "meeting k"  "meeting" and a word starting with "k" (the last word is a
+                 prefix while typing, see search(prefix_last=...))
+    "-", "#"     nothing: a word without letters or digits matches no entry
+
+An empty (or blank) query is no filter and matches every entry.
+
+``index_for(df)`` builds the index once per frame and shares it between all
+callers holding the same (cached, read-only) frame.
+"""
+from bisect import bisect_left
+import threading
+import weakref
+import re
+
+import numpy as np
+import pandas as pd
+
+
+TOKEN_PATTERN = r"\w+"
+_TOKEN_RE = re.compile(TOKEN_PATTERN)
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class DescriptionIndex:
+    """Token -> row positions of an entry frame's descriptions."""
+
+    def __init__(self, descriptions: pd.Series):
+        self.size = len(descriptions)
+        self._descriptions = descriptions.to_numpy()
+
+        tokens = descriptions.fillna('').astype(str).str.lower().str.findall(TOKEN_PATTERN)
+        positions = np.repeat(np.arange(self.size, dtype=np.int64), tokens.str.len().to_numpy())
+        codes, terms = pd.factorize(pd.Series([t for row in tokens for t in row], dtype=object), sort=True)
+
+        # One sorted, duplicate-free key per (term, row): ordered by term, then row
+        keys = np.sort(codes.astype(np.int64) * max(self.size, 1) + positions)
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+        self._terms: list[str] = list(terms)
+        self._positions = keys % max(self.size, 1)
+        # Postings of term i: self._positions[self._bounds[i]:self._bounds[i + 1]]
+        self._bounds = np.searchsorted(keys // max(self.size, 1), np.arange(len(self._terms) + 1))
+
+    def term(self, term: str) -> np.ndarray:
+        """Row positions of entries containing the token ``term``."""
+        i = bisect_left(self._terms, term)
+        if i == len(self._terms) or self._terms[i] != term:
+            return np.empty(0, dtype=np.int64)
+        return self._positions[self._bounds[i]:self._bounds[i + 1]]
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        """Row positions of entries containing a token that starts with ``prefix``."""
+        lo = bisect_left(self._terms, prefix)
+        hi = bisect_left(self._terms, prefix[:-1] + chr(ord(prefix[-1]) + 1)) if prefix else len(self._terms)
+        if hi - lo == 1:
+            return self._positions[self._bounds[lo]:self._bounds[hi]]
+        return np.unique(self._positions[self._bounds[lo]:self._bounds[hi]])
+
+    def search(self, query: str, prefix_last: bool = False) -> np.ndarray:
+        """
+        Sorted row positions matching all words of ``query`` (all rows for a
+        blank query, none if a word has no letters or digits). Words ending
+        in '*' are prefixes; with prefix_last the last word is one as well.
+        """
+        words = query.split()
+        result = None
+        for n, word in enumerate(words):
+            is_prefix = word.endswith('*') or (prefix_last and n == len(words) - 1)
+            word = word.rstrip('*')
+            tokens = tokenize(word)
+            if not tokens:
+                return np.empty(0, dtype=np.int64)
+            for k, token in enumerate(tokens):
+                hits = self.prefix(token) if is_prefix and k == len(tokens) - 1 else self.term(token)
+                result = hits if result is None else np.intersect1d(result, hits, assume_unique=True)
+            if len(tokens) > 1 or (tokens and tokens[0] != word.lower()):
+                # Words with punctuation (ticket numbers, ...): check the exact text
+                pattern = re.compile(r"(?<!\w)" + re.escape(word) + ("" if is_prefix else r"(?!\w)"), re.IGNORECASE)
+                keep = [pattern.search(str(self._descriptions[p])) is not None for p in result]
+                result = result[np.array(keep, dtype=bool)] if len(result) else result
+        if result is None:
+            return np.arange(self.size)
+        return result
+
+    def mask(self, query: str, prefix_last: bool = False) -> np.ndarray:
+        """Boolean row mask of search(), for combining with other filters."""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.search(query, prefix_last)] = True
+        return mask
+
+
+_indexes: dict[int, tuple[weakref.ref, DescriptionIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def index_for(df: pd.DataFrame) -> DescriptionIndex:
+    """
+    The index of ``df``'s descriptions, built on first use and kept for as
+    long as the frame lives. Frames must not be modified after indexing.
+    """
+    key = id(df)
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached is not None and cached[0]() is df:
+            return cached[1]
+
+    index = DescriptionIndex(df['description'] if 'description' in df.columns else pd.Series([''] * len(df)))
+
+    with _indexes_lock:
+        _indexes[key] = (weakref.ref(df), index)
+    weakref.finalize(df, _indexes.pop, key, None)
+    return index
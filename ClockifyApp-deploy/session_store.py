@@ -0,0 +1,138 @@
+"""
+Server-side store for the large per-session objects of the Streamlit app.
+
+``st.session_state`` only keeps a session's selection (period, client,
+projects, search) and its id. The loaded entry frame and the generated
+PDF / export / bundle bytes live here, in one store per server process with
+a global memory cap (``CLOCKIFY_SESSION_STORE_MB``). When the cap is
+exceeded, the objects of the least recently active sessions are dropped,
+PDFs and other bytes before frames. A session that comes back after
+eviction rebuilds what it needs through ``get(..., build)`` (the frame
+usually from the entry cache, the PDF by rendering it again).
+
+Entry frames come from the entry cache and are shared, read-only objects:
+a frame held by several sessions counts once towards the cap.
+"""
+from collections import OrderedDict
+import threading
+import sys
+import os
+
+import pandas as pd
+
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("CLOCKIFY_SESSION_STORE_MB", 512)) * 1024 * 1024)
+
+# Objects dropped first when a session is evicted; frames are the most
+# expensive to rebuild and go last.
+EVICTION_ORDER = ("pdf", "export", "bundle", "frame")
+
+
+def size_of(value) -> int:
+    """Approximate memory of a stored object in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(size_of(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class SessionStore:
+    """Named objects per session id under a global memory cap, evicted in LRU order of the sessions."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # Least recently active session first
+        self._sessions: OrderedDict[str, dict] = OrderedDict()
+        # id(object) -> [object, size, number of references]
+        self._objects: dict[int, list] = {}
+        self._bytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, name: str, build=None):
+        """
+        The object stored as ``name`` for the session, or - if it was never
+        stored or has been evicted - the result of ``build()`` (stored for
+        the next call). Without ``build`` a missing object returns None.
+        Marks the session as active.
+        """
+        with self._lock:
+            items = self._sessions.get(session_id)
+            if items is not None:
+                self._sessions.move_to_end(session_id)
+                if name in items:
+                    return items[name]
+        if build is None:
+            return None
+        value = build()
+        self.put(session_id, name, value)
+        return value
+
+    def put(self, session_id: str, name: str, value):
+        """Store ``value`` (None removes it), then evict other sessions' objects if over the cap."""
+        size = size_of(value) if value is not None else 0
+        with self._lock:
+            items = self._sessions.setdefault(session_id, {})
+            self._sessions.move_to_end(session_id)
+            if name in items:
+                self._release(items.pop(name))
+            if value is not None:
+                items[name] = value
+                self._retain(value, size)
+            self._evict(keep=session_id)
+
+    def discard(self, session_id: str, *names: str):
+        """Remove the named objects of a session (all of them and the session without names)."""
+        with self._lock:
+            items = self._sessions.get(session_id)
+            if items is None:
+                return
+            for name in names or list(items):
+                if name in items:
+                    self._release(items.pop(name))
+            if not names:
+                del self._sessions[session_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "objects": len(self._objects),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+    def _retain(self, value, size: int):
+        ref = self._objects.get(id(value))
+        if ref is None:
+            self._objects[id(value)] = [value, size, 1]
+            self._bytes += size
+        else:
+            ref[2] += 1
+
+    def _release(self, value):
+        ref = self._objects[id(value)]
+        ref[2] -= 1
+        if ref[2] == 0:
+            del self._objects[id(value)]
+            self._bytes -= ref[1]
+
+    def _evict(self, keep: str):
+        """Drop objects of the least recently active sessions (never ``keep``) until under the cap."""
+        for session_id in list(self._sessions):
+            if self._bytes <= self.max_bytes:
+                return
+            if session_id == keep:
+                continue
+            items = self._sessions[session_id]
+            for name in sorted(items, key=lambda n: EVICTION_ORDER.index(n) if n in EVICTION_ORDER else -1):
+                self._release(items.pop(name))
+                self.evictions += 1
+                if self._bytes <= self.max_bytes:
+                    break
+            if not items:
+                del self._sessions[session_id]
@@ -5,12 +5,25 @@ import base64
 import pandas as pd
 import requests
 import hashlib
+import uuid
+import os
 from io import BytesIO
 
-from main import to_iso_format, get_entries_by_date
-from main import generate_report_pdf_bytes, get_months_range_string
-from main import build_pdf_filename
+from main import to_iso_format
+from main import get_months_range_string
+from main import build_pdf_filename, build_report_rows
 from main import LOGO_PATH, COMPANY_NAME
+from main import load_workspaces
+from main import available_export_formats, export_entries, EXPORT_FORMATS
+import pipeline_metrics
+from entry_cache import BackgroundLoad, load_entries
+from background_render import BackgroundRender
+from session_store import SessionStore
+from profiling import StackSampler, profiling_enabled, profile_dir
+from app_Flask import services
+from app_Flask.warmup import WarmupScheduler
+from search_index import index_for
+import webhooks
 
 
 
@@ -39,12 +52,37 @@ if not st.session_state.authenticated:
     st.stop()
 
 # === Session State Init ===
+# Only the selection lives in the session state; the loaded entries and the
+# generated files are kept in the process-wide session store.
 for key in [
-    "zeitraum_confirmed", "data_loaded", "df_date", "client_selected",
-    "selected_projects", "final_confirmed", "pdf_bytes"
+    "zeitraum_confirmed", "data_loaded", "client_selected",
+    "selected_projects", "final_confirmed", "pdf_built"
 ]:
     if key not in st.session_state:
-        st.session_state[key] = pd.DataFrame() if key == "df_date" else ([] if key == "selected_projects" else False)
+        st.session_state[key] = [] if key == "selected_projects" else False
+for key in ["metrics_run", "profiler", "profile_path", "loader", "loader_version", "workspace_id", "export_key", "search_query", "bundle_key", "period", "renderer"]:
+    if key not in st.session_state:
+        st.session_state[key] = None
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+@st.cache_resource
+def warmup_scheduler():
+    """One warm-up scheduler per server process; runs the schedule only while it holds the lock."""
+    return WarmupScheduler().start()
+
+warmup_scheduler()
+
+# Webhook events received by the API since the last rerun
+webhooks.sync()
+
+@st.cache_resource
+def session_store():
+    """Entry frames and generated files of all sessions, under one memory cap."""
+    return SessionStore()
+
+store = session_store()
+session_id = st.session_state.session_id
 
 # === Page Config ===
 st.set_page_config(page_title="Clockify Report Generator", layout="centered", initial_sidebar_state="auto")
@@ -84,6 +122,28 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+# === Workspace auswählen ===
+workspaces = load_workspaces()
+if len(workspaces) > 1:
+    st.subheader("Workspace auswählen")
+    workspace = st.selectbox("Workspace:", workspaces, format_func=lambda ws: ws.label)
+else:
+    workspace = workspaces[0]
+
+if workspace.id != st.session_state.workspace_id:
+    # Loaded data belongs to the previous workspace
+    if st.session_state.loader is not None:
+        st.session_state.loader.cancel()
+        st.session_state.loader = None
+    if st.session_state.renderer is not None:
+        st.session_state.renderer.cancel()
+        st.session_state.renderer = None
+    st.session_state.final_confirmed = False
+    st.session_state.workspace_id = workspace.id
+    st.session_state.data_loaded = False
+    st.session_state.period = None
+    store.discard(session_id)
+
 # === Zeitraum auswählen ===
 st.subheader("Zeitraum auswählen")
 today = date.today()
@@ -100,39 +160,137 @@ if start_date > end_date:
     st.error("Enddatum darf nicht vor dem Startdatum liegen.")
     st.stop()
 
+def period_frame() -> pd.DataFrame:
+    """Entries of the loaded period; loaded again (usually from the entry cache) after eviction."""
+    start_iso, end_iso = st.session_state.period
+
+    def reload():
+        with st.spinner("Daten werden neu geladen..."):
+            return load_entries(start_iso, end_iso, workspace=workspace)
+
+    return store.get(session_id, "frame", reload)
+
+
 # === Daten laden ===
+@st.fragment(run_every=0.5)
+def show_load_progress():
+    """Progress of the background load; reruns the page when new entries arrived."""
+    loader = st.session_state.loader
+    if loader is None:
+        return
+    if loader.done or loader.version != st.session_state.loader_version:
+        st.rerun()
+
+    done, total = loader.progress()
+    if total:
+        st.progress(done / total, text=f"Lade Daten von Clockify... ({done}/{total} Benutzer)")
+    else:
+        st.progress(0.0, text="Lade Daten von Clockify...")
+    if st.button("Laden abbrechen"):
+        loader.cancel()
+        st.session_state.loader = None
+        st.rerun()
+
+
 if not st.session_state.data_loaded:
-    if st.button("Daten laden"):
-        for key in ["client_selected", "selected_projects", "final_confirmed", "pdf_bytes"]:
-            st.session_state[key] = [] if key == "selected_projects" else False
-
-        with st.spinner("Lade Daten von Clockify..."):
-            try:
-                start_iso = to_iso_format(start_date.strftime("%d-%m-%Y"), is_end=False)
-                end_iso = to_iso_format(end_date.strftime("%d-%m-%Y"), is_end=True)
-                df_date = get_entries_by_date(start_iso, end_iso)
-            except requests.exceptions.RequestException as e:
-                st.error(f"Netzwerkfehler: {e}")
-                st.stop()
-
-            if df_date.empty or 'client_name' not in df_date.columns:
-                st.warning("Keine Daten im gewählten Zeitraum.")
-                st.stop()
-
-            st.session_state.df_date = df_date
-            st.session_state.data_loaded = True
-            st.success(f"{len(df_date)} Einträge geladen.")
+    loader = st.session_state.loader
+
+    if loader is None:
+        if st.button("Daten laden"):
+            for key in ["client_selected", "selected_projects", "final_confirmed", "pdf_built"]:
+                st.session_state[key] = [] if key == "selected_projects" else False
+            store.discard(session_id, "pdf")
+
+            st.session_state.metrics_run = pipeline_metrics.start_run("streamlit")
+            # ?profile=1 samples this load and the following PDF build
+            profile_requested = profiling_enabled(st.query_params.get("profile") == "1")
+            st.session_state.profiler = StackSampler() if profile_requested else None
+            st.session_state.profile_path = None
+
+            start_iso = to_iso_format(start_date.strftime("%d-%m-%Y"), is_end=False)
+            end_iso = to_iso_format(end_date.strftime("%d-%m-%Y"), is_end=True)
+            st.session_state.loader = BackgroundLoad(
+                start_iso, end_iso,
+                run=st.session_state.metrics_run,
+                profiler=st.session_state.profiler,
+                workspace=workspace
+            )
+            st.session_state.loader_version = None
+            st.rerun()
+
+    elif loader.done:
+        st.session_state.loader = None
+        if isinstance(loader.error, requests.exceptions.RequestException):
+            st.error(f"Netzwerkfehler: {loader.error}")
+            st.stop()
+        if loader.error is not None:
+            raise loader.error
+
+        df_date = loader.result
+        if df_date.empty or 'client_name' not in df_date.columns:
+            st.warning("Keine Daten im gewählten Zeitraum.")
+            st.stop()
+
+        store.put(session_id, "frame", df_date)
+        st.session_state.period = (loader.start_iso, loader.end_iso)
+        st.session_state.data_loaded = True
+        st.success(f"{len(df_date)} Einträge geladen.")
+
+    else:
+        st.session_state.loader_version = loader.version
+        show_load_progress()
 
 # === Client auswählen ===
-if st.session_state.data_loaded and not st.session_state.final_confirmed:
+# While loading, the selection works on the entries that have arrived so far
+loading = st.session_state.loader is not None
+if (st.session_state.data_loaded or loading) and not st.session_state.final_confirmed:
     st.subheader("Client auswählen")
-    df_date = st.session_state.df_date
-    clients = sorted(df_date['client_name'].dropna().unique())
+    df_period = period_frame() if st.session_state.data_loaded else st.session_state.loader.partial_frame()
+    df_date = df_period
+
+    # Full-text search over the descriptions, available once all entries are loaded
+    search_query = st.text_input(
+        "🔍 Beschreibung durchsuchen (z. B. Ticketnummer):",
+        value=st.session_state.search_query or "",
+        disabled=loading,
+        key="search_input"
+    ).strip()
+    st.session_state.search_query = search_query
+    if search_query and not loading:
+        df_date = df_date[index_for(df_period).mask(search_query, prefix_last=True)]
+        st.caption(f"{len(df_date)} Einträge gefunden.")
+
+    clients = sorted(df_date['client_name'].dropna().unique()) if 'client_name' in df_date.columns else []
 
     if not clients:
-        st.warning("Keine Clients vorhanden.")
+        if loading:
+            st.caption("Noch keine Clients geladen...")
+        else:
+            st.warning("Keine Clients vorhanden.")
         st.stop()
 
+    # === Sammel-PDF aller Clients ===
+    if not loading:
+        with st.expander("📚 Sammel-PDF aller Clients"):
+            by_project = st.checkbox("Ein Abschnitt je Projekt")
+            bundle_key = (len(df_date), st.session_state.search_query, by_project, start_date, end_date)
+            if st.session_state.bundle_key != bundle_key:
+                if st.button("Sammel-PDF erstellen"):
+                    with st.spinner("Sammel-PDF wird erstellt..."):
+                        store.put(session_id, "bundle", services.render_bundle(df_date, by_project=by_project))
+                    st.session_state.bundle_key = bundle_key
+                    st.rerun()
+            else:
+                with st.spinner("Sammel-PDF wird erstellt..."):
+                    bundle_pdf, bundle_filename = store.get(
+                        session_id, "bundle", lambda: services.render_bundle(df_date, by_project=by_project))
+                st.download_button(
+                    label=f"📥 Sammel-PDF herunterladen ({len(clients)} Clients)",
+                    data=bundle_pdf,
+                    file_name=bundle_filename,
+                    mime="application/pdf"
+                )
+
     default_index = clients.index(st.session_state.client_selected) if st.session_state.client_selected in clients else 0
     client_selected = st.selectbox("Client: ", options=clients, index=default_index)
     st.session_state.client_selected = client_selected
@@ -168,37 +326,73 @@ if st.session_state.data_loaded and not st.session_state.final_confirmed:
         st.success(
             f"Zeitraum: {start_date.strftime('%d.%m.%Y')} bis {end_date.strftime('%d.%m.%Y')}\n\n"
             f"Client: {client_selected}\n\nProjekte: {', '.join(selected_projects)}"
+            + (f"\n\nSuche: {search_query}" if search_query else "")
         )
-        if st.button("Auswahl bestätigen"):
+        if loading:
+            st.caption("Bestätigen ist möglich, sobald alle Daten geladen sind.")
+        if st.button("Auswahl bestätigen", disabled=loading):
             st.session_state.final_confirmed = True
+            st.rerun()
 
 # === PDF-Download ===
+@st.fragment(run_every=0.5)
+def show_render_progress():
+    """Progress of the background PDF render; reruns the page once the PDF is ready."""
+    renderer = st.session_state.renderer
+    if renderer is None:
+        return
+    if renderer.done:
+        st.rerun()
+
+    page, pages = renderer.progress()
+    if pages:
+        st.progress((page - 1) / pages, text=f"PDF wird erstellt... (Seite {page} von ca. {pages})")
+    else:
+        st.progress(0.0, text="PDF wird erstellt...")
+    if st.button("PDF-Erstellung abbrechen"):
+        renderer.cancel()
+        st.session_state.renderer = None
+        st.session_state.final_confirmed = False
+        st.session_state.pdf_built = False
+        st.rerun()
+
+
 if st.session_state.final_confirmed:
     st.subheader("PDF-Download")
+    df_period = period_frame()
 
-    df_selected = st.session_state.df_date[
-        (st.session_state.df_date['client_name'] == st.session_state.client_selected) &
-        (st.session_state.df_date['project_name'].isin(st.session_state.selected_projects))
-    ].sort_values(by='start', key=lambda x: pd.to_datetime(x, dayfirst=True))
+    # Only the run that builds the PDF is recorded, not every rerun of the page
+    # (or a rebuild after the session store evicted the PDF)
+    report_run = st.session_state.metrics_run if not st.session_state.pdf_built else None
+
+    with pipeline_metrics.activate(report_run), pipeline_metrics.phase("filter"):
+        mask = (
+            (df_period['client_name'] == st.session_state.client_selected) &
+            (df_period['project_name'].isin(st.session_state.selected_projects))
+        )
+        if st.session_state.search_query:
+            mask &= index_for(df_period).mask(st.session_state.search_query, prefix_last=True)
+        df_selected = df_period[mask].sort_values(by='start', key=lambda x: pd.to_datetime(x, dayfirst=True))
 
     if df_selected.empty:
         st.warning("Keine Einträge gefunden.")
         st.stop()
 
-    if not st.session_state.pdf_bytes:
-        months_range = get_months_range_string(df_selected)
-        total_hours = df_selected['duration_hours'].sum()
-        data_rows = [
-            [row['description'], row['task_name'], row['start'], f"{row['duration_hours']:.2f}".replace('.', ',')]
-            for _, row in df_selected.iterrows()
-        ]
-        st.session_state.pdf_bytes = generate_report_pdf_bytes(
-            logo_path=str(LOGO_PATH),
-            company_name=COMPANY_NAME,
-            months_range=months_range,
-            rows=data_rows,
-            total_hours=total_hours
-        )
+    pdf_bytes = store.get(session_id, "pdf")
+
+    # Reports of all projects of a client may have been pre-rendered by the warm-up
+    if pdf_bytes is None and st.session_state.renderer is None:
+        client_projects = set(df_period.loc[
+            df_period['client_name'] == st.session_state.client_selected, 'project_name'
+        ])
+        if set(st.session_state.selected_projects) == client_projects and not st.session_state.search_query:
+            etag = services.report_etag(
+                df_selected, workspace.id,
+                *st.session_state.period,
+                st.session_state.client_selected, []
+            )
+            with pipeline_metrics.activate(report_run):
+                pdf_bytes = warmup_scheduler().store.get(etag)
 
     first_date = pd.to_datetime(df_selected["start"], dayfirst=True).min()
     last_date = pd.to_datetime(df_selected["start"], dayfirst=True).max()
@@ -209,29 +403,115 @@ if st.session_state.final_confirmed:
         last_date
     )
 
+    # The PDF is rendered in the background; the page shows its progress meanwhile
+    if pdf_bytes is None:
+        renderer = st.session_state.renderer
+        if renderer is None:
+            with pipeline_metrics.activate(report_run):
+                months_range = get_months_range_string(df_selected)
+                total_hours = df_selected['duration_hours'].sum()
+                data_rows = build_report_rows(df_selected)
+            renderer = st.session_state.renderer = BackgroundRender(
+                str(LOGO_PATH), COMPANY_NAME, months_range, data_rows, total_hours,
+                run=report_run,
+                profiler=st.session_state.profiler if report_run is not None else None
+            )
+        if not renderer.done:
+            show_render_progress()
+            st.stop()
+
+        st.session_state.renderer = None
+        if renderer.error is not None:
+            raise renderer.error
+        pdf_bytes = renderer.result
+        if report_run is not None:
+            pipeline_metrics.publish(report_run)
+            if st.session_state.profiler:
+                profile_name = pdf_filename.rsplit(".", 1)[0] + ".folded"
+                st.session_state.profile_path = str(st.session_state.profiler.write(profile_dir() / profile_name))
+                st.session_state.profiler = None
+    st.session_state.pdf_built = True
+    store.put(session_id, "pdf", pdf_bytes)
+
     st.download_button(
         label="📥 PDF herunterladen",
-        data=st.session_state.pdf_bytes,
+        data=pdf_bytes,
         file_name=pdf_filename,
         mime="application/pdf"
     )
 
+    # === Rohdaten-Export ===
+    export_fmt = st.selectbox("Rohdaten exportieren als:", available_export_formats(), format_func=str.upper)
+    export_key = (export_fmt, st.session_state.client_selected, tuple(st.session_state.selected_projects),
+                  start_date, end_date, len(df_selected))
+
+    def build_export() -> bytes:
+        buffer = BytesIO()
+        with st.spinner("Export wird erstellt..."):
+            export_entries(df_selected, export_fmt, buffer)
+        return buffer.getvalue()
+
+    if st.session_state.export_key != export_key:
+        if st.button("Export erstellen"):
+            store.put(session_id, "export", build_export())
+            st.session_state.export_key = export_key
+            st.rerun()
+    else:
+        st.download_button(
+            label=f"📊 Rohdaten herunterladen ({export_fmt.upper()})",
+            data=store.get(session_id, "export", build_export),
+            file_name=pdf_filename.rsplit(".", 1)[0] + EXPORT_FORMATS[export_fmt][2],
+            mime=EXPORT_FORMATS[export_fmt][1]
+        )
+
+    if st.session_state.profile_path:
+        with open(st.session_state.profile_path, "rb") as f:
+            st.download_button(
+                label="🔥 Profil herunterladen (Flamegraph)",
+                data=f.read(),
+                file_name=os.path.basename(st.session_state.profile_path),
+                mime="text/plain"
+            )
+
 # === Navigation ===
-if st.session_state.get("pdf_bytes"):
+if st.session_state.get("pdf_built"):
     col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("Neuer Zeitraum"):
-            for key in ["data_loaded", "df_date", "client_selected", "selected_projects", "final_confirmed", "pdf_bytes"]:
-                st.session_state[key] = [] if key == "selected_projects" else (pd.DataFrame() if key == "df_date" else False)
+            for key in ["data_loaded", "client_selected", "selected_projects", "final_confirmed", "pdf_built"]:
+                st.session_state[key] = [] if key == "selected_projects" else False
+            st.session_state.period = None
+            st.session_state.profile_path = None
+            st.session_state.export_key = None
+            st.session_state.bundle_key = None
+            store.discard(session_id)
             st.rerun()
     with col2:
         if st.button("Anderer Client"):
-            for key in ["client_selected", "selected_projects", "final_confirmed", "pdf_bytes"]:
+            for key in ["client_selected", "selected_projects", "final_confirmed", "pdf_built"]:
                 st.session_state[key] = [] if key == "selected_projects" else False
+            st.session_state.profile_path = None
+            st.session_state.export_key = None
+            st.session_state.bundle_key = None
+            store.discard(session_id, "pdf", "export", "bundle")
             st.rerun()
     with col3:
         if st.button("Beenden"):
+            store.discard(session_id)
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.session_state["authenticated"] = False
             st.rerun()
+
+# === Debug-Panel (?debug=1 oder CLOCKIFY_DEBUG=1) ===
+if st.query_params.get("debug") == "1" or os.environ.get("CLOCKIFY_DEBUG") == "1":
+    with st.expander("Debug: letzter Lauf"):
+        run = st.session_state.get("metrics_run")
+        last = run.as_dict() if run is not None else pipeline_metrics.last_run()
+        if last is None:
+            st.caption("Noch kein Lauf aufgezeichnet.")
+        else:
+            st.json(last)
+        st.code(pipeline_metrics.render_prometheus(), language="text")
+        st.caption("Session-Speicher")
+        st.json(store.stats())
@@ -0,0 +1,163 @@
+"""
+Shared fixtures of the test suite.
+
+    python -m pytest -q                   # from ClockifyApp-deploy
+    python -m pytest -q --update-golden   # rewrite tests/golden/*.json
+    python -m pytest -q --no-budgets      # skip the stage budgets
+
+The Clockify API is replaced by FakeClockify (no network); the
+``clockify`` fixture serves a small June 2025 workspace to the API tests.
+Golden outputs live in tests/golden/ and stage budgets in tests/budgets.json;
+the budgets depend on the machine, so slow machines can skip them with
+--no-budgets or CLOCKIFY_SKIP_BUDGETS=1.
+"""
+from pathlib import Path
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+from main import Workspace
+
+
+TESTS_DIR = Path(__file__).resolve().parent
+APP_DIR = TESTS_DIR.parent
+GOLDEN_DIR = TESTS_DIR / "golden"
+
+for path in (APP_DIR, APP_DIR / "tools"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+def pytest_addoption(parser):
+    parser.addoption("--update-golden", action="store_true",
+                     help="write the current outputs to tests/golden/ instead of comparing")
+    parser.addoption("--no-budgets", action="store_true",
+                     help="skip the time and memory budgets of tests/budgets.json")
+
+
+def entry(entry_id, user_id, day, start, hours, description, client=None, project=None, task=None):
+    """A hydrated Clockify time entry; ``day`` is YYYY-MM-DD, ``start`` HH:MM (UTC)."""
+    begin = pd.Timestamp(f"{day}T{start}:00Z")
+    return {
+        "id": entry_id,
+        "userId": user_id,
+        "description": description,
+        "projectId": f"p-{project}" if project else None,
+        "project": {"name": project, "clientId": f"c-{client}", "clientName": client} if project else None,
+        "task": {"name": task} if task is not None else None,
+        "timeInterval": {
+            "start": begin.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "end": (begin + pd.Timedelta(hours=hours)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        },
+    }
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.content = json.dumps(data).encode("utf-8")
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeClockify:
+    """
+    Answers the requests.Session.get calls of main.fetch_all from fixed
+    data: ``users`` is the user list, ``entries(user_id, start, end)`` the
+    time entries of one user. Pages are cut with the requested page-size.
+    """
+
+    def __init__(self, users: list[dict], entries):
+        self.users = users
+        self.entries = entries
+        self.requests = 0
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.requests += 1
+        if url.endswith("/users"):
+            items = self.users
+        else:
+            user_id = url.split("/user/")[1].split("/")[0]
+            items = self.entries(user_id, params["start"], params["end"])
+        page, size = params["page"], params["page-size"]
+        return FakeResponse(items[(page - 1) * size:page * size])
+
+    def install(self, monkeypatch):
+        import requests
+
+        fake = self
+        monkeypatch.setattr(requests.Session, "get", lambda session, url, **kwargs: fake.get(url, **kwargs))
+
+
+# Workspace of the API tests; no rate limiting against the fake API
+API_WORKSPACE = Workspace(id="ws-test", api_key="test", name="Test", base_url="https://clockify.test", rate_limit=1e9)
+
+API_USERS = [{"id": "u-anna", "name": "Anna Beispiel"}, {"id": "u-bernd", "name": "Bernd Test"}]
+API_ENTRIES = {
+    "u-anna": [
+        entry("a1", "u-anna", "2025-06-02", "08:00", 2.0, "Ticket ABC-123 Checkout", "Acme GmbH", "Shop", "Entwicklung"),
+        entry("a2", "u-anna", "2025-06-03", "09:00", 1.5, "Meeting Kickoff", "Acme GmbH", "Beratung"),
+        entry("a3", "u-anna", "2025-06-20", "10:00", 0.5, "Review Monatsabschluss", "Beta AG", "Intern"),
+    ],
+    "u-bernd": [
+        entry("b1", "u-bernd", "2025-06-04", "08:00", 3.0, "Deployment Shop", "Acme GmbH", "Shop", "Entwicklung"),
+        entry("b2", "u-bernd", "2025-07-01", "08:00", 1.0, "Planung Juli", "Acme GmbH", "Shop"),
+    ],
+}
+
+
+def entries_in_period(entries: dict):
+    """FakeClockify entries() returning a user's entries that start within the requested period."""
+    return lambda user_id, start, end: [e for e in entries.get(user_id, []) if start <= e["timeInterval"]["start"] <= end]
+
+
+class Golden:
+    """Compares values with tests/golden/<name>.json, or records them with --update-golden."""
+
+    def __init__(self, name: str, update: bool):
+        self.path = GOLDEN_DIR / f"{name}.json"
+        self.update = update
+        self.values = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+
+    def check(self, key: str, actual):
+        # Round-trip through JSON so tuples / numpy scalars compare like the stored values
+        actual = json.loads(json.dumps(actual, default=str))
+        if self.update:
+            self.values[key] = actual
+            GOLDEN_DIR.mkdir(exist_ok=True)
+            self.path.write_text(json.dumps(self.values, indent=1, ensure_ascii=False, sort_keys=True) + "\n",
+                                 encoding="utf-8")
+            return
+        if key not in self.values:
+            pytest.fail(f"No golden value '{key}' in {self.path.name}; run pytest --update-golden")
+        assert actual == self.values[key], f"'{key}' differs from {self.path.name}"
+
+
+@pytest.fixture
+def clockify(monkeypatch, tmp_path):
+    """
+    FakeClockify serving API_USERS / API_ENTRIES, with API_WORKSPACE as the
+    only configured workspace of the report API, an empty entry cache and an
+    empty webhook event log.
+    """
+    from app_Flask import services
+    from entry_cache import cache_for
+    import webhooks
+
+    fake = FakeClockify(API_USERS, entries_in_period(API_ENTRIES))
+    fake.install(monkeypatch)
+    monkeypatch.setattr(services, "WORKSPACES", [API_WORKSPACE])
+    monkeypatch.setattr(webhooks, "EVENT_LOG", webhooks.EventLog(tmp_path / "webhooks"))
+    cache_for(API_WORKSPACE.id).invalidate()
+    yield fake
+    cache_for(API_WORKSPACE.id).invalidate()
+
+
+@pytest.fixture(scope="session")
+def update_golden(request) -> bool:
+    return request.config.getoption("--update-golden")
@@ -0,0 +1,153 @@
+"""Tests of progress and cancellation of the PDF rendering (background_render.py, main.py, parallel_render.py)."""
+import threading
+import time
+
+import pytest
+
+import parallel_render
+from background_render import BackgroundRender
+from main import COMPANY_NAME, LOGO_PATH, RenderCancelled, generate_report_pdf_bytes
+
+
+ROWS = [[f"Eintrag {i} mit etwas längerer Beschreibung", "Allgemein", "02.06.2025", "1,00"] for i in range(150)]
+ARGS = (LOGO_PATH, COMPANY_NAME, "Juni 2025", ROWS, float(len(ROWS)))
+
+
+@pytest.fixture(params=["serial", "parallel"])
+def render_path(request, monkeypatch):
+    """Runs a test on the serial path and on the worker processes of parallel_render."""
+    calls = []
+    if request.param == "parallel":
+        pytest.importorskip("pypdf")
+        monkeypatch.setattr(parallel_render, "PARALLEL_RENDER_MIN_ROWS", 1)
+        monkeypatch.setattr(parallel_render, "RENDER_PROCESSES", 2)
+        render = parallel_render.render_report_parallel
+
+        def spy(*args, **kwargs):
+            calls.append(1)
+            return render(*args, **kwargs)
+
+        monkeypatch.setattr(parallel_render, "render_report_parallel", spy)
+    else:
+        monkeypatch.setattr(parallel_render, "PARALLEL_RENDER_MIN_ROWS", len(ROWS) + 1)
+    yield request.param
+    assert bool(calls) == (request.param == "parallel")
+
+
+@pytest.fixture
+def halfway(render_path, monkeypatch):
+    """
+    (reached, resume): the render blocks once it is partly done - on page 2
+    serially, after the layout round in parallel - until resume is set.
+    """
+    reached, resume = threading.Event(), threading.Event()
+
+    def block():
+        reached.set()
+        assert resume.wait(10)
+
+    if render_path == "serial":
+        progress = BackgroundRender._progress
+
+        def gated(self, page, pages):
+            progress(self, page, pages)
+            if page == 2 and not reached.is_set():
+                block()
+
+        monkeypatch.setattr(BackgroundRender, "_progress", gated)
+    else:
+        paginate = parallel_render._paginate
+
+        def gated(*args):
+            pages = paginate(*args)
+            block()
+            return pages
+
+        monkeypatch.setattr(parallel_render, "_paginate", gated)
+    yield reached, resume
+    resume.set()
+
+
+def wait_done(render: BackgroundRender, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while not render.done:
+        assert time.monotonic() < deadline, "render did not finish"
+        time.sleep(0.01)
+
+
+def assert_progress(calls: list[tuple[int, int]]):
+    """Pages done and the ratio never go back, and the last call is complete."""
+    assert calls
+    assert [page for page, _ in calls] == sorted(page for page, _ in calls)
+    ratios = [page / pages for page, pages in calls]
+    assert ratios == sorted(ratios)
+    assert ratios[-1] == 1.0
+
+
+def test_progress_is_monotonic_and_finishes(render_path):
+    calls = []
+    pdf = generate_report_pdf_bytes(*ARGS, progress=lambda page, pages: calls.append((page, pages)))
+    assert pdf.startswith(b"%PDF")
+    assert_progress(calls)
+    assert calls[-1][0] > 1
+
+
+def test_cancel_mid_render(render_path, monkeypatch):
+    calls = []
+    stop = threading.Event()
+
+    if render_path == "serial":
+        def progress(page, pages):
+            calls.append((page, pages))
+            if page == 2:
+                stop.set()
+    else:
+        def progress(page, pages):
+            calls.append((page, pages))
+
+        paginate = parallel_render._paginate
+
+        def stop_after_layout(*args):
+            stop.set()
+            return paginate(*args)
+
+        monkeypatch.setattr(parallel_render, "_paginate", stop_after_layout)
+
+    with pytest.raises(RenderCancelled):
+        generate_report_pdf_bytes(*ARGS, progress=progress, should_stop=stop.is_set)
+    # Nothing after the cancellation was reported
+    if render_path == "serial":
+        assert [page for page, _ in calls] == [1, 2]
+    else:
+        assert calls == []
+
+
+def test_background_render_progress(render_path):
+    seen = []
+    render = BackgroundRender(*ARGS)
+    deadline = time.monotonic() + 60
+    while not render.done:
+        assert time.monotonic() < deadline, "render did not finish"
+        seen.append(render.progress())
+        time.sleep(0.005)
+    seen.append(render.progress())
+
+    assert render.error is None and render.result.startswith(b"%PDF")
+    started = [(page, pages) for page, pages in seen if pages is not None]
+    assert_progress(started)
+
+
+def test_background_render_cancel(halfway):
+    reached, resume = halfway
+    render = BackgroundRender(*ARGS)
+    assert reached.wait(60)
+    done_before = render.progress()
+    assert not render.done
+
+    render.cancel()
+    resume.set()
+    wait_done(render)
+    assert render.cancelled
+    assert isinstance(render.error, RenderCancelled) and render.result is None
+    # No page was reported after the cancellation
+    assert render.progress() == done_before
@@ -0,0 +1,228 @@
+"""Tests of the shared entry cache (entry_cache.py)."""
+import threading
+import time
+
+import pytest
+import requests
+
+import entry_cache
+from entry_cache import BackgroundLoad, EntryCache, cache_for, load_entries, load_entries_for_workspaces
+from main import LoadCancelled, Workspace
+from pipeline_metrics import start_run
+from conftest import API_USERS, API_ENTRIES, API_WORKSPACE, FakeClockify, entries_in_period
+
+
+JUNE = ("2025-06-01T00:00:00Z", "2025-06-30T23:59:59Z")
+
+
+def test_hit_after_load():
+    cache = EntryCache(ttl=60)
+    calls = []
+    assert cache.get_or_load("k", lambda: calls.append(1) or "value") == "value"
+    assert cache.get_or_load("k", lambda: calls.append(1) or "other") == "value"
+    assert len(calls) == 1
+
+
+def test_expired_entry_is_reloaded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("entry_cache.time.time", lambda: now[0])
+    cache = EntryCache(ttl=60)
+    cache.get_or_load("k", lambda: "old")
+    now[0] += 61
+    assert cache.get_entry("k") is None
+    assert cache.get_or_load("k", lambda: "new") == "new"
+
+
+def test_lru_eviction():
+    cache = EntryCache(ttl=60, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.get_or_load(key, lambda: key)
+    assert cache.get_entry("a") is None
+    assert cache.get_entry("c").value == "c"
+
+
+def test_concurrent_callers_share_one_load():
+    cache = EntryCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+
+
+def test_caller_after_finished_load_gets_cached_entry():
+    cache = EntryCache(ttl=60)
+    leader = cache.get_or_load_entry("k", lambda: "value")
+    # A second caller must not start a new flight for a key that is cached
+    assert cache.get_or_load_entry("k", lambda: pytest.fail("loaded twice")) is leader
+    assert cache._inflight == {}
+
+
+def test_failed_load_is_not_cached():
+    cache = EntryCache(ttl=60)
+
+    def fail():
+        raise RuntimeError("Clockify down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", fail)
+    assert cache.get_entry("k") is None
+    assert cache.get_or_load("k", lambda: "value") == "value"
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_waiter_stops_waiting_when_cancelled():
+    cache = EntryCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+
+    def loader():
+        started.set()
+        release.wait(5)
+        return "value"
+
+    leader = threading.Thread(target=cache.get_or_load, args=("k", loader))
+    leader.start()
+    started.wait(5)
+    with pytest.raises(LoadCancelled):
+        cache.get_or_load("k", lambda: pytest.fail("waiter loaded"), should_stop=lambda: True)
+
+    # The leader's load is not affected
+    release.set()
+    leader.join(5)
+    assert cache.get_entry("k").value == "value"
+
+
+def test_waiter_takes_over_a_cancelled_load():
+    cache = EntryCache(ttl=60)
+    started, cancel = threading.Event(), threading.Event()
+
+    def cancelled_loader():
+        started.set()
+        cancel.wait(5)
+        raise LoadCancelled("leader cancelled")
+
+    errors = []
+    leader = threading.Thread(target=lambda: errors.append(pytest.raises(LoadCancelled, cache.get_or_load,
+                                                                         "k", cancelled_loader)))
+    leader.start()
+    started.wait(5)
+
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(cache.get_or_load("k", lambda: "waiter value")))
+    waiter.start()
+    cancel.set()
+    leader.join(5)
+    waiter.join(5)
+    assert len(errors) == 1
+    assert result == ["waiter value"]
+    assert cache.get_entry("k").value == "waiter value"
+
+
+@pytest.fixture
+def gated_clockify(clockify, monkeypatch):
+    """FakeClockify whose requests block until the returned gate is set."""
+    entered, gate = threading.Event(), threading.Event()
+
+    def get(session, url, **kwargs):
+        entered.set()
+        gate.wait(5)
+        return clockify.get(url, **kwargs)
+
+    monkeypatch.setattr(requests.Session, "get", get)
+    return entered, gate
+
+
+def test_background_load_cancel(gated_clockify):
+    entered, gate = gated_clockify
+    load = BackgroundLoad(*JUNE, workspace=API_WORKSPACE)
+    entered.wait(5)
+    load.cancel()
+    gate.set()
+    wait_until(lambda: load.done)
+    assert load.cancelled
+    assert isinstance(load.error, LoadCancelled)
+    assert load.result is None
+    assert cache_for(API_WORKSPACE.id).get_entry((API_WORKSPACE.id, *JUNE)) is None
+
+
+def test_background_load_takes_over_cancelled_session(gated_clockify):
+    """Two sessions load the same period; the first cancels, the waiting second one loads it."""
+    entered, gate = gated_clockify
+    first = BackgroundLoad(*JUNE, workspace=API_WORKSPACE)
+    entered.wait(5)
+
+    run = start_run("second")
+    second = BackgroundLoad(*JUNE, run=run, workspace=API_WORKSPACE)
+    wait_until(lambda: run.counts["cache_waits"] == 1)
+    first.cancel()
+    gate.set()
+
+    wait_until(lambda: first.done and second.done)
+    assert isinstance(first.error, LoadCancelled)
+    assert second.error is None
+    assert sorted(second.result["entry_id"]) == ["a1", "a2", "a3", "b1"]
+    assert second.progress() == (2, 2)
+    assert cache_for(API_WORKSPACE.id).get_entry((API_WORKSPACE.id, *JUNE)).value is second.result
+
+
+@pytest.fixture
+def partitions(monkeypatch):
+    """Empty set of cache partitions, and two workspaces served by FakeClockify."""
+    monkeypatch.setattr(entry_cache, "_CACHES", {})
+    fake = FakeClockify(API_USERS, entries_in_period(API_ENTRIES))
+    fake.install(monkeypatch)
+    return [Workspace(id=f"ws-{name}", api_key=name, base_url="https://clockify.test", rate_limit=1e9)
+            for name in ("a", "b")]
+
+
+def test_cache_for_returns_one_partition_per_workspace(partitions):
+    assert cache_for("ws-a") is cache_for("ws-a")
+    assert cache_for("ws-a") is not cache_for("ws-b")
+
+
+def test_loads_are_cached_in_their_workspace_partition(partitions):
+    a, b = partitions
+    df_a = load_entries(*JUNE, workspace=a)
+    assert cache_for(a.id).get_entry((a.id, *JUNE)).value is df_a
+    assert cache_for(b.id).get_entry((b.id, *JUNE)) is None
+    assert cache_for(b.id).get_entry((a.id, *JUNE)) is None
+
+
+def test_workspace_cannot_evict_another(partitions):
+    a, b = partitions
+    cache_for(a.id).max_entries = cache_for(b.id).max_entries = 2
+    load_entries(*JUNE, workspace=a)
+    days = [(f"2025-06-{day:02d}T00:00:00Z", f"2025-06-{day:02d}T23:59:59Z") for day in range(1, 6)]
+    for period in days:
+        load_entries(*period, workspace=b)
+    assert cache_for(a.id).get_entry((a.id, *JUNE)) is not None
+    assert [cache_for(b.id).get_entry((b.id, *period)) is not None for period in days] == [False] * 3 + [True] * 2
+
+
+def test_load_entries_for_workspaces(partitions):
+    a, b = partitions
+    frames = load_entries_for_workspaces(*JUNE, partitions)
+    assert list(frames) == [a.id, b.id]
+    assert len(frames[a.id]) == len(frames[b.id]) == 4
+    assert cache_for(b.id).get_entry((b.id, *JUNE)).value is frames[b.id]
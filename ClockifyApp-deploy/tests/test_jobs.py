@@ -0,0 +1,167 @@
+"""Tests of the persistent report job queue (app_Flask/jobs.py)."""
+import threading
+import time
+import os
+
+import pytest
+
+from app_Flask.jobs import JobQueue, DONE, FAILED, QUEUED, RUNNING
+
+
+PARAMS = {"workspace": "ws-test", "start": "2025-06-01T00:00:00Z", "end": "2025-06-30T23:59:59Z",
+          "client": "Acme GmbH", "projects": []}
+
+
+class FakeRender:
+    """render(params) for the queue: records calls and returns a small PDF."""
+
+    def __init__(self, error: Exception = None):
+        self.calls = []
+        self.error = error
+
+    def __call__(self, params):
+        self.calls.append(params)
+        if self.error:
+            raise self.error
+        return b"%PDF-" + params["client"].encode(), f"{params['client']}.pdf"
+
+
+def make_queue(tmp_path, render=None, **kwargs) -> JobQueue:
+    return JobQueue(tmp_path / "jobs", workers=1, render=render or FakeRender(), **kwargs)
+
+
+def set_columns(queue: JobQueue, job_id: str, **values):
+    """Rewrite job columns directly, e.g. to let time pass for a lease or a result."""
+    assignments = ", ".join(f"{name} = ?" for name in values)
+    with queue._connect() as conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*values.values(), job_id))
+
+
+def test_submit_and_run(tmp_path):
+    render = FakeRender()
+    queue = make_queue(tmp_path, render)
+    job = queue.submit(PARAMS)
+    assert job["status"] == QUEUED and job["params"] == PARAMS
+
+    assert queue.run_one()
+    assert not queue.run_one()
+    job = queue.get(job["id"])
+    assert job["status"] == DONE
+    assert job["filename"] == "Acme GmbH.pdf"
+    assert queue.result_path(job["id"]).read_bytes() == b"%PDF-Acme GmbH"
+    assert render.calls == [PARAMS]
+    assert not list(queue.results_dir.glob("*.tmp"))
+
+
+def test_submit_deduplicates_by_job_key(tmp_path):
+    queue = make_queue(tmp_path)
+    job = queue.submit(PARAMS)
+    # Same parameters in another order: same job while queued, running or recently done
+    assert queue.submit(dict(reversed(list(PARAMS.items()))))["id"] == job["id"]
+    assert queue.submit(dict(PARAMS, client="Beta AG"))["id"] != job["id"]
+    queue.run_one()
+    assert queue.submit(PARAMS) == queue.get(job["id"])
+
+
+def test_outdated_result_runs_again_under_same_id(tmp_path):
+    render = FakeRender()
+    queue = make_queue(tmp_path, render)
+    job = queue.submit(PARAMS)
+    queue.run_one()
+    set_columns(queue, job["id"], finished_at=time.time() - queue.result_ttl - 1)
+
+    again = queue.submit(PARAMS)
+    assert again["id"] == job["id"] and again["status"] == QUEUED
+    queue.run_one()
+    assert len(render.calls) == 2
+
+
+def test_failure_status(tmp_path):
+    queue = make_queue(tmp_path, FakeRender(ValueError("Keine Einträge gefunden.")))
+    job = queue.submit(PARAMS)
+    assert queue.run_one()
+    job = queue.get(job["id"])
+    assert job["status"] == FAILED
+    assert job["error"] == "Keine Einträge gefunden."
+    assert not queue.result_path(job["id"]).exists()
+
+    # A failed job is queued again on the next submission
+    assert queue.submit(PARAMS)["status"] == QUEUED
+
+
+def test_running_job_is_requeued_after_restart(tmp_path):
+    queue = make_queue(tmp_path)
+    job = queue.submit(PARAMS)
+    # The worker dies after claiming the job
+    queue._claim()
+    assert queue.get(job["id"])["status"] == RUNNING
+
+    render = FakeRender()
+    restarted = make_queue(tmp_path, render)
+    assert not restarted.run_one()      # lease still held
+    set_columns(restarted, job["id"], lease_until=time.time() - 1)
+    assert restarted.run_one()
+    assert restarted.get(job["id"])["status"] == DONE
+    assert render.calls == [PARAMS]
+
+
+def test_expired_lease_is_reclaimed_and_old_worker_cannot_finish(tmp_path):
+    queue = make_queue(tmp_path)
+    job = queue.submit(PARAMS)
+    _, stale_claim = queue._claim()
+    set_columns(queue, job["id"], lease_until=time.time() - 1)
+
+    other = make_queue(tmp_path)
+    row, claim = other._claim()
+    assert row["id"] == job["id"] and claim != stale_claim
+    # The first worker comes back: its outcome is discarded
+    assert not queue._finish(job["id"], stale_claim, FAILED, error="zu spät")
+    assert other._finish(job["id"], claim, DONE, filename="x.pdf")
+    assert queue.get(job["id"])["status"] == DONE
+
+
+def test_lease_is_renewed_while_rendering(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_render(params):
+        started.set()
+        release.wait(10)
+        return b"%PDF-slow", "slow.pdf"
+
+    queue = make_queue(tmp_path, slow_render, lease_seconds=0.6)
+    job = queue.submit(PARAMS)
+    worker = threading.Thread(target=queue.run_one)
+    worker.start()
+    try:
+        assert started.wait(10)
+        second = make_queue(tmp_path, pytest.fail, lease_seconds=0.6)
+        deadline = time.monotonic() + 2.0   # more than three lease periods
+        while time.monotonic() < deadline:
+            assert not second.run_one()
+            time.sleep(0.05)
+    finally:
+        release.set()
+        worker.join(10)
+    assert queue.get(job["id"])["status"] == DONE
+
+
+def test_prune_deletes_expired_jobs_and_results(tmp_path):
+    queue = make_queue(tmp_path)
+    done = queue.submit(PARAMS)
+    queue.run_one()
+    recent = queue.submit(dict(PARAMS, client="Beta AG"))
+    queue.run_one()
+    queued = queue.submit(dict(PARAMS, client="Gamma KG"))
+    set_columns(queue, done["id"], finished_at=time.time() - queue.result_ttl - 1)
+    orphan = queue.results_dir / "dead-worker.abc.tmp"
+    orphan.write_bytes(b"%PDF")
+    old = time.time() - queue.lease_seconds - 1
+    os.utime(orphan, (old, old))
+
+    assert queue.prune() == 1
+    assert queue.get(done["id"]) is None
+    assert not queue.result_path(done["id"]).exists()
+    assert queue.get(recent["id"])["status"] == DONE
+    assert queue.result_path(recent["id"]).exists()
+    assert queue.get(queued["id"])["status"] == QUEUED
+    assert not orphan.exists()
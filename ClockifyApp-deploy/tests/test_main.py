@@ -0,0 +1,242 @@
+"""Unit tests of main.py: rate limiting, workspace configuration, raw data export and report bundles."""
+from datetime import datetime
+from io import BytesIO
+import json
+
+import pandas as pd
+import pytest
+
+import main
+from main import RateLimiter, Workspace, load_workspaces, DEFAULT_WORKSPACE
+from main import EXPORT_COLUMNS, export_entries, iter_export_chunks, normalize_entries
+from main import build_report_sections, generate_report_bundle_pdf_bytes, LOGO_PATH, COMPANY_NAME
+from conftest import API_ENTRIES
+
+
+class FakeClock:
+    """
+    monotonic() / sleep() pair where sleeping advances the time instantly.
+    The tests use power-of-two rates, so the waits add up exactly.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def limiter(rate: float) -> tuple[RateLimiter, FakeClock]:
+    clock = FakeClock()
+    return RateLimiter(rate, clock=clock.monotonic, sleep=clock.sleep), clock
+
+
+def test_rate_limiter_allows_a_burst_of_rate_requests():
+    bucket, clock = limiter(4)
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [0.25]
+
+
+def test_rate_limiter_refills_up_to_rate():
+    bucket, clock = limiter(4)
+    for _ in range(4):
+        bucket.acquire()
+    # Idle for 10 s: the bucket holds 4 tokens again, not 40
+    clock.now += 10
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.sleeps == []
+    bucket.acquire()
+    assert len(clock.sleeps) == 1
+
+
+def test_rate_limiter_throughput():
+    bucket, clock = limiter(8)
+    for _ in range(40):
+        bucket.acquire()
+    # 8 from the initial burst, the other 32 at 8 per second
+    assert clock.now == 4.0
+
+
+def test_rate_limiter_per_workspace():
+    a = Workspace(id="rate-a", api_key="a", rate_limit=3)
+    b = Workspace(id="rate-b", api_key="b", rate_limit=7)
+    assert main.rate_limiter_for(a) is main.rate_limiter_for(a)
+    assert main.rate_limiter_for(a) is not main.rate_limiter_for(b)
+    assert main.rate_limiter_for(b).rate == 7
+
+
+@pytest.fixture
+def no_workspace_config(monkeypatch):
+    monkeypatch.delenv("CLOCKIFY_WORKSPACES", raising=False)
+    monkeypatch.delenv("CLOCKIFY_WORKSPACES_FILE", raising=False)
+    return monkeypatch
+
+
+def test_load_workspaces_default(no_workspace_config):
+    assert load_workspaces() == [DEFAULT_WORKSPACE]
+
+
+def test_load_workspaces_from_env(no_workspace_config):
+    no_workspace_config.setenv("CLOCKIFY_WORKSPACES", json.dumps([
+        {"id": "ws-a", "api_key": "key-a", "name": "Team A"},
+        {"id": "ws-b", "api_key": "key-b", "rate_limit": 20},
+    ]))
+    a, b = load_workspaces()
+    assert a == Workspace(id="ws-a", api_key="key-a", name="Team A")
+    assert a.label == "Team A" and a.base_url == main.BASE_URL
+    assert b.rate_limit == 20 and b.label == "ws-b"
+    assert b.headers == {"X-Api-Key": "key-b", "Content-Type": "application/json"}
+
+
+def test_load_workspaces_from_file(no_workspace_config, tmp_path):
+    path = tmp_path / "workspaces.json"
+    path.write_text(json.dumps([{"id": "ws-file", "api_key": "key", "base_url": "http://localhost:8099"}]),
+                    encoding="utf-8")
+    no_workspace_config.setenv("CLOCKIFY_WORKSPACES_FILE", str(path))
+    assert load_workspaces() == [Workspace(id="ws-file", api_key="key", base_url="http://localhost:8099")]
+
+    # The variable wins over the file
+    no_workspace_config.setenv("CLOCKIFY_WORKSPACES", json.dumps([{"id": "ws-env", "api_key": "key"}]))
+    assert [ws.id for ws in load_workspaces()] == ["ws-env"]
+
+
+@pytest.mark.parametrize("raw, error", [
+    ('[{"id": "ws", "api_key": "key", "token": "x"}]', TypeError),
+    ('[{"id": "ws"}]', TypeError),
+    ('{"id": "ws", "api_key": "key"', json.JSONDecodeError),
+])
+def test_load_workspaces_invalid(no_workspace_config, raw, error):
+    no_workspace_config.setenv("CLOCKIFY_WORKSPACES", raw)
+    with pytest.raises(error):
+        load_workspaces()
+
+
+@pytest.fixture
+def export_frame() -> pd.DataFrame:
+    """The June and July entries of API_ENTRIES in the report columns."""
+    return pd.concat([normalize_entries(API_ENTRIES["u-anna"], user_name="Anna Beispiel"),
+                      normalize_entries(API_ENTRIES["u-bernd"], user_name="Bernd Test")], ignore_index=True)
+
+
+def expected_export(df: pd.DataFrame) -> pd.DataFrame:
+    return df[list(EXPORT_COLUMNS)].rename(columns=EXPORT_COLUMNS)
+
+
+def test_iter_export_chunks(export_frame):
+    chunks = list(iter_export_chunks(export_frame, chunk_rows=2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert all(list(c.columns) == list(EXPORT_COLUMNS.values()) for c in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected_export(export_frame))
+
+
+def test_iter_export_chunks_of_empty_frame():
+    chunks = list(iter_export_chunks(pd.DataFrame(), chunk_rows=2))
+    assert len(chunks) == 1 and chunks[0].empty
+    assert list(chunks[0].columns) == list(EXPORT_COLUMNS.values())
+
+
+def test_csv_round_trip(export_frame):
+    sink = BytesIO()
+    main.write_entries_csv(export_frame, sink, chunk_rows=2)
+    data = sink.getvalue()
+    assert data.startswith(b"\xef\xbb\xbf") and data.count(b"\xef\xbb\xbf") == 1
+
+    df = pd.read_csv(BytesIO(data), sep=";", decimal=",", encoding="utf-8-sig", dtype={"Datum": str})
+    pd.testing.assert_frame_equal(df, expected_export(export_frame), check_dtype=False)
+
+
+def test_xlsx_round_trip(export_frame):
+    pytest.importorskip("openpyxl")
+    sink = BytesIO()
+    main.write_entries_xlsx(export_frame, sink, chunk_rows=2)
+
+    df = pd.read_excel(BytesIO(sink.getvalue()), sheet_name="Einträge")
+    assert df["Datum"].iloc[0] == datetime(2025, 6, 2)
+    df["Datum"] = df["Datum"].dt.strftime("%d.%m.%Y")
+    pd.testing.assert_frame_equal(df, expected_export(export_frame), check_dtype=False)
+
+
+def test_parquet_round_trip(export_frame):
+    pytest.importorskip("pyarrow")
+    sink = BytesIO()
+    main.write_entries_parquet(export_frame, sink, chunk_rows=2)
+
+    import pyarrow.parquet as pq
+    parquet = pq.ParquetFile(BytesIO(sink.getvalue()))
+    assert parquet.metadata.num_row_groups == 3
+    df = parquet.read().to_pandas()
+    assert df["Datum"].iloc[0] == datetime(2025, 6, 2).date()
+    df["Datum"] = pd.to_datetime(df["Datum"]).dt.strftime("%d.%m.%Y")
+    pd.testing.assert_frame_equal(df, expected_export(export_frame), check_dtype=False)
+
+
+def test_export_entries(export_frame):
+    sink = BytesIO()
+    export_entries(export_frame, "csv", sink)
+    assert sink.getvalue().decode("utf-8-sig").splitlines()[0] == ";".join(EXPORT_COLUMNS.values())
+    with pytest.raises(ValueError):
+        export_entries(export_frame, "pdf", BytesIO())
+    assert "csv" in main.available_export_formats()
+
+
+def test_report_sections_per_client(export_frame):
+    sections = build_report_sections(export_frame)
+    assert [s["title"] for s in sections] == ["Acme GmbH – Beratung, Shop", "Beta AG – Intern"]
+    assert [s["total_hours"] for s in sections] == [7.5, 0.5]
+    acme = sections[0]
+    assert acme["months_range"] == "Juni/Juli 2025"
+    # Entries of all users, sorted by date
+    assert [row[2] for row in acme["rows"]] == ["02.06.2025", "03.06.2025", "04.06.2025", "01.07.2025"]
+
+
+def test_report_sections_per_project(export_frame):
+    sections = build_report_sections(export_frame, by_project=True)
+    assert [(s["client"], s["projects"]) for s in sections] == [
+        ("Acme GmbH", ["Beratung"]), ("Acme GmbH", ["Shop"]), ("Beta AG", ["Intern"])]
+    assert [s["total_hours"] for s in sections] == [1.5, 6.0, 0.5]
+    assert sum(len(s["rows"]) for s in sections) == len(export_frame)
+
+
+def test_report_sections_of_empty_frame():
+    assert build_report_sections(pd.DataFrame()) == []
+
+
+def bundle_section(title: str, rows: int) -> dict:
+    return {
+        "title": title,
+        "months_range": "Juni 2025",
+        "rows": [[f"{title} Eintrag {i}", "Allgemein", "02.06.2025", "1,00"] for i in range(rows)],
+        "total_hours": float(rows),
+    }
+
+
+def test_bundle_outline_and_totals():
+    pypdf = pytest.importorskip("pypdf")
+    # The first section spans several pages
+    sections = [bundle_section("Zeta AG", 120), bundle_section("Acme GmbH", 3), bundle_section("Beta AG", 1)]
+    reader = pypdf.PdfReader(BytesIO(generate_report_bundle_pdf_bytes(LOGO_PATH, COMPANY_NAME, sections)))
+
+    # Bookmarks in section order, each on the first page of its section
+    outline = [(item.title, reader.get_destination_page_number(item)) for item in reader.outline]
+    assert [title for title, _ in outline] == ["Zeta AG", "Acme GmbH", "Beta AG"]
+    first_pages = [page for _, page in outline]
+    assert first_pages[0] == 0 and first_pages[1] > 1 and first_pages[2] == first_pages[1] + 1
+    assert first_pages[2] == len(reader.pages) - 1
+
+    texts = [page.extract_text() for page in reader.pages]
+    for (title, first), section, last in zip(outline, sections, first_pages[1:] + [len(reader.pages)]):
+        section_text = "\n".join(texts[first:last])
+        assert section_text.count("Gesamtaufwand:") == 1
+        assert f"Gesamtaufwand:\n{section['total_hours']:.2f} h".replace(".", ",") in section_text
+        assert all(f"{title} Eintrag {i}" in section_text for i in range(len(section["rows"])))
+        assert texts[first].count("Stundenaufstellung Juni 2025") == 1
@@ -0,0 +1,42 @@
+"""Tests of the worker pool of the parallel PDF rendering (parallel_render.py)."""
+import os
+
+import pytest
+
+import parallel_render
+from main import COMPANY_NAME, LOGO_PATH, generate_report_pdf_bytes
+
+
+pytest.importorskip("pypdf")
+
+ROWS = [[f"Eintrag {i}", "Allgemein", "02.06.2025", "1,00"] for i in range(100)]
+ARGS = (LOGO_PATH, COMPANY_NAME, "Juni 2025", ROWS, float(len(ROWS)))
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr(parallel_render, "PARALLEL_RENDER_MIN_ROWS", 1)
+    monkeypatch.setattr(parallel_render, "RENDER_PROCESSES", 2)
+
+
+def test_default_processes_are_capped():
+    assert 1 <= parallel_render.RENDER_PROCESSES
+    if "CLOCKIFY_RENDER_PROCESSES" not in os.environ:
+        assert parallel_render.RENDER_PROCESSES <= parallel_render.MAX_DEFAULT_PROCESSES
+
+
+def test_broken_pool_falls_back_to_serial_and_is_replaced(parallel, caplog):
+    pool = parallel_render._executor()
+    # A worker dies (e.g. killed by the OOM killer)
+    with pytest.raises(parallel_render.BrokenProcessPool):
+        pool.submit(os._exit, 1).result(timeout=60)
+
+    pages = []
+    pdf = generate_report_pdf_bytes(*ARGS, progress=lambda page, total: pages.append((page, total)))
+    assert pdf.startswith(b"%PDF") and pages[-1][0] == pages[-1][1]
+    assert "pool broken" in caplog.text
+    assert parallel_render._pool is None
+
+    # The next report starts a new pool
+    assert generate_report_pdf_bytes(*ARGS).startswith(b"%PDF")
+    assert parallel_render._pool is not None and parallel_render._pool is not pool
@@ -0,0 +1,290 @@
+"""
+Golden-output regression tests of the report pipeline.
+
+Fixed synthetic datasets go through the same steps as a report run:
+get_entries_by_date (against FakeClockify) -> client filter ->
+get_months_range_string / build_pdf_filename / build_report_rows ->
+generate_report_pdf_bytes. Entries, totals, titles, filenames, table rows
+and the text extracted from the PDFs must equal tests/golden/<dataset>.json;
+the large dataset stores SHA-256 digests instead of the full content.
+
+Every stage also has a time and memory budget per dataset in
+tests/budgets.json. The budgets are several times the measured values, so
+they catch regressions by a multiple, not noise; wall-clock times still
+depend on the machine and its load, so CLOCKIFY_BUDGET_FACTOR scales them
+further (e.g. 3 on a slow CI machine) and ``pytest --no-budgets`` or
+CLOCKIFY_SKIP_BUDGETS=1 skips them.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+import tracemalloc
+import hashlib
+import json
+import time
+import os
+
+import pandas as pd
+import pytest
+
+import main
+from main import (
+    Workspace,
+    get_entries_by_date,
+    get_months_range_string,
+    build_pdf_filename,
+    build_report_rows,
+    generate_report_pdf_bytes,
+    LOGO_PATH,
+    COMPANY_NAME,
+)
+from mock_clockify import MockData
+from conftest import FakeClockify, Golden, entry
+
+
+BUDGETS_PATH = Path(__file__).resolve().parent / "budgets.json"
+BUDGET_FACTOR = float(os.environ.get("CLOCKIFY_BUDGET_FACTOR", 1))
+SKIP_BUDGETS = os.environ.get("CLOCKIFY_SKIP_BUDGETS", "").lower() in ("1", "true", "yes")
+
+# No rate limiting against the fake API
+WORKSPACE = Workspace(id="golden", api_key="test", name="Golden", base_url="https://clockify.test", rate_limit=1e9)
+
+STAGES = ("load", "filter", "title", "filename", "rows", "pdf")
+
+# Entry columns compared with the goldens: the report columns of the
+# original pipeline (later columns such as entry_id are not part of it)
+ENTRY_COLUMNS = ["description", "user_name", "client_id", "client_name", "project_id", "project_name",
+                 "task_name", "start", "duration_hours"]
+
+
+MUELLER = "Müller & Söhne"
+LONG_TEXT = ("Umstellung der Schnittstelle zum Warenwirtschaftssystem inklusive Abstimmung mit dem "
+             "Kunden, Anpassung der Feldzuordnung, Tests mit Echtdaten und Dokumentation der "
+             "Änderungen für den Betrieb")
+
+# Edge cases: year change, non-consecutive months, special characters,
+# wrapped descriptions, missing task / project, several entries per day.
+EDGE_USERS = [{"id": "u-anna", "name": "Anna Beispiel"}, {"id": "u-bernd", "name": "Bernd Test"}]
+EDGE_ENTRIES = {
+    "u-anna": [
+        entry("e1", "u-anna", "2024-12-30", "08:00", 1.5, "Fehlerbehebung Warenkorb <Checkout> & Versand",
+              MUELLER, "Web/Shop", "Entwicklung"),
+        entry("e2", "u-anna", "2025-01-02", "09:15", 3.25, LONG_TEXT, MUELLER, "Web/Shop"),
+        entry("e3", "u-anna", "2025-01-15", "13:00", 0.25, "", MUELLER, "Beratung", ""),
+        entry("e4", "u-anna", "2025-03-03", "07:30", 2.0, "Ticket ABC-123: Ümlaut-Test", MUELLER, "Beratung",
+              "Beratung"),
+        entry("e5", "u-anna", "2025-02-10", "10:00", 0.75, "Interne Abstimmung ohne Projekt"),
+    ],
+    "u-bernd": [
+        entry("e6", "u-bernd", "2025-02-10", "08:00", 4.0, "Jahresplanung", "Acme GmbH", "Intern", "Planung"),
+        entry("e7", "u-bernd", "2025-03-01", "16:45", 1.0, "Review 100% erledigt", "Acme GmbH", "Intern"),
+        entry("e8", "u-bernd", "2025-01-02", "14:00", 0.5, "Rückfrage zum Warenkorb", MUELLER, "Web/Shop",
+              "Entwicklung"),
+    ],
+}
+
+
+@dataclass
+class Dataset:
+    users: list[dict]
+    entries: object       # entries(user_id, start, end) -> list of time entries
+    start: str
+    end: str
+    page_size: int        # small pages make fetch_all go through several of them
+    full: bool = True     # golden stores full content (False: digests)
+
+
+def mock_dataset(mock: MockData, start: str, end: str, page_size: int, full: bool = True) -> Dataset:
+    """Dataset of tools/mock_clockify.py (deterministic random entries)."""
+    return Dataset(mock.users, mock.time_entries, start, end, page_size, full)
+
+
+DATASETS = {
+    "edge": Dataset(EDGE_USERS, lambda user_id, start, end: EDGE_ENTRIES[user_id],
+                    "2024-12-01T00:00:00Z", "2025-03-31T23:59:59Z", page_size=2),
+    "month": mock_dataset(MockData(users=3, entries=40, clients=2, projects=2),
+                          "2025-06-01T00:00:00Z", "2025-06-30T23:59:59Z", page_size=15),
+    "volume": mock_dataset(MockData(users=10, entries=300, clients=5),
+                           "2025-06-01T00:00:00Z", "2025-06-30T23:59:59Z", page_size=200, full=False),
+}
+
+
+class StageMeter:
+    """
+    Wall time (summed) per pipeline stage, and the tracemalloc peak (max) of
+    the stages in ``traced``. Tracing slows allocations down, so only those
+    stages run under tracemalloc.
+    """
+
+    def __init__(self, traced=()):
+        self.traced = set(traced)
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.peak_mb: dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def __call__(self, stage: str):
+        trace = stage in self.traced
+        if trace:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - t0
+            if trace:
+                self.peak_mb[stage] = max(self.peak_mb[stage], tracemalloc.get_traced_memory()[1] / (1024 * 1024))
+                tracemalloc.stop()
+
+
+def run_pipeline(dataset: Dataset, meter: StageMeter) -> dict:
+    """Load the dataset's period and build the standard report of every client."""
+    with pytest.MonkeyPatch.context() as mp:
+        FakeClockify(dataset.users, dataset.entries).install(mp)
+        mp.setattr(main, "PAGE_SIZE", dataset.page_size)
+        with meter("load"):
+            df = get_entries_by_date(dataset.start, dataset.end, workspace=WORKSPACE)
+
+    reports = {}
+    for client in sorted(c for c in df["client_name"].unique() if c):
+        with meter("filter"):
+            df_selected = df[df["client_name"] == client].sort_values(
+                by="start", key=lambda x: pd.to_datetime(x, dayfirst=True))
+        with meter("title"):
+            months_range = get_months_range_string(df_selected)
+        with meter("filename"):
+            dates = pd.to_datetime(df_selected["start"], dayfirst=True)
+            projects = sorted(p for p in df_selected["project_name"].unique() if p)
+            filenames = [
+                build_pdf_filename(client, projects, dates.min(), dates.max()),
+                build_pdf_filename(client, projects[:1], dates.min(), dates.max()),
+                build_pdf_filename(client, ["Alle Projekte"], dates.min(), dates.max()),
+            ]
+        total_hours = df_selected["duration_hours"].sum()
+        with meter("rows"):
+            rows = build_report_rows(df_selected)
+        with meter("pdf"):
+            pdf_bytes = generate_report_pdf_bytes(
+                logo_path=str(LOGO_PATH),
+                company_name=COMPANY_NAME,
+                months_range=months_range,
+                rows=rows,
+                total_hours=total_hours
+            )
+        reports[client] = {
+            "title": months_range,
+            "filenames": filenames,
+            "total_hours": total_hours,
+            "rows": rows,
+            "pdf": pdf_bytes,
+        }
+    return {"entries": df, "reports": reports}
+
+
+def digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def pdf_text(pdf_bytes: bytes) -> list[list[str]]:
+    """Text lines of every page, whitespace-normalized."""
+    pypdf = pytest.importorskip("pypdf")
+    reader = pypdf.PdfReader(BytesIO(pdf_bytes))
+    pages = []
+    for page in reader.pages:
+        lines = (" ".join(line.split()) for line in page.extract_text().splitlines())
+        pages.append([line for line in lines if line])
+    return pages
+
+
+@pytest.fixture(scope="module", params=sorted(DATASETS))
+def pipeline(request, update_golden):
+    name = request.param
+    result = run_pipeline(DATASETS[name], StageMeter())
+    result["name"] = name
+    result["dataset"] = DATASETS[name]
+    result["golden"] = Golden(name, update_golden)
+    return result
+
+
+def test_entries(pipeline):
+    df = pipeline["entries"]
+    golden = pipeline["golden"]
+    assert set(ENTRY_COLUMNS) <= set(df.columns)
+    golden.check("entries_summary", {
+        "count": len(df),
+        "total_hours": round(df["duration_hours"].sum(), 6),
+        "hours_by_client": {c: round(h, 6) for c, h in df.groupby("client_name")["duration_hours"].sum().items()},
+        "users": sorted(df["user_name"].unique()),
+    })
+    df = df[ENTRY_COLUMNS]
+    records = df.assign(duration_hours=df["duration_hours"].round(6)).to_dict(orient="records")
+    if pipeline["dataset"].full:
+        golden.check("entries", records)
+    else:
+        golden.check("entries_digest", digest(records))
+
+
+def test_titles_and_filenames(pipeline):
+    reports = pipeline["reports"]
+    pipeline["golden"].check("titles", {client: r["title"] for client, r in reports.items()})
+    pipeline["golden"].check("filenames", {client: r["filenames"] for client, r in reports.items()})
+
+
+def test_rows_and_totals(pipeline):
+    reports = pipeline["reports"]
+    pipeline["golden"].check("total_hours", {client: round(r["total_hours"], 6) for client, r in reports.items()})
+    rows = {client: r["rows"] for client, r in reports.items()}
+    if pipeline["dataset"].full:
+        pipeline["golden"].check("rows", rows)
+    else:
+        pipeline["golden"].check("row_counts", {client: len(r) for client, r in rows.items()})
+        pipeline["golden"].check("rows_digest", digest(rows))
+
+
+def test_pdf_text(pipeline):
+    texts = {client: pdf_text(r["pdf"]) for client, r in pipeline["reports"].items()}
+    pipeline["golden"].check("pdf_pages", {client: len(pages) for client, pages in texts.items()})
+    if pipeline["dataset"].full:
+        pipeline["golden"].check("pdf_text", texts)
+    else:
+        pipeline["golden"].check("pdf_text_digest", digest(texts))
+
+
+def test_parallel_render_matches_serial(monkeypatch):
+    pytest.importorskip("pypdf")
+    import parallel_render
+
+    # Small enough threshold that the month dataset's clients are rendered by workers
+    monkeypatch.setattr(parallel_render, "PARALLEL_RENDER_MIN_ROWS", 1)
+    monkeypatch.setattr(parallel_render, "RENDER_PROCESSES", 2)
+    reports = run_pipeline(DATASETS["month"], StageMeter())["reports"]
+    golden = Golden("month", update=False)
+    golden.check("pdf_text", {client: pdf_text(r["pdf"]) for client, r in reports.items()})
+
+
+def load_budgets() -> dict:
+    return json.loads(BUDGETS_PATH.read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("name", sorted(load_budgets()))
+def test_stage_budgets(name, request):
+    if SKIP_BUDGETS or request.config.getoption("--no-budgets"):
+        pytest.skip("stage budgets skipped (--no-budgets / CLOCKIFY_SKIP_BUDGETS)")
+    budgets = load_budgets()[name]
+    dataset = DATASETS[name]
+
+    # Time without tracemalloc, memory in a second run
+    timing = StageMeter()
+    run_pipeline(dataset, timing)
+    memory = StageMeter(traced=[stage for stage, budget in budgets.items() if "peak_mb" in budget])
+    run_pipeline(dataset, memory)
+
+    over = []
+    for stage, budget in budgets.items():
+        assert stage in STAGES, f"Unknown stage '{stage}' in budgets.json"
+        if "seconds" in budget and timing.seconds[stage] > budget["seconds"] * BUDGET_FACTOR:
+            over.append(f"{stage}: {timing.seconds[stage]:.3f} s > {budget['seconds'] * BUDGET_FACTOR:.3f} s")
+        if "peak_mb" in budget and memory.peak_mb[stage] > budget["peak_mb"] * BUDGET_FACTOR:
+            over.append(f"{stage}: {memory.peak_mb[stage]:.1f} MB > {budget['peak_mb'] * BUDGET_FACTOR:.1f} MB")
+    assert not over, f"{name} over budget: " + "; ".join(over)
@@ -0,0 +1,128 @@
+"""Tests of phase timing, counters and run publishing (pipeline_metrics.py)."""
+import json
+import logging
+import threading
+
+import pytest
+
+import pipeline_metrics
+from pipeline_metrics import activate, current_run, incr, last_run, phase, publish, start_run, track_run
+
+
+@pytest.fixture
+def metrics_log(caplog):
+    """Records of the clockify.metrics logger (it does not propagate to the root logger)."""
+    pipeline_metrics.logger.addHandler(caplog.handler)
+    caplog.set_level(logging.INFO, logger="clockify.metrics")
+    yield caplog
+    pipeline_metrics.logger.removeHandler(caplog.handler)
+
+
+def test_recording_without_run_is_a_no_op():
+    assert current_run() is None
+    before = pipeline_metrics.render_prometheus()
+    with phase("filter"):
+        incr("rows", 5)
+    assert pipeline_metrics.render_prometheus() == before
+
+
+def test_phase_and_incr_record_into_the_active_run():
+    run = start_run("test")
+    with activate(run):
+        assert current_run() is run
+        with phase("filter"):
+            incr("rows", 3)
+        with phase("filter"):
+            incr("rows")
+    assert current_run() is None
+    data = run.as_dict()
+    assert data["counts"] == {"rows": 4}
+    assert list(data["durations"]) == ["filter"] and data["durations"]["filter"] >= 0
+
+
+def test_nested_phases_are_both_timed():
+    run = start_run("test")
+    with activate(run):
+        with phase("fetch_entries"):
+            with phase("json_decode"):
+                pass
+    assert set(run.durations) == {"fetch_entries", "json_decode"}
+    assert run.durations["fetch_entries"] >= run.durations["json_decode"]
+
+
+def test_nested_track_run(metrics_log):
+    with track_run("outer") as outer:
+        incr("requests")
+        with track_run("inner") as inner:
+            incr("pages", 2)
+            assert current_run() is inner
+        # Back to the outer run after the inner one was published
+        assert current_run() is outer
+        assert last_run()["run"] == "inner"
+        incr("requests")
+    assert current_run() is None
+    assert outer.as_dict()["counts"] == {"requests": 2}
+    assert inner.as_dict()["counts"] == {"pages": 2}
+
+    lines = [r.getMessage() for r in metrics_log.records if r.getMessage().startswith("pipeline_run ")]
+    runs = [json.loads(line.split(" ", 1)[1])["run"] for line in lines]
+    assert runs[-2:] == ["inner", "outer"]
+    assert last_run()["run"] == "outer"
+
+
+def test_track_run_publishes_on_error():
+    with pytest.raises(RuntimeError):
+        with track_run("failing"):
+            incr("rows")
+            raise RuntimeError("render failed")
+    assert last_run()["run"] == "failing"
+
+
+def test_runs_do_not_mix_between_threads():
+    runs = {}
+
+    def work(name, n):
+        with track_run(name) as run:
+            for _ in range(n):
+                incr("rows")
+        runs[name] = run
+
+    threads = [threading.Thread(target=work, args=(f"t{i}", 100 * (i + 1))) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert {name: run.counts["rows"] for name, run in runs.items()} == {"t0": 100, "t1": 200, "t2": 300, "t3": 400}
+
+
+def test_publish_writes_the_metrics_file(tmp_path, monkeypatch):
+    path = tmp_path / "clockify.prom"
+    monkeypatch.setenv("CLOCKIFY_METRICS_FILE", str(path))
+    runs_before = pipeline_metrics._runs_total
+
+    run = start_run("file")
+    with activate(run):
+        with phase("pdf_build"):
+            incr("pdf_pages", 7)
+    publish(run)
+    # Publishing the same run again does not count it twice
+    publish(run)
+
+    text = path.read_text(encoding="utf-8")
+    assert f"clockify_runs_total {runs_before + 1}" in text
+    assert 'clockify_last_run_count{counter="pdf_pages"} 7' in text
+    assert 'clockify_last_run_phase_seconds{phase="pdf_build"}' in text
+    assert not path.with_name(path.name + ".tmp").exists()
+
+
+def test_unwritable_metrics_file_is_logged(tmp_path, monkeypatch, metrics_log):
+    monkeypatch.setenv("CLOCKIFY_METRICS_FILE", str(tmp_path / "missing" / "clockify.prom"))
+    publish(start_run("file"))
+    assert any(r.levelno == logging.WARNING and "could not be written" in r.getMessage()
+               for r in metrics_log.records)
+
+
+def test_metrics_logger_has_its_own_handler():
+    logger = logging.getLogger("clockify.metrics")
+    assert logger.handlers and not logger.propagate
+    assert logger.isEnabledFor(logging.INFO)
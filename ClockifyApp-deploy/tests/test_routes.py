@@ -0,0 +1,331 @@
+"""Tests of the Flask report API (app_Flask/routes.py) against FakeClockify."""
+from datetime import date, datetime, timedelta, timezone
+from io import BytesIO
+
+import pytest
+import requests
+
+from app_Flask import create_app
+from app_Flask.jobs import JobQueue
+from app_Flask.warmup import PrerenderStore, WarmupScheduler
+from conftest import API_WORKSPACE
+from entry_cache import cache_for
+import webhooks
+
+
+JUNE = {"start": "01.06.2025", "end": "30.06.2025"}
+
+
+@pytest.fixture
+def app(clockify, tmp_path):
+    queue = JobQueue(tmp_path / "jobs", workers=1)
+    scheduler = WarmupScheduler(schedule=[], store=PrerenderStore(tmp_path / "prerendered"))
+    app = create_app(job_queue=queue, scheduler=scheduler)
+    app.testing = True
+    return app
+
+
+@pytest.fixture
+def api(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def clockify_down(clockify, monkeypatch):
+    def fail(session, url, **kwargs):
+        raise requests.exceptions.ConnectionError("connection refused")
+
+    monkeypatch.setattr(requests.Session, "get", fail)
+
+
+def test_workspaces(api):
+    response = api.get("/api/workspaces")
+    assert response.status_code == 200
+    assert response.json == {"workspaces": [{"id": "ws-test", "name": "Test"}]}
+
+
+def test_clients(api):
+    response = api.get("/api/clients", query_string=JUNE)
+    assert response.status_code == 200
+    assert response.json == {"clients": ["Acme GmbH", "Beta AG"]}
+
+
+def test_projects(api):
+    response = api.get("/api/projects", query_string={**JUNE, "client": "Acme GmbH"})
+    assert response.json == {"client": "Acme GmbH", "projects": ["Beratung", "Shop"]}
+    response = api.get("/api/projects", query_string={**JUNE, "client": "Unbekannt"})
+    assert response.json == {"client": "Unbekannt", "projects": []}
+
+
+def test_entries(api):
+    response = api.get("/api/entries", query_string={**JUNE, "client": "Acme GmbH", "project": "Shop"})
+    assert response.status_code == 200
+    assert response.json["count"] == 2
+    assert [e["entry_id"] for e in response.json["entries"]] == ["a1", "b1"]
+    assert response.headers["ETag"]
+
+
+def test_entries_search(api):
+    response = api.get("/api/entries", query_string={**JUNE, "q": "ABC-123"})
+    assert [e["entry_id"] for e in response.json["entries"]] == ["a1"]
+
+
+def test_summary(api):
+    response = api.get("/api/summary", query_string={**JUNE, "client": "Acme GmbH"})
+    assert response.json == {"summary": [
+        {"client": "Acme GmbH", "project": "Beratung", "hours": 1.5},
+        {"client": "Acme GmbH", "project": "Shop", "hours": 5.0},
+    ]}
+
+
+def test_report(api):
+    response = api.get("/api/report", query_string={**JUNE, "client": "Acme GmbH"})
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
+    assert response.data.startswith(b"%PDF")
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert response.headers["Content-Disposition"].startswith("attachment; filename*=UTF-8''")
+
+
+def test_report_unknown_client(api):
+    response = api.get("/api/report", query_string={**JUNE, "client": "Unbekannt"})
+    assert response.status_code == 404
+    assert response.json == {"error": "Keine Einträge gefunden."}
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/api/entries", {**JUNE, "client": "Acme GmbH"}),
+    ("/api/report", {**JUNE, "client": "Acme GmbH"}),
+])
+def test_if_none_match(api, path, params):
+    first = api.get(path, query_string=params)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    response = api.get(path, query_string=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+    assert response.headers["Cache-Control"] == first.headers["Cache-Control"]
+
+    assert api.get(path, query_string=params, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert api.get(path, query_string=params, headers={"If-None-Match": '"other"'}).status_code == 200
+    # Other parameters, other fingerprint
+    other = api.get(path, query_string={**params, "project": "Shop"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_etag_does_not_depend_on_the_load(api):
+    etag = api.get("/api/entries", query_string=JUNE).headers["ETag"]
+    # As in another worker process: the same data loaded again
+    cache_for(API_WORKSPACE.id).invalidate()
+    assert api.get("/api/entries", query_string=JUNE).headers["ETag"] == etag
+
+
+def test_if_modified_since_is_not_used(api):
+    """No Last-Modified is sent, so If-Modified-Since alone never yields 304."""
+    first = api.get("/api/report", query_string={**JUNE, "client": "Acme GmbH"})
+    assert "Last-Modified" not in first.headers
+    since = (datetime.now(timezone.utc) + timedelta(days=1)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+    response = api.get("/api/report", query_string={**JUNE, "client": "Acme GmbH"},
+                       headers={"If-Modified-Since": since})
+    assert response.status_code == 200
+
+
+def test_cache_control(api):
+    closed = api.get("/api/entries", query_string=JUNE)
+    assert closed.headers["Cache-Control"] == "private, max-age=86400"
+
+    today = date.today().strftime("%d.%m.%Y")
+    open_period = api.get("/api/entries", query_string={"start": "01.06.2025", "end": today})
+    assert open_period.headers["Cache-Control"] == "private, no-cache"
+
+
+def test_bundle(api):
+    response = api.get("/api/bundle", query_string=JUNE)
+    assert response.status_code == 200
+    assert response.data.startswith(b"%PDF")
+
+
+def test_bundle_unknown_client(api):
+    response = api.get("/api/bundle", query_string={**JUNE, "client": "Unbekannt"})
+    assert response.status_code == 400
+
+
+def test_export_csv(api):
+    response = api.get("/api/export", query_string={**JUNE, "client": "Beta AG"})
+    assert response.status_code == 200
+    lines = response.data.decode("utf-8-sig").splitlines()
+    assert lines[0] == "Datum;Mitarbeiter;Client;Projekt;Aufgabe;Beschreibung;Stunden"
+    assert lines[1:] == ["20.06.2025;Anna Beispiel;Beta AG;Intern;Allgemein;Review Monatsabschluss;0,5"]
+
+
+def test_export_xlsx(api):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    response = api.get("/api/export", query_string={**JUNE, "format": "xlsx"})
+    assert response.status_code == 200
+    df = pd.read_excel(BytesIO(response.data))
+    assert len(df) == 4
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/api/clients", {}),
+    ("/api/clients", {"start": "01.06.2025"}),
+    ("/api/clients", {"start": "gestern", "end": "30.06.2025"}),
+    ("/api/clients", {"start": "30.06.2025", "end": "01.06.2025"}),
+    ("/api/clients", {**JUNE, "workspace": "unbekannt"}),
+    ("/api/projects", JUNE),
+    ("/api/report", JUNE),
+    ("/api/entries", {"start": "31.02.2025", "end": "30.06.2025"}),
+    ("/api/export", {**JUNE, "format": "pdf"}),
+    ("/api/summary", {"end": "30.06.2025"}),
+])
+def test_bad_request(api, path, params):
+    response = api.get(path, query_string=params)
+    assert response.status_code == 400
+    assert response.json["error"]
+
+
+@pytest.mark.parametrize("path", ["/api/clients", "/api/entries", "/api/summary", "/api/report"])
+def test_clockify_error(api, clockify_down, path):
+    response = api.get(path, query_string={**JUNE, "client": "Acme GmbH"})
+    assert response.status_code == 502
+    assert response.json["error"].startswith("Clockify API error")
+
+
+def test_job_lifecycle(api, app):
+    response = api.post("/api/jobs", json={**JUNE, "client": "Acme GmbH", "projects": ["Shop"]})
+    assert response.status_code == 202
+    job = response.json
+    assert job["status"] == "queued"
+    assert response.headers["Location"] == job["status_url"]
+
+    # Same report: the queued job is returned
+    assert api.post("/api/jobs", json={**JUNE, "client": "Acme GmbH", "projects": ["Shop"]}).json["id"] == job["id"]
+    assert api.get(f"/api/jobs/{job['id']}/download").status_code == 409
+
+    assert app.extensions["job_queue"].run_one()
+    status = api.get(job["status_url"]).json
+    assert status["status"] == "done"
+    download = api.get(status["download_url"])
+    assert download.status_code == 200
+    assert download.data.startswith(b"%PDF")
+
+
+def test_job_form_submission(api):
+    response = api.post("/api/jobs", data={**JUNE, "client": "Acme GmbH", "project": ["Shop", "Beratung"]})
+    assert response.status_code == 202
+    assert response.json["params"]["projects"] == ["Beratung", "Shop"]
+
+
+def test_job_bad_request(api):
+    assert api.post("/api/jobs", json={**JUNE}).status_code == 400
+    assert api.post("/api/jobs", json={"client": "Acme GmbH"}).status_code == 400
+
+
+def test_unknown_job(api):
+    assert api.get("/api/jobs/unbekannt").status_code == 404
+    assert api.get("/api/jobs/unbekannt/download").status_code == 404
+
+
+def test_metrics(api):
+    api.get("/api/report", query_string={**JUNE, "client": "Acme GmbH"})
+    response = api.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+
+
+def test_webhooks_disabled(api, monkeypatch):
+    monkeypatch.setattr("webhooks.WEBHOOK_TOKENS", [])
+    response = api.post("/webhooks/clockify", json={"id": "a1"})
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def webhook_token(monkeypatch):
+    monkeypatch.setattr("webhooks.WEBHOOK_TOKENS", ["geheim"])
+    return {"Clockify-Signature": "geheim"}
+
+
+def test_webhook_updates_entries(api, webhook_token):
+    assert len(api.get("/api/entries", query_string=JUNE).json["entries"]) == 4
+    response = api.post("/webhooks/clockify", json={"id": "b1", "workspaceId": API_WORKSPACE.id},
+                        headers={**webhook_token, "Clockify-Webhook-Event-Type": "TIME_ENTRY_DELETED"})
+    assert response.status_code == 200
+    assert response.json == {"event": "TIME_ENTRY_DELETED", "updated_periods": 1}
+    assert [e["entry_id"] for e in api.get("/api/entries", query_string=JUNE).json["entries"]] == ["a1", "a2", "a3"]
+
+
+def test_webhook_received_by_another_worker(api, webhook_token):
+    api.get("/api/entries", query_string=JUNE)
+    # Another worker appended the event to the shared log
+    webhooks.EventLog(webhooks.EVENT_LOG.path.parent).append(
+        "TIME_ENTRY_DELETED", {"id": "a2", "workspaceId": API_WORKSPACE.id})
+    entries = api.get("/api/entries", query_string=JUNE).json["entries"]
+    assert sorted(e["entry_id"] for e in entries) == ["a1", "a3", "b1"]
+
+
+def test_webhook_wrong_token(api, webhook_token):
+    response = api.post("/webhooks/clockify", json={"id": "b1"},
+                        headers={"Clockify-Signature": "falsch", "Clockify-Webhook-Event-Type": "TIME_ENTRY_DELETED"})
+    assert response.status_code == 401
+    assert not webhooks.EVENT_LOG.path.exists()
+
+
+def test_webhook_other_and_invalid_events(api, webhook_token):
+    ignored = api.post("/webhooks/clockify", json={"id": "a1"},
+                       headers={**webhook_token, "Clockify-Webhook-Event-Type": "TIMER_STARTED"})
+    assert ignored.json == {"event": "TIMER_STARTED", "ignored": True}
+    invalid = api.post("/webhooks/clockify", json=[],
+                       headers={**webhook_token, "Clockify-Webhook-Event-Type": "NEW_TIME_ENTRY"})
+    assert invalid.status_code == 400
+
+
+def test_report_served_from_prerendered_store(api, app):
+    first = api.get("/api/report", query_string={**JUNE, "client": "Acme GmbH"})
+    app.extensions["prerendered"].put(first.headers["ETag"].strip('"'), b"%PDF-vorgerendert")
+
+    response = api.get("/api/report", query_string={**JUNE, "client": "Acme GmbH"})
+    assert response.data == b"%PDF-vorgerendert"
+    assert response.headers["ETag"] == first.headers["ETag"]
+    assert response.headers["Content-Disposition"] == first.headers["Content-Disposition"]
+
+
+@pytest.fixture
+def api_token(monkeypatch):
+    monkeypatch.setattr("app_Flask.services.API_TOKENS", ["api-geheim"])
+    return {"Authorization": "Bearer api-geheim"}
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer falsch"}, {"Authorization": "api-geheim"},
+                                     {"Authorization": "Basic api-geheim"}])
+def test_api_token_required(api, api_token, headers):
+    for path in ("/api/workspaces", "/api/entries", "/api/jobs/unbekannt"):
+        response = api.get(path, query_string=JUNE, headers=headers)
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"] == "Bearer"
+    assert api.post("/api/jobs", json={**JUNE, "client": "Acme GmbH"}, headers=headers).status_code == 401
+
+
+def test_api_token_accepted(api, api_token):
+    response = api.get("/api/entries", query_string=JUNE, headers=api_token)
+    assert response.status_code == 200 and response.json["count"] == 4
+    assert api.get("/api/workspaces", headers={"Authorization": "bearer api-geheim"}).status_code == 200
+
+
+def test_metrics_and_webhook_without_api_token(api, api_token, webhook_token):
+    assert api.get("/metrics").status_code == 200
+    response = api.post("/webhooks/clockify", json={"id": "b1", "workspaceId": API_WORKSPACE.id},
+                        headers={**webhook_token, "Clockify-Webhook-Event-Type": "TIME_ENTRY_DELETED"})
+    assert response.status_code == 200
+
+
+def test_malformed_webhook_is_rejected(api, webhook_token):
+    body = {"id": "n1", "workspaceId": API_WORKSPACE.id, "timeInterval": {"start": "gestern", "end": "heute"}}
+    response = api.post("/webhooks/clockify", json=body,
+                        headers={**webhook_token, "Clockify-Webhook-Event-Type": "NEW_TIME_ENTRY"})
+    assert response.status_code == 400
+    # Nothing recorded: the other routes keep working
+    assert api.get("/api/entries", query_string=JUNE).status_code == 200
+    assert api.get("/metrics").status_code == 200
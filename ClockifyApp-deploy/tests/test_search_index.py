@@ -0,0 +1,109 @@
+"""Tests of the description index (search_index.py)."""
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import search_index
+from search_index import DescriptionIndex, index_for, tokenize
+
+
+DESCRIPTIONS = [
+    "Ticket ABC-123 Checkout",      # 0
+    "Meeting Kickoff",              # 1
+    "Wartung Server",               # 2
+    "ABC-1234 Nacharbeit",          # 3
+    "Kickoff-Meeting mit Kunde",    # 4
+    None,                           # 5
+    "Ticket XABC-123",              # 6
+    "Wartungsfenster & Doku #42",   # 7
+]
+
+
+@pytest.fixture
+def index() -> DescriptionIndex:
+    return DescriptionIndex(pd.Series(DESCRIPTIONS))
+
+
+def rows(positions: np.ndarray) -> list[int]:
+    return positions.tolist()
+
+
+def test_tokenize():
+    assert tokenize("Ticket ABC-123, Checkout!") == ["ticket", "abc", "123", "checkout"]
+    assert tokenize("Übergabe an Müller") == ["übergabe", "an", "müller"]
+    assert tokenize("- # &") == []
+
+
+def test_term_and_prefix(index):
+    assert rows(index.term("kickoff")) == [1, 4]
+    assert rows(index.term("kick")) == []
+    assert rows(index.prefix("wart")) == [2, 7]
+    assert rows(index.prefix("zzz")) == []
+
+
+def test_words_are_combined_with_and(index):
+    assert rows(index.search("meeting")) == [1, 4]
+    assert rows(index.search("Meeting KICKOFF")) == [1, 4]
+    assert rows(index.search("meeting kunde")) == [4]
+    assert rows(index.search("meeting wartung")) == []
+
+
+def test_prefix_words(index):
+    assert rows(index.search("wart*")) == [2, 7]
+    assert rows(index.search("wart")) == []
+    # While typing, the last word is a prefix
+    assert rows(index.search("meeting ku", prefix_last=True)) == [4]
+    assert rows(index.search("ku meeting", prefix_last=True)) == []
+
+
+def test_ticket_numbers(index):
+    assert rows(index.search("ABC-123")) == [0]
+    assert rows(index.search("abc-123")) == [0]
+    assert rows(index.search("ABC-123*")) == [0, 3]
+    assert rows(index.search("ABC-12", prefix_last=True)) == [0, 3]
+    assert rows(index.search("#42")) == [7]
+
+
+def test_blank_query_is_no_filter(index):
+    assert rows(index.search("")) == list(range(len(DESCRIPTIONS)))
+    assert rows(index.search("   ")) == list(range(len(DESCRIPTIONS)))
+
+
+@pytest.mark.parametrize("query", ["-", "#", "&", "*", "meeting -", "- meeting"])
+def test_punctuation_only_words_match_nothing(index, query):
+    assert rows(index.search(query)) == []
+    assert rows(index.search(query, prefix_last=True)) == []
+    assert not index.mask(query).any()
+
+
+def test_mask(index):
+    assert index.mask("meeting").tolist() == [False, True, False, False, True, False, False, False]
+
+
+def test_empty_frame():
+    index = DescriptionIndex(pd.Series([], dtype=object))
+    assert rows(index.search("")) == [] and rows(index.search("abc")) == []
+
+
+def test_index_for_is_built_once_per_frame():
+    df = pd.DataFrame({"description": DESCRIPTIONS})
+    assert index_for(df) is index_for(df)
+    assert index_for(df.copy()) is not index_for(df)
+    assert rows(index_for(pd.DataFrame({"other": [1, 2]})).search("")) == [0, 1]
+
+
+def test_index_for_forgets_collected_frames():
+    df = pd.DataFrame({"description": DESCRIPTIONS})
+    index = index_for(df)
+    key = id(df)
+    assert search_index._indexes[key][1] is index
+
+    del df
+    gc.collect()
+    assert key not in search_index._indexes
+    # A new frame, possibly at the same id, gets its own index
+    other = pd.DataFrame({"description": ["Wartung"]})
+    assert index_for(other) is not index
+    assert rows(index_for(other).search("wartung")) == [0]
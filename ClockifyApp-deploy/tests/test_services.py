@@ -0,0 +1,130 @@
+"""Tests of the report services behind the Flask API (app_Flask/services.py)."""
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from app_Flask import services
+from conftest import API_WORKSPACE
+
+
+JUNE = ("2025-06-01T00:00:00Z", "2025-06-30T23:59:59Z")
+
+
+def test_parse_period_formats():
+    assert services.parse_period("01.06.2025", "30.06.2025") == JUNE
+    assert services.parse_period("2025-06-01", "2025-06-30") == JUNE
+
+
+@pytest.mark.parametrize("start, end", [
+    ("", "30.06.2025"),
+    ("01.06.2025", None),
+    ("gestern", "30.06.2025"),
+    ("31.13.2025", "30.06.2025"),
+    ("30.06.2025", "01.06.2025"),
+])
+def test_parse_period_rejects_invalid_input(start, end):
+    with pytest.raises(ValueError):
+        services.parse_period(start, end)
+
+
+def test_resolve_workspace(clockify):
+    assert services.resolve_workspace() == API_WORKSPACE
+    assert services.resolve_workspace("ws-test") == API_WORKSPACE
+    assert services.resolve_workspace("Test") == API_WORKSPACE
+    with pytest.raises(ValueError):
+        services.resolve_workspace("unbekannt")
+
+
+def test_list_workspaces_hides_api_keys(clockify):
+    assert services.list_workspaces() == [{"id": "ws-test", "name": "Test"}]
+
+
+def test_report_params_are_normalised(clockify):
+    a = services.report_params("01.06.2025", "30.06.2025", "Acme GmbH", ["Shop", "Beratung", "Shop"])
+    b = services.report_params("2025-06-01", "2025-06-30", "Acme GmbH", ["Beratung", "Shop"], workspace="Test")
+    assert a == b == {"workspace": "ws-test", "start": JUNE[0], "end": JUNE[1],
+                      "client": "Acme GmbH", "projects": ["Beratung", "Shop"]}
+    with pytest.raises(ValueError):
+        services.report_params("01.06.2025", "30.06.2025", "")
+
+
+def test_load_period_uses_the_entry_cache(clockify):
+    df = services.load_period(*JUNE, API_WORKSPACE)
+    requests_after_load = clockify.requests
+    assert services.load_period(*JUNE, API_WORKSPACE) is df
+    assert clockify.requests == requests_after_load
+    assert sorted(df["entry_id"]) == ["a1", "a2", "a3", "b1"]
+
+
+def test_clients_projects_and_selection(clockify):
+    df = services.load_period(*JUNE, API_WORKSPACE)
+    assert services.list_clients(df) == ["Acme GmbH", "Beta AG"]
+    assert services.list_projects(df, "Acme GmbH") == ["Beratung", "Shop"]
+    assert services.list_projects(df, "Unbekannt") == []
+
+    selected = services.select_entries(df, "Acme GmbH", ["Shop"])
+    assert list(selected["entry_id"]) == ["a1", "b1"]
+    assert list(services.select_entries(df, query="abc-123")["entry_id"]) == ["a1"]
+    assert services.select_entries(pd.DataFrame()).empty
+
+
+def test_summarize_period(clockify):
+    assert services.summarize_period(*JUNE, API_WORKSPACE) == [
+        {"client": "Acme GmbH", "project": "Beratung", "hours": 1.5},
+        {"client": "Acme GmbH", "project": "Shop", "hours": 5.0},
+        {"client": "Beta AG", "project": "Intern", "hours": 0.5},
+    ]
+    assert services.summarize_period(*JUNE, API_WORKSPACE, client="Beta AG") == [
+        {"client": "Beta AG", "project": "Intern", "hours": 0.5},
+    ]
+
+
+def test_render_report(clockify):
+    df = services.select_entries(services.load_period(*JUNE, API_WORKSPACE), "Acme GmbH")
+    pdf_bytes, filename = services.render_report(df, "Acme GmbH", [])
+    assert pdf_bytes.startswith(b"%PDF")
+    assert filename.endswith(".pdf") and "Acme" in filename
+
+
+def test_render_bundle_without_entries(clockify):
+    df = services.load_period(*JUNE, API_WORKSPACE)
+    with pytest.raises(ValueError):
+        services.render_bundle(df, ["Unbekannt"])
+
+
+def test_render_job(clockify):
+    params = services.report_params("01.06.2025", "30.06.2025", "Beta AG")
+    pdf_bytes, _ = services.render_job(params)
+    assert pdf_bytes.startswith(b"%PDF")
+    with pytest.raises(ValueError):
+        services.render_job(dict(params, client="Unbekannt"))
+
+
+def test_fingerprint_depends_on_data_and_params(clockify):
+    df = services.load_period(*JUNE, API_WORKSPACE)
+    etag = services.fingerprint(df, "entries", "a")
+    assert services.fingerprint(df.copy(), "entries", "a") == etag
+    assert services.fingerprint(df, "entries", "b") != etag
+    assert services.fingerprint(df.iloc[1:], "entries", "a") != etag
+
+
+def test_iter_chunks():
+    data = bytes(range(256)) * 3
+    chunks = list(services.iter_chunks(data, chunk_size=100))
+    assert b"".join(chunks) == data
+    assert [len(c) for c in chunks] == [100] * 7 + [68]
+
+
+def iso_days_ago(days: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%dT23:59:59Z")
+
+
+def test_cache_control_of_closed_and_open_periods(monkeypatch):
+    monkeypatch.setattr(services, "CLOSED_PERIOD_GRACE_DAYS", 2)
+    monkeypatch.setattr(services, "CLOSED_PERIOD_MAX_AGE", 3600)
+    assert services.cache_control(iso_days_ago(30)) == "private, max-age=3600"
+    assert services.cache_control(iso_days_ago(3)) == "private, max-age=3600"
+    # Within the grace days late bookings are still expected
+    assert services.cache_control(iso_days_ago(1)) == "private, no-cache"
+    assert services.cache_control(iso_days_ago(-5)) == "private, no-cache"
@@ -0,0 +1,130 @@
+"""Tests of the per-session object store of the Streamlit app (session_store.py)."""
+import pandas as pd
+
+from session_store import SessionStore, size_of
+
+
+KIB = 1024
+
+
+def blob(kib: int) -> bytes:
+    return b"x" * (kib * KIB)
+
+
+def test_get_builds_once_and_put_none_removes():
+    store = SessionStore(max_bytes=100 * KIB)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return blob(1)
+
+    assert store.get("s1", "pdf") is None
+    assert store.get("s1", "pdf", build) == blob(1)
+    assert store.get("s1", "pdf", build) == blob(1)
+    assert len(calls) == 1
+
+    store.put("s1", "pdf", None)
+    assert store.get("s1", "pdf") is None
+    assert store.stats()["bytes"] == 0
+
+
+def test_least_recently_active_session_is_evicted_first():
+    store = SessionStore(max_bytes=30 * KIB)
+    store.put("s1", "pdf", blob(10))
+    store.put("s2", "pdf", blob(10))
+    store.put("s3", "pdf", blob(10))
+    # Reading marks s1 as active again: s2 is now the oldest
+    store.get("s1", "pdf")
+
+    store.put("s4", "pdf", blob(10))
+    assert store.get("s2", "pdf") is None
+    assert all(store.get(s, "pdf") is not None for s in ("s1", "s3", "s4"))
+
+    # The loop above read s1 first, so it is the oldest again
+    store.put("s5", "pdf", blob(10))
+    assert store.get("s1", "pdf") is None
+    assert store.stats()["evictions"] == 2
+
+
+def test_bytes_are_evicted_before_the_frame():
+    store = SessionStore(max_bytes=40 * KIB)
+    frame = pd.DataFrame({"x": range(1000)})
+    store.put("s1", "frame", frame)
+    store.put("s1", "pdf", blob(10))
+    assert size_of(frame) + 10 * KIB <= store.max_bytes
+
+    store.put("s2", "pdf", blob(25))
+    assert store.get("s1", "pdf") is None
+    assert store.get("s1", "frame") is frame
+
+
+def test_memory_cap():
+    store = SessionStore(max_bytes=50 * KIB)
+    for i in range(20):
+        store.put(f"s{i}", "pdf", blob(10))
+        assert store.stats()["bytes"] <= store.max_bytes
+    assert store.stats() == {"sessions": 5, "objects": 5, "bytes": 50 * KIB, "max_bytes": 50 * KIB,
+                             "evictions": 15}
+
+
+def test_active_session_is_never_evicted():
+    store = SessionStore(max_bytes=10 * KIB)
+    store.put("s1", "pdf", blob(5))
+    store.put("s2", "pdf", blob(20))
+    # Over the cap with nothing else to drop: the active session keeps its object
+    assert store.get("s2", "pdf") == blob(20)
+    assert store.get("s1", "pdf") is None
+    assert store.stats()["bytes"] == 20 * KIB
+
+
+def test_shared_frame_counts_once():
+    store = SessionStore(max_bytes=10 * 1024 * KIB)
+    frame = pd.DataFrame({"x": range(1000)})
+    store.put("s1", "frame", frame)
+    store.put("s2", "frame", frame)
+    stats = store.stats()
+    assert stats["objects"] == 1 and stats["bytes"] == size_of(frame)
+
+
+def test_shared_frame_is_freed_with_its_last_reference():
+    store = SessionStore(max_bytes=10 * 1024 * KIB)
+    frame = pd.DataFrame({"x": range(1000)})
+    store.put("s1", "frame", frame)
+    store.put("s2", "frame", frame)
+    store.put("s3", "frame", frame)
+
+    store.discard("s1")
+    store.put("s2", "frame", pd.DataFrame({"x": [1]}))
+    assert store.stats()["objects"] == 2
+    assert store.get("s3", "frame") is frame
+
+    store.discard("s3", "frame")
+    stats = store.stats()
+    assert stats["objects"] == 1 and stats["bytes"] == size_of(store.get("s2", "frame"))
+
+
+def test_evicting_one_holder_keeps_a_shared_frame():
+    frame = pd.DataFrame({"x": range(1000)})
+    store = SessionStore(max_bytes=size_of(frame) + 15 * KIB)
+    store.put("s1", "frame", frame)
+    store.put("s2", "frame", frame)
+    store.put("s2", "pdf", blob(10))
+
+    # Evicting s1 frees nothing, as s2 still holds the frame; s2's PDF goes next
+    store.put("s3", "pdf", blob(10))
+    assert store.get("s1", "frame") is None
+    assert store.get("s2", "pdf") is None
+    assert store.get("s2", "frame") is frame
+    assert store.stats()["bytes"] == size_of(frame) + 10 * KIB
+
+
+def test_discard():
+    store = SessionStore(max_bytes=100 * KIB)
+    store.put("s1", "pdf", blob(1))
+    store.put("s1", "export", blob(2))
+    store.discard("s1", "pdf")
+    assert store.get("s1", "pdf") is None and store.get("s1", "export") == blob(2)
+    store.discard("s1")
+    store.discard("unknown")
+    assert store.stats()["sessions"] == 0 and store.stats()["bytes"] == 0
@@ -0,0 +1,146 @@
+"""Tests of the warm-up scheduler and the pre-rendered report store (app_Flask/warmup.py)."""
+from datetime import date, datetime, timedelta
+import os
+import time
+
+import pytest
+
+from app_Flask import services, warmup
+from app_Flask.warmup import PrerenderStore, WarmupScheduler, period_bounds, warm_up
+from conftest import API_WORKSPACE
+from entry_cache import cache_for, load_entries_for_workspaces
+from main import Workspace
+
+
+JUNE = ("2025-06-01T00:00:00Z", "2025-06-30T23:59:59Z")
+
+
+def test_period_bounds():
+    assert period_bounds("current_month", date(2025, 6, 17)) == JUNE
+    assert period_bounds("previous_month", date(2025, 7, 1)) == JUNE
+    assert period_bounds("previous_month", date(2025, 1, 15)) == ("2024-12-01T00:00:00Z", "2024-12-31T23:59:59Z")
+    assert period_bounds("current_month", date(2024, 2, 10))[1] == "2024-02-29T23:59:59Z"
+    with pytest.raises(ValueError):
+        period_bounds("last_week", date(2025, 6, 17))
+
+
+def test_next_run():
+    scheduler = WarmupScheduler(schedule=warmup.DEFAULT_SCHEDULE, store=PrerenderStore("unused"))
+    nightly, monthly = warmup.DEFAULT_SCHEDULE
+
+    assert scheduler.next_run(datetime(2025, 6, 17, 1, 0)) == (datetime(2025, 6, 17, 2, 0), nightly)
+    # Exactly at a slot: the next one
+    assert scheduler.next_run(datetime(2025, 6, 17, 2, 0)) == (datetime(2025, 6, 18, 2, 0), nightly)
+    assert scheduler.next_run(datetime(2025, 6, 30, 23, 0)) == (datetime(2025, 7, 1, 2, 0), nightly)
+    assert scheduler.next_run(datetime(2025, 7, 1, 2, 30)) == (datetime(2025, 7, 1, 3, 0), monthly)
+    # Only the slots of one period
+    assert scheduler.next_run(datetime(2025, 6, 17, 1, 0), "previous_month") == (datetime(2025, 7, 1, 3, 0), monthly)
+    assert scheduler.next_run(datetime(2025, 6, 17, 1, 0), "unknown") is None
+    assert WarmupScheduler(schedule=[], store=PrerenderStore("unused")).next_run(datetime(2025, 6, 17)) is None
+
+
+def test_next_run_skips_months_without_the_day():
+    slot = {"at": "04:00", "day": 31, "period": "previous_month"}
+    scheduler = WarmupScheduler(schedule=[slot], store=PrerenderStore("unused"))
+    assert scheduler.next_run(datetime(2025, 6, 1)) == (datetime(2025, 7, 31, 4, 0), slot)
+
+
+def test_load_schedule(monkeypatch):
+    monkeypatch.delenv("CLOCKIFY_WARMUP_SCHEDULE", raising=False)
+    assert warmup.load_schedule() == warmup.DEFAULT_SCHEDULE
+    monkeypatch.setenv("CLOCKIFY_WARMUP_SCHEDULE", "[]")
+    assert warmup.load_schedule() == []
+    monkeypatch.setenv("CLOCKIFY_WARMUP_SCHEDULE", '[{"at": "25:00", "period": "current_month"}]')
+    with pytest.raises(ValueError):
+        warmup.load_schedule()
+    monkeypatch.setenv("CLOCKIFY_WARMUP_SCHEDULE", '[{"at": "02:00", "period": "last_week"}]')
+    with pytest.raises(ValueError):
+        warmup.load_schedule()
+
+
+def test_prerender_store(tmp_path):
+    store = PrerenderStore(tmp_path / "prerendered")
+    assert store.get("abc") is None and "abc" not in store
+    assert store.prune() == 0
+
+    store.put("abc", b"%PDF-1")
+    store.put("abc", b"%PDF-2")
+    assert "abc" in store and store.get("abc") == b"%PDF-2"
+    assert [p.name for p in store.directory.iterdir()] == ["abc.pdf"]
+
+    store.put("old", b"%PDF-old")
+    day_ago = time.time() - 86400
+    os.utime(store.directory / "old.pdf", (day_ago, day_ago))
+    assert store.prune(max_age=3600) == 1
+    assert "old" not in store and "abc" in store
+
+
+def test_warm_up_renders_each_client_once(clockify, tmp_path):
+    store = PrerenderStore(tmp_path / "prerendered")
+    assert warm_up("current_month", store, today=date(2025, 6, 17)) == 2
+    requests_after_warm_up = clockify.requests
+
+    df = services.load_period(*JUNE, API_WORKSPACE)
+    assert clockify.requests == requests_after_warm_up
+    for client in ("Acme GmbH", "Beta AG"):
+        etag = services.report_etag(services.select_entries(df, client), API_WORKSPACE.id, *JUNE, client, [])
+        assert store.get(etag).startswith(b"%PDF")
+
+    # Unchanged data: reloaded, but nothing rendered again
+    assert warm_up("current_month", store, today=date(2025, 6, 17)) == 0
+    assert clockify.requests > requests_after_warm_up
+
+
+def cached_for(key) -> float:
+    """Seconds the cache keeps ``key``."""
+    entry = cache_for(API_WORKSPACE.id).get_entry((API_WORKSPACE.id, *key))
+    return entry.expires_at - entry.loaded_at
+
+
+def test_closed_period_is_kept_until_the_next_slot(clockify, tmp_path):
+    keep_until = datetime.now() + timedelta(hours=20)
+    warm_up("current_month", PrerenderStore(tmp_path), today=date(2025, 6, 17), keep_until=keep_until)
+    assert cached_for(JUNE) == pytest.approx(20 * 3600, abs=60)
+
+
+def test_open_period_is_kept_until_the_next_slot_with_webhooks(clockify, tmp_path, monkeypatch):
+    today = date.today()
+    period = period_bounds("current_month", today)
+    keep_until = datetime.now() + timedelta(hours=20)
+
+    warm_up("current_month", PrerenderStore(tmp_path), today=today, keep_until=keep_until)
+    assert cached_for(period) == cache_for(API_WORKSPACE.id).ttl
+
+    monkeypatch.setattr("webhooks.WEBHOOK_TOKENS", ["geheim"])
+    warm_up("current_month", PrerenderStore(tmp_path), today=today, keep_until=keep_until)
+    assert cached_for(period) == pytest.approx(20 * 3600, abs=60)
+
+
+@pytest.mark.skipif(warmup.fcntl is None, reason="needs fcntl")
+def test_one_scheduler_per_store_directory(tmp_path):
+    first = WarmupScheduler(schedule=[], store=PrerenderStore(tmp_path))
+    second = WarmupScheduler(schedule=[], store=PrerenderStore(tmp_path))
+    assert first.acquire_lock() and first.acquire_lock()
+    assert not second.acquire_lock()
+
+    # The holder exits: the next slot runs in the other process
+    first.stop()
+    assert second.acquire_lock()
+    second.stop()
+
+
+def test_warm_up_loads_all_workspaces_concurrently(clockify, tmp_path, monkeypatch):
+    other = Workspace(id="ws-other", api_key="other", name="Other", base_url="https://clockify.test", rate_limit=1e9)
+    monkeypatch.setattr(services, "WORKSPACES", [API_WORKSPACE, other])
+    calls = []
+
+    def spy(start_iso, end_iso, workspaces, ttl=None):
+        calls.append([ws.id for ws in workspaces])
+        return load_entries_for_workspaces(start_iso, end_iso, workspaces, ttl=ttl)
+
+    monkeypatch.setattr(warmup, "load_entries_for_workspaces", spy)
+    try:
+        assert warm_up("current_month", PrerenderStore(tmp_path), today=date(2025, 6, 17)) == 4
+    finally:
+        cache_for(other.id).invalidate()
+    assert calls == [[API_WORKSPACE.id, other.id]]
@@ -0,0 +1,186 @@
+"""Tests of the webhook deltas and the shared event log (webhooks.py)."""
+import json
+import time
+
+import pytest
+
+import webhooks
+from entry_cache import cache_for, load_entries, period_totals
+from conftest import API_WORKSPACE, entry
+
+
+JUNE = ("2025-06-01T00:00:00Z", "2025-06-30T23:59:59Z")
+
+
+def payload(entry_id, user_id, day, hours, description, client="Acme GmbH", project="Shop", user_name=None):
+    """Webhook body of a time entry of API_WORKSPACE."""
+    body = entry(entry_id, user_id, day, "12:00", hours, description, client, project)
+    body["workspaceId"] = API_WORKSPACE.id
+    if user_name:
+        body["user"] = {"id": user_id, "name": user_name}
+    return body
+
+
+def cached_june():
+    return cache_for(API_WORKSPACE.id).get_entry((API_WORKSPACE.id, *JUNE)).value
+
+
+def test_new_entry_is_added(clockify):
+    load_entries(*JUNE, workspace=API_WORKSPACE)
+    requests_after_load = clockify.requests
+
+    updated = webhooks.apply_event("NEW_TIME_ENTRY", payload("n1", "u-anna", "2025-06-10", 1.0, "Hotfix"))
+    assert updated == 1
+    df = cached_june()
+    assert sorted(df["entry_id"]) == ["a1", "a2", "a3", "b1", "n1"]
+    # No user object in the payload: the name comes from the user's other entries
+    assert df.loc[df["entry_id"] == "n1", "user_name"].iloc[0] == "Anna Beispiel"
+    assert clockify.requests == requests_after_load
+
+
+def test_updated_entry_is_replaced(clockify):
+    load_entries(*JUNE, workspace=API_WORKSPACE)
+    webhooks.apply_event("TIME_ENTRY_UPDATED", payload("a1", "u-anna", "2025-06-02", 4.0, "Ticket ABC-123 Checkout",
+                                                       user_name="Anna Beispiel"))
+    df = cached_june()
+    assert len(df) == 4
+    assert df.loc[df["entry_id"] == "a1", "duration_hours"].tolist() == [4.0]
+
+
+def test_entry_moved_out_of_the_period(clockify):
+    load_entries(*JUNE, workspace=API_WORKSPACE)
+    webhooks.apply_event("TIME_ENTRY_UPDATED", payload("a1", "u-anna", "2025-07-02", 2.0, "Ticket ABC-123 Checkout"))
+    assert sorted(cached_june()["entry_id"]) == ["a2", "a3", "b1"]
+
+
+def test_deleted_entry_is_removed(clockify):
+    load_entries(*JUNE, workspace=API_WORKSPACE)
+    assert webhooks.apply_event("TIME_ENTRY_DELETED", {"id": "b1", "workspaceId": API_WORKSPACE.id}) == 1
+    assert sorted(cached_june()["entry_id"]) == ["a1", "a2", "a3"]
+    # Unknown entries touch no cached period
+    assert webhooks.apply_event("TIME_ENTRY_DELETED", {"id": "x9", "workspaceId": API_WORKSPACE.id}) == 0
+
+
+def test_running_timer_is_ignored(clockify):
+    load_entries(*JUNE, workspace=API_WORKSPACE)
+    running = payload("n1", "u-anna", "2025-06-10", 1.0, "Läuft noch")
+    running["timeInterval"]["end"] = None
+    assert webhooks.apply_event("NEW_TIME_ENTRY", running) == 0
+    assert len(cached_june()) == 4
+
+
+def test_totals_follow_the_deltas(clockify):
+    assert period_totals(*JUNE, workspace=API_WORKSPACE)[("Acme GmbH", "Shop")] == 5.0
+
+    webhooks.apply_event("NEW_TIME_ENTRY", payload("n1", "u-bernd", "2025-06-10", 1.5, "Hotfix"))
+    webhooks.apply_event("TIME_ENTRY_DELETED", {"id": "a3", "workspaceId": API_WORKSPACE.id})
+    totals = period_totals(*JUNE, workspace=API_WORKSPACE)
+    assert totals == {("Acme GmbH", "Beratung"): 1.5, ("Acme GmbH", "Shop"): 6.5}
+    # The same as computing them from the updated frame
+    cache = cache_for(API_WORKSPACE.id)
+    cache.get_entry((API_WORKSPACE.id, *JUNE)).totals = None
+    assert period_totals(*JUNE, workspace=API_WORKSPACE) == totals
+
+
+@pytest.mark.parametrize("event_type, body", [
+    ("TIMER_STARTED", {"id": "a1"}),
+    ("NEW_TIME_ENTRY", {"description": "ohne ID"}),
+])
+def test_invalid_events(clockify, event_type, body):
+    with pytest.raises(ValueError):
+        webhooks.apply_event(event_type, body)
+    with pytest.raises(ValueError):
+        webhooks.record_event(event_type, body)
+
+
+def broken(change) -> dict:
+    body = payload("n1", "u-anna", "2025-06-10", 1.0, "Hotfix")
+    change(body)
+    return body
+
+
+@pytest.mark.parametrize("body", [
+    broken(lambda b: b["timeInterval"].update(start="gestern")),
+    broken(lambda b: b["timeInterval"].update(start="2025-06-10T12:00:00")),
+    broken(lambda b: b["timeInterval"].update(end="morgen")),
+    broken(lambda b: b["timeInterval"].pop("start")),
+    broken(lambda b: b.update(timeInterval="2025-06-10")),
+    broken(lambda b: b.update(user="Anna")),
+    broken(lambda b: b.update(id=17)),
+    broken(lambda b: b.update(workspaceId=["ws-test"])),
+])
+def test_malformed_payloads_are_not_recorded(clockify, body):
+    with pytest.raises(ValueError):
+        webhooks.record_event("NEW_TIME_ENTRY", body)
+    assert not webhooks.EVENT_LOG.path.exists()
+
+
+def test_failing_event_is_skipped(clockify, tmp_path, caplog):
+    """An event that cannot be applied must not block the events after it."""
+    load_entries(*JUNE, workspace=API_WORKSPACE)
+    log = webhooks.EventLog(tmp_path / "shared")
+    log.append("TIME_ENTRY_DELETED", {"id": "a1", "workspaceId": API_WORKSPACE.id})
+    bad = payload("n1", "u-anna", "2025-06-10", 1.0, "Hotfix")
+    bad["timeInterval"]["start"] = "gestern"
+    # Recorded by an older version without validation
+    with log._connect() as conn:
+        conn.execute("INSERT INTO events (event_type, payload, received_at) VALUES (?, ?, ?)",
+                     ("NEW_TIME_ENTRY", json.dumps(bad), time.time()))
+    log.append("TIME_ENTRY_DELETED", {"id": "a2", "workspaceId": API_WORKSPACE.id})
+
+    assert log.sync() == 2
+    assert sorted(cached_june()["entry_id"]) == ["a3", "b1"]
+    assert "skipped" in caplog.text
+    assert log.sync() == 0
+
+
+def test_verify_token(monkeypatch):
+    monkeypatch.setattr(webhooks, "WEBHOOK_TOKENS", ["geheim", "zweites"])
+    assert webhooks.verify_token("geheim") and webhooks.verify_token("zweites")
+    assert not webhooks.verify_token("falsch")
+    assert not webhooks.verify_token(None)
+
+
+def test_events_reach_other_processes(clockify, tmp_path):
+    """Two EventLogs on one directory stand for two worker processes."""
+    load_entries(*JUNE, workspace=API_WORKSPACE)
+    receiver = webhooks.EventLog(tmp_path / "shared")
+    other = webhooks.EventLog(tmp_path / "shared")
+    assert other.sync() == 0
+
+    receiver.append("TIME_ENTRY_DELETED", {"id": "b1", "workspaceId": API_WORKSPACE.id})
+    receiver.append("NEW_TIME_ENTRY", payload("n1", "u-anna", "2025-06-10", 1.0, "Hotfix"))
+    assert other.sync() == 2
+    assert sorted(cached_june()["entry_id"]) == ["a1", "a2", "a3", "n1"]
+    # Each event is applied once per process
+    assert other.sync() == 0
+
+
+def test_old_events_are_pruned(clockify, tmp_path):
+    log = webhooks.EventLog(tmp_path / "shared", retention=-1)
+    log.append("TIME_ENTRY_DELETED", {"id": "a1", "workspaceId": API_WORKSPACE.id})
+    log.append("TIME_ENTRY_DELETED", {"id": "a2", "workspaceId": API_WORKSPACE.id})
+    with log._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone() == (1,)
+
+
+def test_missed_pruned_events_drop_the_cache(clockify, tmp_path):
+    """A process that was idle while events it never applied were pruned cannot trust its cache."""
+    load_entries(*JUNE, workspace=API_WORKSPACE)
+    receiver = webhooks.EventLog(tmp_path / "shared")
+    idle = webhooks.EventLog(tmp_path / "shared")
+    receiver.append("TIME_ENTRY_DELETED", {"id": "a1", "workspaceId": API_WORKSPACE.id})
+    assert idle.sync() == 1
+
+    # Idle meanwhile: a2 is deleted, but that event is pruned before the next sync
+    pruning = webhooks.EventLog(tmp_path / "shared", retention=-1)
+    pruning.append("TIME_ENTRY_DELETED", {"id": "a2", "workspaceId": API_WORKSPACE.id})
+    pruning.append("TIME_ENTRY_DELETED", {"id": "a3", "workspaceId": API_WORKSPACE.id})
+
+    idle.sync()
+    assert cache_for(API_WORKSPACE.id).get_entry((API_WORKSPACE.id, *JUNE)) is None
+    # Nothing dropped once the process is in step again
+    load_entries(*JUNE, workspace=API_WORKSPACE)
+    pruning.append("TIME_ENTRY_DELETED", {"id": "b1", "workspaceId": API_WORKSPACE.id})
+    assert idle.sync() == 1
+    assert sorted(cached_june()["entry_id"]) == ["a1", "a2", "a3"]
@@ -0,0 +1,81 @@
+"""
+Startup benchmark: cost of importing main.py in fresh interpreters.
+
+    python tools/bench_startup.py [-n 10]
+
+For each scenario a new interpreter is started n times; the import time is
+measured inside the child (interpreter start-up excluded) and the median /
+min / max are reported, together with which heavy dependencies were loaded
+and the largest cumulative entries of ``python -X importtime``.
+"""
+from pathlib import Path
+import statistics
+import subprocess
+import argparse
+import json
+import sys
+
+
+APP_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("pandas", "requests", "reportlab", "babel")
+
+SCENARIOS = {
+    "import main": "import main",
+    "import main + first PDF": (
+        "import main\n"
+        "main.generate_report_pdf_bytes(None, 'Bench', 'Juni 2025', [['Test', 'Allgemein', '01.06.2025', '1,00']], 1.0)"
+    ),
+}
+
+CHILD = """
+import sys, time, json
+t0 = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_child(code: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(code=code, heavy=HEAVY_MODULES)],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def top_imports(code: str, limit: int = 8) -> list[tuple[int, str]]:
+    """Largest cumulative import times (microseconds) from -X importtime."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # top-level imports only
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10, help="fresh interpreters per scenario")
+    args = parser.parse_args()
+
+    for name, code in SCENARIOS.items():
+        runs = [run_child(code) for _ in range(args.n)]
+        times = [r["seconds"] * 1000 for r in runs]
+        print(f"{name}:")
+        print(f"  median {statistics.median(times):8.1f} ms   min {min(times):8.1f} ms   max {max(times):8.1f} ms")
+        print(f"  heavy modules loaded: {', '.join(runs[-1]['loaded']) or '-'}")
+
+    print("largest imports of 'import main' (cumulative):")
+    for cumulative, module in top_imports("import main"):
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
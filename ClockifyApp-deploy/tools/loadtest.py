@@ -0,0 +1,202 @@
+"""
+Load test of the report flow with concurrent virtual users.
+
+    python tools/loadtest.py [-u 10] [-n 5] [--cache] [--latency 50] [--entries 200]
+
+Every virtual user (a thread, as in the Streamlit / Flask servers) runs the
+report flow n times: get_entries_by_date -> client filter ->
+build_report_rows -> generate_report_pdf_bytes. The Clockify API is played
+by tools/mock_clockify.py in a separate process (so its memory does not
+count), or by --api-url. With --cache the entries go through the shared
+entry cache (entry_cache.load_entries) as in the apps.
+
+Reported: throughput (reports/s), latency percentiles p50/p95/p99 of the
+whole flow, median time per phase and peak RSS of this process.
+"""
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import subprocess
+import threading
+import argparse
+import resource
+import socket
+import json
+import time
+import sys
+import os
+
+
+APP_DIR = Path(__file__).resolve().parent.parent
+MOCK = Path(__file__).resolve().parent / "mock_clockify.py"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, str(MOCK), "--port", str(port),
+         "--users", str(args.mock_users), "--entries", str(args.entries),
+         "--clients", str(args.clients), "--latency", str(args.latency), "--jitter", str(args.jitter)],
+        stdout=subprocess.PIPE, text=True
+    )
+    proc.stdout.readline()  # "Mock Clockify API on ..." once listening
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, min(len(sorted_values), round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def run(args) -> dict:
+    # main reads the API settings at import time
+    sys.path.insert(0, str(APP_DIR))
+    import pipeline_metrics
+    from main import (
+        get_entries_by_date, build_report_rows, generate_report_pdf_bytes,
+        get_months_range_string, LOGO_PATH, COMPANY_NAME
+    )
+    load = get_entries_by_date
+    if args.cache:
+        from entry_cache import load_entries as load
+
+    import pandas as pd
+
+    start_iso, end_iso = args.start, args.end
+    latencies: list[float] = []
+    runs: list = []
+    errors: list[str] = []
+    lock = threading.Lock()
+
+    def report_flow(user: int, iteration: int):
+        run = pipeline_metrics.start_run("loadtest")
+        t0 = time.perf_counter()
+        try:
+            with pipeline_metrics.activate(run):
+                df = load(start_iso, end_iso)
+                clients = sorted(df['client_name'].unique())
+                client = clients[(user + iteration) % len(clients)]
+                with pipeline_metrics.phase("filter"):
+                    df_selected = df[df['client_name'] == client].sort_values(
+                        by='start', key=lambda x: pd.to_datetime(x, dayfirst=True))
+                generate_report_pdf_bytes(
+                    logo_path=str(LOGO_PATH),
+                    company_name=COMPANY_NAME,
+                    months_range=get_months_range_string(df_selected),
+                    rows=build_report_rows(df_selected),
+                    total_hours=df_selected['duration_hours'].sum()
+                )
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.append(elapsed)
+            runs.append(run)
+
+    def virtual_user(user: int):
+        for iteration in range(args.iterations):
+            report_flow(user, iteration)
+
+    rss_before = peak_rss_mb()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        list(pool.map(virtual_user, range(args.users)))
+    wall = time.perf_counter() - t0
+
+    latencies.sort()
+    phases = {}
+    for name in pipeline_metrics.PHASES:
+        values = [r.durations[name] for r in runs if name in r.durations]
+        if values:
+            phases[name] = statistics.median(values)
+    return {
+        "users": args.users,
+        "iterations": args.iterations,
+        "reports": len(latencies),
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "wall_seconds": wall,
+        "throughput_per_second": len(latencies) / wall if wall else 0.0,
+        "latency_seconds": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else float("nan"),
+        },
+        "phase_median_seconds": phases,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_mb": rss_before,
+    }
+
+
+def print_report(result: dict):
+    lat = result["latency_seconds"]
+    print(f"{result['users']} virtuelle Benutzer x {result['iterations']} Reports: "
+          f"{result['reports']} erstellt, {result['errors']} Fehler in {result['wall_seconds']:.1f} s")
+    for error in result["first_errors"]:
+        print(f"  ❌ {error}")
+    print(f"  Durchsatz   {result['throughput_per_second']:8.2f} Reports/s")
+    print(f"  Latenz      p50 {lat['p50'] * 1000:8.0f} ms   p95 {lat['p95'] * 1000:8.0f} ms"
+          f"   p99 {lat['p99'] * 1000:8.0f} ms   max {lat['max'] * 1000:8.0f} ms")
+    for name, seconds in result["phase_median_seconds"].items():
+        print(f"  {name:<14} Median {seconds * 1000:8.1f} ms")
+    print(f"  Peak RSS    {result['peak_rss_mb']:8.1f} MB (vor dem Test {result['rss_before_mb']:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-u", "--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("-n", "--iterations", type=int, default=5, help="reports per virtual user")
+    parser.add_argument("--cache", action="store_true", help="load through the shared entry cache")
+    parser.add_argument("--start", default="2025-06-01T00:00:00Z")
+    parser.add_argument("--end", default="2025-06-30T23:59:59Z")
+    parser.add_argument("--api-url", help="use a running (mock) API instead of starting one")
+    parser.add_argument("--rate-limit", type=float, default=1e9,
+                        help="client-side requests/s per workspace (default: unlimited)")
+    parser.add_argument("--mock-users", type=int, default=20, help="Clockify users in the mock")
+    parser.add_argument("--entries", type=int, default=200, help="entries per mock user")
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=50.0, help="mock response delay in ms")
+    parser.add_argument("--jitter", type=float, default=20.0, help="mock random extra delay in ms")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    mock = None
+    api_url = args.api_url
+    if api_url is None:
+        mock, api_url = start_mock(args)
+    os.environ["CLOCKIFY_BASE_URL"] = api_url
+    os.environ["CLOCKIFY_RATE_LIMIT"] = str(args.rate_limit)
+    try:
+        result = run(args)
+    finally:
+        if mock is not None:
+            mock.terminate()
+            mock.wait()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+    sys.exit(1 if result["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Local stand-in for the Clockify API endpoints used by main.py.
+
+    python tools/mock_clockify.py [--port 8099] [--users 20] [--entries 200]
+                                  [--clients 5] [--projects 4] [--latency 50] [--jitter 20]
+
+Serves /workspaces/<id>/users and /workspaces/<id>/user/<id>/time-entries
+(paged with page / page-size, filtered by start / end) for any workspace
+id. Every user has --entries entries per period, spread over its days with
+--clients clients of --projects projects each; responses are delayed by
+--latency ms (+ up to --jitter ms). The data is deterministic, so repeated
+runs are comparable. Point the app at it with
+CLOCKIFY_BASE_URL=http://localhost:8099.
+"""
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from functools import lru_cache
+import argparse
+import random
+import json
+import time
+import re
+
+
+WORDS = ("Analyse", "Meeting", "Review", "Umsetzung", "Fehlerbehebung", "Abstimmung",
+         "Dokumentation", "Test", "Deployment", "Support", "Ticket", "Konzept")
+
+_ENTRIES_PATH = re.compile(r"^/workspaces/[^/]+/user/([^/]+)/time-entries$")
+_USERS_PATH = re.compile(r"^/workspaces/[^/]+/users$")
+
+
+class MockData:
+    """Deterministic users and time entries."""
+
+    def __init__(self, users: int = 20, entries: int = 200, clients: int = 5, projects: int = 4,
+                 description_words: int = 6):
+        self.users = [{"id": f"user{i:04d}", "name": f"Benutzer {i}"} for i in range(users)]
+        self.entries_per_user = entries
+        self.clients = clients
+        self.projects = projects
+        self.description_words = description_words
+
+    @lru_cache(maxsize=1024)
+    def time_entries(self, user_id: str, start: str, end: str) -> list[dict]:
+        rnd = random.Random(f"{user_id}|{start}|{end}")
+        first = datetime.fromisoformat(start.replace("Z", "+00:00"))
+        last = datetime.fromisoformat(end.replace("Z", "+00:00"))
+        days = max((last - first).days, 1)
+        entries = []
+        for k in range(self.entries_per_user):
+            client = rnd.randrange(self.clients)
+            project = client * self.projects + rnd.randrange(self.projects)
+            begin = first + timedelta(days=rnd.randrange(days), hours=7 + rnd.randrange(10))
+            words = " ".join(rnd.choice(WORDS) for _ in range(self.description_words))
+            entries.append({
+                "id": f"{user_id}-{start[:10]}-{k}",
+                "userId": user_id,
+                "description": f"{words} #{rnd.randrange(1000, 9999)}",
+                "projectId": f"project{project}",
+                "project": {"name": f"Projekt {project}", "clientId": f"client{client}",
+                            "clientName": f"Kunde {client}"},
+                "task": {"name": rnd.choice(("Entwicklung", "Beratung", ""))} if k % 3 else None,
+                "timeInterval": {
+                    "start": begin.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "end": (begin + timedelta(minutes=15 * rnd.randrange(1, 17))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                },
+            })
+        return entries
+
+
+def make_handler(data: MockData, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            page = int(query.get("page", 1))
+            size = int(query.get("page-size", 50))
+
+            if _USERS_PATH.match(url.path):
+                items = data.users
+            elif m := _ENTRIES_PATH.match(url.path):
+                if "start" not in query or "end" not in query:
+                    return self._send(400, {"message": "start and end are required"})
+                items = data.time_entries(m.group(1), query["start"], query["end"])
+            else:
+                return self._send(404, {"message": "not found"})
+
+            if latency_ms or jitter_ms:
+                time.sleep((latency_ms + random.uniform(0, jitter_ms)) / 1000)
+            self._send(200, items[(page - 1) * size:page * size])
+
+        def _send(self, status: int, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_server(port: int = 8099, latency_ms: float = 0.0, jitter_ms: float = 0.0, **data_options) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(MockData(**data_options), latency_ms, jitter_ms))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=200, help="entries per user and period")
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument("--projects", type=int, default=4, help="projects per client")
+    parser.add_argument("--description-words", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=50.0, help="response delay in ms")
+    parser.add_argument("--jitter", type=float, default=20.0, help="additional random delay in ms")
+    args = parser.parse_args()
+
+    server = make_server(
+        args.port, args.latency, args.jitter,
+        users=args.users, entries=args.entries, clients=args.clients,
+        projects=args.projects, description_words=args.description_words
+    )
+    print(f"Mock Clockify API on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
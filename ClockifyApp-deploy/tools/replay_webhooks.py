@@ -0,0 +1,72 @@
+"""
+Replay recorded Clockify webhook events against a local report API.
+
+    python tools/replay_webhooks.py events.jsonl [--url http://localhost:8000/webhooks/clockify]
+                                                 [--token TOKEN] [--delay 0.1]
+
+Each line of the events file is one event:
+
+    {"event": "NEW_TIME_ENTRY", "payload": {...time entry as sent by Clockify...}}
+
+Events are posted in order with the headers Clockify uses
+(Clockify-Webhook-Event-Type, Clockify-Signature); the token defaults to the
+first one in CLOCKIFY_WEBHOOK_TOKEN.
+"""
+from pathlib import Path
+import argparse
+import json
+import time
+import sys
+import os
+
+import requests
+
+
+DEFAULT_URL = "http://localhost:8000/webhooks/clockify"
+
+
+def read_events(path: Path) -> list[dict]:
+    events = []
+    for line_no, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        event = json.loads(line)
+        if "event" not in event or "payload" not in event:
+            raise ValueError(f"{path}:{line_no}: expected 'event' and 'payload'")
+        events.append(event)
+    return events
+
+
+def replay(events: list[dict], url: str, token: str, delay: float = 0.0) -> int:
+    """Post the events; returns the number of rejected events."""
+    failed = 0
+    session = requests.Session()
+    for event in events:
+        resp = session.post(
+            url,
+            json=event["payload"],
+            headers={"Clockify-Webhook-Event-Type": event["event"], "Clockify-Signature": token},
+            timeout=10
+        )
+        print(f"{resp.status_code}  {event['event']:<20} {event['payload'].get('id', '-')}  {resp.text.strip()}")
+        if not resp.ok:
+            failed += 1
+        if delay:
+            time.sleep(delay)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("events", type=Path, help="JSON lines file with recorded events")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--token", default=os.environ.get("CLOCKIFY_WEBHOOK_TOKEN", "").split(",")[0])
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds between events")
+    args = parser.parse_args()
+
+    failed = replay(read_events(args.events), args.url, args.token, args.delay)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
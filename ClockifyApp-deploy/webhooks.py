@@ -0,0 +1,272 @@
+"""
+Incremental updates of cached entries from Clockify webhooks.
+
+Clockify posts the affected time entry as JSON body, with the event type in
+the ``Clockify-Webhook-Event-Type`` header and the webhook's token in
+``Clockify-Signature``. apply_event() turns created / updated / deleted
+events into deltas on every cached period of the entry's workspace (entry
+frame and per-project totals), so open periods stay current without
+re-polling the time-entries endpoints.
+
+Every process (gunicorn worker, Streamlit app) has its own entry cache, but
+only one of them receives a webhook. The receiver therefore appends the
+event to a shared SQLite log (``CLOCKIFY_WEBHOOK_DIR``); every process
+applies the events it has not seen yet through sync(), which the API calls
+before each request and the Streamlit app before using a period. Processes
+must share that directory (same host or shared volume). Events are pruned
+after twice the cache TTL; warmed periods are cached much longer, so a
+process that did not sync before events it never applied were pruned drops
+its whole entry cache instead of keeping periods that miss them.
+Payloads are parsed before they are recorded, and an event that still fails
+to apply is logged and skipped, so one bad event cannot block the others.
+
+Tokens of the accepted webhooks are configured comma-separated in
+``CLOCKIFY_WEBHOOK_TOKEN``; without tokens every event is rejected.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import threading
+import logging
+import sqlite3
+import hmac
+import json
+import time
+import os
+
+import pandas as pd
+
+from main import BASE_DIR, DEFAULT_WORKSPACE, normalize_entries
+from entry_cache import CacheEntry, DEFAULT_TTL, cache_for, invalidate_all, totals_of
+from pipeline_metrics import incr, phase
+
+
+logger = logging.getLogger("clockify.webhooks")
+
+WEBHOOK_TOKENS = [t.strip() for t in os.environ.get("CLOCKIFY_WEBHOOK_TOKEN", "").split(",") if t.strip()]
+WEBHOOK_DIR = Path(os.environ.get("CLOCKIFY_WEBHOOK_DIR", BASE_DIR / "webhooks"))
+EVENT_RETENTION = 2 * DEFAULT_TTL
+
+UPSERT_EVENTS = {"NEW_TIME_ENTRY", "TIME_ENTRY_UPDATED", "TIMER_STOPPED"}
+DELETE_EVENTS = {"TIME_ENTRY_DELETED"}
+EVENT_TYPES = UPSERT_EVENTS | DELETE_EVENTS
+
+
+def webhooks_enabled() -> bool:
+    return bool(WEBHOOK_TOKENS)
+
+
+def verify_token(token: str | None) -> bool:
+    """True if ``token`` belongs to one of the configured webhooks."""
+    if not token:
+        return False
+    return any(hmac.compare_digest(token.encode(), t.encode()) for t in WEBHOOK_TOKENS)
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def entry_row(payload: dict) -> pd.DataFrame | None:
+    """
+    The report row of a time entry payload, or None for running timers
+    (entries without end time are not part of any report yet).
+    """
+    if not (payload.get("timeInterval") or {}).get("end"):
+        return None
+    user_name = (payload.get("user") or {}).get("name", "")
+    return normalize_entries([payload], user_name=user_name)
+
+
+def _apply_to_period(key, entry: CacheEntry, entry_id: str, row, started) -> CacheEntry | None:
+    """New cache entry for one cached period, or None if the event does not touch it."""
+    _, start_iso, end_iso = key
+    df = entry.value
+    old = df['entry_id'] == entry_id if 'entry_id' in df.columns else pd.Series(False, index=df.index)
+    in_period = row is not None and _parse_time(start_iso) <= started <= _parse_time(end_iso)
+    if not old.any() and not in_period:
+        return None
+
+    if in_period and not row['user_name'].iloc[0] and 'user_id' in df.columns:
+        # Payloads without user object: take the name from the user's other entries
+        names = df.loc[df['user_id'] == row['user_id'].iloc[0], 'user_name']
+        if not names.empty:
+            row = row.assign(user_name=names.iloc[0])
+
+    parts = [df[~old]] + ([row] if in_period else [])
+    value = pd.concat(parts, ignore_index=True)
+
+    totals = None
+    if entry.totals is not None:
+        totals = dict(entry.totals)
+        for delta, sign in ((totals_of(df[old]), -1), (totals_of(row) if in_period else {}, 1)):
+            for project, hours in delta.items():
+                totals[project] = totals.get(project, 0.0) + sign * hours
+        totals = {project: hours for project, hours in totals.items() if abs(hours) > 1e-9}
+
+    return CacheEntry(value, loaded_at=entry.loaded_at, expires_at=entry.expires_at, totals=totals)
+
+
+def parse_event(event_type: str, payload: dict):
+    """
+    (row, start time) of an event: the report row of created / updated
+    entries (None for deletions and running timers). Raises ValueError for
+    unsupported event types and payloads that cannot be applied.
+    """
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unsupported webhook event '{event_type}'.")
+    if not payload.get("id") or not isinstance(payload["id"], str):
+        raise ValueError("Webhook payload without time entry id.")
+    if not isinstance(payload.get("workspaceId") or "", str):
+        raise ValueError("Webhook payload with invalid workspaceId.")
+    if event_type not in UPSERT_EVENTS:
+        return None, None
+    try:
+        row = entry_row(payload)
+        if row is None:
+            return None, None
+        started = _parse_time(payload["timeInterval"]["start"])
+        _parse_time(payload["timeInterval"]["end"])
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid time entry in webhook payload: {e!r}") from e
+    if started.tzinfo is None:
+        raise ValueError("Webhook payload with start time without time zone.")
+    return row, started
+
+
+def apply_event(event_type: str, payload: dict) -> int:
+    """
+    Apply one webhook event to the cached periods of its workspace in this
+    process. Returns the number of cached periods that changed. Raises
+    ValueError for events parse_event() rejects.
+    """
+    row, started = parse_event(event_type, payload)
+    entry_id = payload["id"]
+
+    incr("webhook_events")
+    workspace_id = payload.get("workspaceId") or DEFAULT_WORKSPACE.id
+    with phase("webhook_apply"):
+        return cache_for(workspace_id).update(
+            lambda key, entry: _apply_to_period(key, entry, entry_id, row, started)
+        )
+
+
+class EventLog:
+    """
+    Webhook events shared by all processes, in the order they were received.
+    Each EventLog object remembers the last event applied in this process.
+    """
+
+    def __init__(self, directory=WEBHOOK_DIR, retention: float = EVENT_RETENTION):
+        self.path = Path(directory) / "events.sqlite3"
+        self.retention = retention
+        self._applied = 0
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _ensure_schema(self, conn):
+        if self._schema_ready:
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " event_type TEXT NOT NULL, payload TEXT NOT NULL, received_at REAL NOT NULL)"
+        )
+        # Highest sequence number pruned so far (one row)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pruned (id INTEGER PRIMARY KEY CHECK (id = 0), through INTEGER NOT NULL)"
+        )
+        self._schema_ready = True
+
+    def append(self, event_type: str, payload: dict) -> int:
+        """
+        Store an event for every process; returns its sequence number. Raises
+        ValueError (nothing is stored) for events parse_event() rejects.
+        """
+        parse_event(event_type, payload)
+        now = time.time()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            self._ensure_schema(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                (through,) = conn.execute(
+                    "SELECT MAX(seq) FROM events WHERE received_at < ?", (now - self.retention,)
+                ).fetchone()
+                if through is not None:
+                    conn.execute("DELETE FROM events WHERE seq <= ?", (through,))
+                    conn.execute(
+                        "INSERT INTO pruned (id, through) VALUES (0, ?)"
+                        " ON CONFLICT (id) DO UPDATE SET through = excluded.through", (through,)
+                    )
+                cursor = conn.execute(
+                    "INSERT INTO events (event_type, payload, received_at) VALUES (?, ?, ?)",
+                    (event_type, json.dumps(payload, ensure_ascii=False), now)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return cursor.lastrowid
+
+    def sync(self) -> int:
+        """
+        Apply the events this process has not applied yet, in order. Returns
+        the number of cached periods that changed. Events that fail to apply
+        are logged and skipped. If events this process has not applied were
+        pruned meanwhile, its entry caches are dropped first.
+        """
+        if not self.path.exists():
+            return 0
+        with self._lock:
+            try:
+                with self._connect() as conn:
+                    self._ensure_schema(conn)
+                    # One snapshot, so no prune can happen between both reads
+                    conn.execute("BEGIN")
+                    pruned = conn.execute("SELECT through FROM pruned").fetchone()
+                    rows = conn.execute(
+                        "SELECT seq, event_type, payload FROM events WHERE seq > ? ORDER BY seq",
+                        (self._applied,)
+                    ).fetchall()
+                    conn.execute("COMMIT")
+            except sqlite3.OperationalError:
+                logger.exception("Webhook event log %s not readable", self.path)
+                return 0
+
+            if pruned is not None and pruned[0] > self._applied:
+                if self._applied:
+                    logger.warning("Webhook events %d to %d were pruned before this process applied them;"
+                                   " dropping the entry cache", self._applied + 1, pruned[0])
+                invalidate_all()
+                self._applied = pruned[0]
+
+            updated = 0
+            for seq, event_type, payload in rows:
+                try:
+                    updated += apply_event(event_type, json.loads(payload))
+                except Exception:
+                    logger.exception("Webhook event %d (%s) skipped", seq, event_type)
+                self._applied = seq
+            return updated
+
+
+EVENT_LOG = EventLog()
+
+
+def record_event(event_type: str, payload: dict) -> int:
+    """Append a received event to the shared event log (see EventLog.append)."""
+    return EVENT_LOG.append(event_type, payload)
+
+
+def sync() -> int:
+    """EventLog.sync() of the shared event log."""
+    return EVENT_LOG.sync()